@@ -0,0 +1,234 @@
+import math
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from fastapi.responses import JSONResponse
+
+from metrics import ADMISSION_REJECTIONS
+
+
+class Throttled(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        """
+        Raised when a request is over a limit.
+
+        Args:
+            reason: ``concurrency``, ``global_rate`` or ``client_rate``.
+            retry_after: seconds after which the request would likely be admitted.
+        """
+        self.reason = reason
+        self.retry_after = max(0.0, float(retry_after))
+        messages = {
+            "concurrency": "Too many requests are being analysed right now",
+            "global_rate": "The service is at its request quota",
+            "client_rate": "Too many requests from this client",
+        }
+        super().__init__(f"{messages.get(reason, 'Rate limited')}; retry in {self.retry_after:.1f} s")
+
+    @property
+    def retry_after_header(self):
+        # Retry-After takes whole seconds, so round up and never tell clients to retry at once
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        """
+        Refills at ``rate`` tokens per second up to ``burst``; starts full.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, cost: float, now: float):
+        """
+        Takes ``cost`` tokens and returns 0, or returns the seconds until they would
+        be available and takes nothing. Requests costing more than the burst are
+        admitted once the bucket is full and leave it in debt, so large batches are
+        possible but still paid for at ``rate``.
+        """
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        needed = min(cost, self.burst)
+        if self.tokens >= needed:
+            self.tokens -= cost
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+    def refund(self, cost: float):
+        self.tokens = min(self.burst, self.tokens + cost)
+
+
+class AdmissionController:
+    def __init__(self, max_concurrent: int = 0, client_rate: float = 0.0, client_burst: float = 10.0,
+                 global_rate: float = 0.0, global_burst: float = None, max_clients: int = 10000):
+        """
+        Decides up front whether a detection request is served, so overload turns
+        into fast 429s instead of a queue of slow failures. A request needs a free
+        slot under ``max_concurrent``, a token from the global bucket (the model
+        quota) and a token from its client's bucket. Limits set to 0 are off.
+
+        Used from the event loop only, so it keeps no lock.
+
+        Args:
+            max_concurrent: requests admitted at the same time.
+            client_rate: tokens per second refilled into each client's bucket.
+            client_burst: size of each client's bucket.
+            global_rate: tokens per second refilled into the bucket shared by all clients.
+            global_burst: size of the shared bucket; ``global_rate`` times ten seconds when None.
+            max_clients: client buckets kept; the least recently used are dropped first.
+        """
+        self.max_concurrent = max(0, int(max_concurrent))
+        self.client_rate = max(0.0, float(client_rate))
+        self.client_burst = max(1.0, float(client_burst))
+        self.global_rate = max(0.0, float(global_rate))
+        if global_burst is None:
+            global_burst = self.global_rate * 10.0
+        self.global_burst = max(1.0, float(global_burst))
+        self.max_clients = max(1, int(max_clients))
+        self._clients = OrderedDict()
+        self._global = TokenBucket(self.global_rate, self.global_burst, time.monotonic()) if self.global_rate else None
+        self.in_flight = 0
+        # Moving average of how long requests hold a slot, used for the concurrency Retry-After
+        self._hold_seconds = 1.0
+        self.admitted = 0
+        self.rejected = {"concurrency": 0, "global_rate": 0, "client_rate": 0}
+
+    @property
+    def enabled(self):
+        return bool(self.max_concurrent or self.client_rate or self.global_rate)
+
+    def _client_bucket(self, client: str, now: float):
+        bucket = self._clients.get(client)
+        if bucket is None:
+            bucket = self._clients[client] = TokenBucket(self.client_rate, self.client_burst, now)
+            if len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+        else:
+            self._clients.move_to_end(client)
+        return bucket
+
+    def _reject(self, reason: str, retry_after: float, transport: str):
+        self.rejected[reason] += 1
+        ADMISSION_REJECTIONS.inc(reason, transport)
+        raise Throttled(reason, retry_after)
+
+    def charge(self, client: str, cost: float, transport: str = "http", paid: float = 0.0):
+        """
+        Takes ``cost`` tokens from the client's and the global bucket, or raises
+        Throttled and takes nothing.
+
+        ``paid`` is what the request was already charged (the middleware's token).
+        It is handed back first so the whole cost is judged in one ``take``: a
+        batch larger than the burst is admitted once the bucket is full instead of
+        never, and a rejected request ends up paying nothing.
+        """
+        if cost <= 0:
+            return
+        now = time.monotonic()
+        bucket = self._client_bucket(client, now) if self.client_rate else None
+        if paid:
+            if bucket is not None:
+                bucket.refund(paid)
+            if self._global is not None:
+                self._global.refund(paid)
+        if bucket is not None:
+            wait = bucket.take(cost, now)
+            if wait:
+                self._reject("client_rate", wait, transport)
+        if self._global is not None:
+            wait = self._global.take(cost, now)
+            if wait:
+                if bucket is not None:
+                    bucket.refund(cost)
+                self._reject("global_rate", wait, transport)
+
+    def acquire(self, client: str, cost: float = 1.0, transport: str = "http"):
+        """
+        Admits one request: takes a concurrency slot and ``cost`` tokens, or raises
+        Throttled. Returns a ticket to hand back to ``release``.
+        """
+        if self.max_concurrent and self.in_flight >= self.max_concurrent:
+            self._reject("concurrency", self._hold_seconds, transport)
+        self.charge(client, cost, transport)
+        self.in_flight += 1
+        self.admitted += 1
+        return time.monotonic()
+
+    def release(self, ticket: float):
+        self.in_flight -= 1
+        self._hold_seconds += 0.2 * ((time.monotonic() - ticket) - self._hold_seconds)
+
+    @contextmanager
+    def admit(self, client: str, cost: float = 1.0, transport: str = "http"):
+        ticket = self.acquire(client, cost, transport)
+        try:
+            yield
+        finally:
+            self.release(ticket)
+
+    def stats(self):
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrent": self.max_concurrent,
+            "client_rate_per_minute": self.client_rate * 60.0,
+            "client_burst": self.client_burst,
+            "global_rate_per_minute": self.global_rate * 60.0,
+            "global_tokens": round(self._global.tokens, 2) if self._global is not None else None,
+            "clients": len(self._clients),
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+        }
+
+
+def client_address(scope, trust_forwarded: bool = False):
+    """
+    Identifies the client of an HTTP or WebSocket scope: the peer address, or the
+    first ``X-Forwarded-For`` hop when the app runs behind a trusted proxy.
+    """
+    if trust_forwarded:
+        for name, value in scope.get("headers", ()):
+            if name == b"x-forwarded-for":
+                forwarded = value.decode("latin-1").split(",")[0].strip()
+                if forwarded:
+                    return forwarded
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class AdmissionMiddleware:
+    def __init__(self, app, controller: AdmissionController, paths, trust_forwarded: bool = False):
+        """
+        ASGI middleware admitting HTTP requests to ``paths`` through ``controller``;
+        rejected requests get 429 with ``Retry-After`` before their body is read.
+        The slot is held until the response has been sent.
+
+        Args:
+            app: the wrapped ASGI application.
+            controller: the AdmissionController to consult.
+            paths: request paths that are admission-controlled.
+            trust_forwarded: identify clients by ``X-Forwarded-For``.
+        """
+        self.app = app
+        self.controller = controller
+        self.paths = frozenset(paths)
+        self.trust_forwarded = trust_forwarded
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("path") not in self.paths or not self.controller.enabled:
+            await self.app(scope, receive, send)
+            return
+        try:
+            ticket = self.controller.acquire(client_address(scope, self.trust_forwarded))
+        except Throttled as t:
+            response = JSONResponse({"detail": str(t)}, status_code=429, headers={"Retry-After": t.retry_after_header})
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(ticket)
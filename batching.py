@@ -0,0 +1,105 @@
+import asyncio
+import contextvars
+
+
+class MicroBatcher:
+    def __init__(self, run_batch, run_single, max_batch_size: int = 8, max_wait_ms: float = 20.0):
+        """
+        Coalesces predictions that arrive within a short window into one batched call.
+
+        Args:
+            run_batch: coroutine function taking a list of feature dicts and returning a
+                list of the same length with a prediction dict, or None, per item.
+            run_single: coroutine function used for items the batched call did not answer
+                and for batches of one.
+            max_batch_size: flush as soon as this many predictions are waiting.
+            max_wait_ms: flush at the latest this many milliseconds after the first
+                prediction of a batch arrived.
+        """
+        self.run_batch = run_batch
+        self.run_single = run_single
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+        self.batches = 0
+        self.batched_items = 0
+        self.single_calls = 0
+        self.fallbacks = 0
+
+    async def submit(self, features: dict):
+        """
+        Queues one feature set and waits for its verdict.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((features, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch = self._pending[:self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            # Callers that went away (e.g. disconnected clients) are not sent to the model
+            batch = [(features, future) for features, future in batch if not future.done()]
+            if batch:
+                # Run the batch in a fresh context so per-request state (e.g. stage
+                # timings) of whichever caller triggered the flush is not touched
+                task = contextvars.Context().run(asyncio.ensure_future, self._run(batch))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        if len(batch) == 1:
+            self.single_calls += 1
+            await self._resolve_single(*batch[0])
+            return
+
+        self.batches += 1
+        self.batched_items += len(batch)
+        try:
+            results = await self.run_batch([features for features, _ in batch])
+        except Exception as e:
+            print(f"Batched prediction failed, falling back per item: {e}")
+            results = None
+        if not isinstance(results, list) or len(results) != len(batch):
+            results = [None] * len(batch)
+
+        fallbacks = []
+        for (features, future), result in zip(batch, results):
+            if result is None:
+                fallbacks.append(self._resolve_single(features, future))
+            elif not future.done():
+                future.set_result(result)
+        if fallbacks:
+            self.fallbacks += len(fallbacks)
+            await asyncio.gather(*fallbacks)
+
+    async def _resolve_single(self, features, future):
+        try:
+            result = await self.run_single(features)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "pending": len(self._pending),
+            "batches": self.batches,
+            "batched_items": self.batched_items,
+            "single_calls": self.single_calls,
+            "fallbacks": self.fallbacks,
+        }
@@ -0,0 +1,679 @@
+import argparse
+import asyncio
+import base64
+import io
+import json
+import os
+import platform
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import wave
+
+import numpy as np
+import soundfile as sf
+
+from preprocessing import decode_audio, extract_features, load_audio, read_wav, stream_features
+
+
+def synthetic_voice(seconds: float, sr: int = 16000, seed: int = 0, vary_pitch: bool = False):
+    """
+    Generate a speech-like test signal: a few drifting harmonics with noise.
+    Shared by the benchmarks, loadgen.py and the tests.
+
+    Args:
+        seconds: length of the signal.
+        sr: sampling rate.
+        seed: seed of the noise (and of the pitch with ``vary_pitch``).
+        vary_pitch: draw the base pitch between 120 and 180 Hz instead of using 140 Hz,
+            so clips with different seeds also sound different.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sr)) / sr
+    base = 120.0 + 60.0 * rng.random() if vary_pitch else 140.0
+    f0 = base + 20.0 * np.sin(2 * np.pi * 0.3 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sr
+    y = sum(np.sin(k * phase) / k for k in range(1, 6))
+    y = 0.3 * y / np.max(np.abs(y)) + 0.01 * rng.standard_normal(len(t))
+    return y.astype(np.float32)
+
+
+def time_call(fn, *args, repeat: int = 3):
+    """
+    Best-of-``repeat`` wall time of ``fn(*args)`` in seconds.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_features(durations=(10, 60, 300, 600), sr: int = 16000, repeat: int = 3):
+    print(f"extract_features @ {sr} Hz")
+    print(f"{'seconds':>8} {'time (ms)':>10} {'ms / audio min':>15} {'x realtime':>11}")
+    rows = []
+    for seconds in durations:
+        y = synthetic_voice(seconds, sr)
+        elapsed = time_call(extract_features, y, sr, repeat=repeat)
+        rows.append({"seconds": seconds, "sr": sr, "time_ms": elapsed * 1000, "x_realtime": seconds / elapsed})
+        print(f"{seconds:>8} {elapsed * 1000:>10.1f} {elapsed * 1000 * 60 / seconds:>15.2f} {seconds / elapsed:>11.0f}")
+    # Linear scaling means the cost per audio minute stays flat across lengths
+    per_minute = [row["time_ms"] * 60 / row["seconds"] for row in rows]
+    print(f"cost per audio minute, longest vs shortest clip: {per_minute[-1] / per_minute[0]:.2f}x")
+    return rows
+
+
+def peak_memory(fn, *args):
+    """
+    Peak Python/NumPy heap allocation in bytes while running ``fn(*args)``.
+    """
+    tracemalloc.start()
+    try:
+        fn(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_streaming_memory(minutes=(1, 10, 30), sr: int = 16000):
+    print(f"peak memory, in-memory vs streaming feature extraction (16-bit WAV @ {sr} Hz)")
+    print(f"{'minutes':>8} {'file MB':>8} {'in-memory MB':>13} {'streaming MB':>13}")
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for m in minutes:
+            path = os.path.join(tmp, f"clip_{m}.wav")
+            with sf.SoundFile(path, "w", samplerate=sr, channels=1, subtype="PCM_16") as f:
+                # Written a minute at a time so the benchmark itself stays small
+                for i in range(m):
+                    f.write(synthetic_voice(60, sr, seed=i))
+            file_mb = os.path.getsize(path) / 1e6
+            in_memory = peak_memory(lambda: extract_features(*load_audio(path))) / 1e6
+            streaming = peak_memory(stream_features, path) / 1e6
+            rows.append({"minutes": m, "file_mb": file_mb, "in_memory_peak_mb": in_memory, "streaming_peak_mb": streaming})
+            print(f"{m:>8} {file_mb:>8.1f} {in_memory:>13.1f} {streaming:>13.1f}")
+    return rows
+
+
+def legacy_wave_decode(audio_file):
+    """
+    The previous ``wave`` + ``struct.unpack`` fallback decoder, kept for comparison.
+    """
+    with wave.open(audio_file, "rb") as wf:
+        sr = wf.getframerate()
+        n_frames = wf.getnframes()
+        n_channels = wf.getnchannels()
+        sampwidth = wf.getsampwidth()
+        frames = wf.readframes(n_frames)
+        fmt_char = {1: 'b', 2: 'h', 4: 'i'}.get(sampwidth)
+        if not fmt_char:
+            raise ValueError("Unsupported sample width")
+        data = struct.unpack(f"<{n_frames * n_channels}{fmt_char}", frames)
+        y = np.array(data, dtype=np.float32)
+        if n_channels > 1:
+            y = y.reshape(-1, n_channels).mean(axis=1)
+        return y / float(2 ** (8 * sampwidth - 1)), sr
+
+
+def bench_wav_decode(seconds=(10, 60, 300), sr: int = 16000, repeat: int = 3):
+    print(f"WAV fallback decoder, 16-bit stereo @ {sr} Hz")
+    print(f"{'seconds':>8} {'struct (ms)':>12} {'frombuffer (ms)':>16} {'speedup':>8} {'soundfile (ms)':>15}")
+    rows = []
+    for s in seconds:
+        y = synthetic_voice(s, sr)
+        buffer = io.BytesIO()
+        sf.write(buffer, np.stack([y, 0.5 * y], axis=1), sr, format="WAV", subtype="PCM_16")
+        raw = buffer.getvalue()
+        legacy = time_call(lambda: legacy_wave_decode(io.BytesIO(raw)), repeat=repeat)
+        fast = time_call(lambda: read_wav(io.BytesIO(raw)), repeat=repeat)
+        libsndfile = time_call(lambda: sf.read(io.BytesIO(raw)), repeat=repeat)
+        rows.append({"seconds": s, "struct_ms": legacy * 1000, "frombuffer_ms": fast * 1000, "soundfile_ms": libsndfile * 1000})
+        print(f"{s:>8} {legacy * 1000:>12.1f} {fast * 1000:>16.1f} {legacy / fast:>7.0f}x {libsndfile * 1000:>15.1f}")
+    return rows
+
+
+
+def latency_summary(samples):
+    """
+    p50/p95/p99 and mean of a list of durations in seconds, in milliseconds.
+    """
+    if not samples:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "mean_ms": None}
+    ms = np.asarray(samples, dtype=np.float64) * 1000.0
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {"p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99), "mean_ms": float(ms.mean())}
+
+
+# Container formats exercised by the decode benchmark, with the subtype each is written in
+CLIP_SUBTYPES = {"WAV": "PCM_16", "FLAC": "PCM_16", "OGG": "VORBIS"}
+
+
+def encode_clip(y, sr: int, fmt: str = "WAV", channels: int = 1):
+    """
+    Encode a mono signal as a WAV/FLAC/OGG file in memory, with ``channels``
+    slightly different copies of the signal.
+    """
+    data = y if channels == 1 else np.stack([y * (1.0 - 0.2 * c) for c in range(channels)], axis=1)
+    buffer = io.BytesIO()
+    sf.write(buffer, data, sr, format=fmt, subtype=CLIP_SUBTYPES[fmt])
+    return buffer.getvalue()
+
+
+def bench_decode_matrix(durations=(1, 10, 60), sample_rates=(16000, 44100), channels=(1, 2),
+                        formats=("WAV", "FLAC", "OGG"), repeat: int = 5):
+    print("decode_audio + extract_features over base64 clips")
+    print(f"{'fmt':>5} {'sr':>6} {'ch':>3} {'seconds':>8} {'decode p50':>11} {'features p50':>13} "
+          f"{'total p95':>10} {'x realtime':>11} {'peak MB':>8}")
+    rows = []
+    for fmt in formats:
+        for sr in sample_rates:
+            for n_channels in channels:
+                for seconds in durations:
+                    audio_base64 = base64.b64encode(encode_clip(synthetic_voice(seconds, sr), sr, fmt, n_channels)).decode()
+                    decode_times, feature_times, totals = [], [], []
+                    for _ in range(repeat):
+                        start = time.perf_counter()
+                        y, clip_sr = decode_audio(audio_base64)
+                        decoded = time.perf_counter()
+                        extract_features(y, clip_sr)
+                        done = time.perf_counter()
+                        decode_times.append(decoded - start)
+                        feature_times.append(done - decoded)
+                        totals.append(done - start)
+                    peak_mb = peak_memory(lambda: extract_features(*decode_audio(audio_base64))) / 1e6
+                    total = latency_summary(totals)
+                    row = {
+                        "format": fmt, "sr": sr, "channels": n_channels, "seconds": seconds,
+                        "decode_p50_ms": latency_summary(decode_times)["p50_ms"],
+                        "features_p50_ms": latency_summary(feature_times)["p50_ms"],
+                        **total,
+                        "x_realtime": seconds / (total["p50_ms"] / 1000.0),
+                        "peak_mb": peak_mb,
+                    }
+                    rows.append(row)
+                    print(f"{fmt:>5} {sr:>6} {n_channels:>3} {seconds:>8} {row['decode_p50_ms']:>9.1f}ms "
+                          f"{row['features_p50_ms']:>11.1f}ms {row['p95_ms']:>8.1f}ms {row['x_realtime']:>11.0f} {peak_mb:>8.1f}")
+    return rows
+
+
+class StubVoiceClassifier:
+    def __init__(self, latency_ms: float = 0.0):
+        """
+        Deterministic stand-in for VoiceClassifier: the verdict is a fixed function of
+        the features and arrives after ``latency_ms``, so benchmarks measure the
+        server rather than Gemini and give the same answers on every run.
+        """
+        self.latency = max(0.0, float(latency_ms)) / 1000.0
+        self.calls = 0
+
+    @staticmethod
+    def _verdict(features: dict):
+        centroid = float(features.get("spectral_centroid_mean", 0.0))
+        confidence = 0.5 + min(0.49, abs(centroid - 1500.0) / 10000.0)
+        return {
+            "classification": "AI-Generated" if centroid >= 1500.0 else "Human",
+            "confidence_score": round(confidence, 4),
+            "explanation": "Benchmark stub verdict.",
+        }
+
+    def predict(self, features: dict, timeout: float = None, raise_errors: bool = False):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self._verdict(features)
+
+    async def apredict(self, features: dict, timeout: float = None, raise_errors: bool = False):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._verdict(features)
+
+    def predict_batch(self, features_list: list, timeout: float = None, raise_errors: bool = False):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._verdict(features) for features in features_list]
+
+    async def apredict_batch(self, features_list: list, timeout: float = None, raise_errors: bool = False):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return [self._verdict(features) for features in features_list]
+
+    def warm_up(self, use_async: bool = False):
+        pass
+
+    def stats(self):
+        return {"initialized": True, "calls": self.calls}
+
+    async def aclose(self):
+        pass
+
+
+def load_app(stub):
+    """
+    Imports the FastAPI app with ``stub`` answering every prediction.
+    """
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark-stub")
+    import main
+    main.classifier = stub
+    main.inference.classifier = stub
+    return main
+
+
+def bench_detect(app_module, requests: int = 200, concurrency=(1, 8, 32), clip_seconds: float = 2.0,
+                 sr: int = 16000):
+    """
+    Drives POST /detect in-process over httpx's ASGI transport. Every request
+    carries a different clip so the verdict cache does not answer.
+    """
+    import httpx
+
+    print(f"POST /detect, {clip_seconds:g} s WAV clips @ {sr} Hz, {requests} requests per level")
+    print(f"{'concurrency':>11} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'peak MB':>8}")
+    payloads = [
+        {"audio_base64": base64.b64encode(encode_clip(synthetic_voice(clip_seconds, sr, seed=i), sr)).decode(),
+         "language": "English"}
+        for i in range(requests * len(concurrency))
+    ]
+
+    async def drive(client, batch, level):
+        semaphore = asyncio.Semaphore(level)
+        latencies, errors = [], 0
+
+        async def one(payload):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/detect", json=payload)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(payload) for payload in batch))
+        return latencies, errors, time.perf_counter() - start
+
+    async def run_levels():
+        rows = []
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            await client.post("/detect", json=payloads[0])  # warm-up
+            for n, level in enumerate(concurrency):
+                batch = payloads[n * requests:(n + 1) * requests]
+                latencies, errors, wall = await drive(client, batch, level)
+                # Memory is sampled on a separate short pass so tracing does not skew the latencies
+                app_module.verdict_cache.clear()
+                tracemalloc.start()
+                await drive(client, batch[:max(1, requests // 10)], level)
+                peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+                tracemalloc.stop()
+                row = {"concurrency": level, "requests": len(batch), "throughput_rps": len(batch) / wall,
+                       **latency_summary(latencies), "errors": errors, "peak_mb": peak_mb}
+                rows.append(row)
+                print(f"{level:>11} {row['throughput_rps']:>8.1f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+                      f"{row['p99_ms']:>8.1f} {errors:>7} {peak_mb:>8.1f}")
+        return rows
+
+    return asyncio.run(run_levels())
+
+
+def bench_live_monitor(app_module, seconds: float = 60.0, frame_seconds: float = 0.5, sr: int = 16000):
+    """
+    Streams Int16 PCM frames through /ws/live-monitor in-process (binary protocol)
+    and times each window verdict from the frame that completed it.
+    """
+    from fastapi.testclient import TestClient
+    from live import BINARY_SUBPROTOCOL, ENCODING_PCM_S16LE, FRAME_HEADER, FRAME_VERSION
+
+    print(f"/ws/live-monitor, {seconds:g} s of {frame_seconds:g} s Int16 frames @ {sr} Hz")
+    pcm = (synthetic_voice(seconds, sr) * 32767).astype("<i2")
+    frame_samples = int(frame_seconds * sr)
+    hop_samples = max(1, int(app_module.LIVE_HOP_SECONDS * sr))
+    latencies, messages = [], {}
+    client = TestClient(app_module.app)
+    with client.websocket_connect("/ws/live-monitor", subprotocols=[BINARY_SUBPROTOCOL]) as ws:
+        sent = 0
+        start = time.perf_counter()
+        for sequence, offset in enumerate(range(0, len(pcm), frame_samples)):
+            frame = pcm[offset:offset + frame_samples]
+            sent_at = time.perf_counter()
+            ws.send_bytes(FRAME_HEADER.pack(FRAME_VERSION, ENCODING_PCM_S16LE, 0, 0, sequence, sr) + frame.tobytes())
+            # The session answers once per hop, so wait for the reply when this frame completes one
+            if (sent + len(frame)) // hop_samples > sent // hop_samples:
+                message = ws.receive_json()
+                latencies.append(time.perf_counter() - sent_at)
+                messages[message["type"]] = messages.get(message["type"], 0) + 1
+            sent += len(frame)
+        wall = time.perf_counter() - start
+    row = {"seconds": seconds, "frame_seconds": frame_seconds, "windows": len(latencies),
+           "x_realtime": seconds / wall, **latency_summary(latencies), "messages": messages}
+    print(f"{row['windows']} windows, {row['x_realtime']:.0f}x realtime, p50 {row['p50_ms']:.1f} ms, "
+          f"p95 {row['p95_ms']:.1f} ms, p99 {row['p99_ms']:.1f} ms, messages {messages}")
+    return row
+
+
+def bench_prompts(clips: int = 48, batch_size: int = 8, live: bool = False, fake_latency_ms: float = 0.0):
+    """
+    Latency and tokens per verdict of the legacy and compact prompts, one clip per
+    call and ``batch_size`` clips per call. Calls go through ``VoiceClassifier``'s
+    async REST path to ``fake_gemini`` in-process, whose token counts are estimated
+    from the text length; with ``live`` they go to the real API (needs
+    GEMINI_API_KEY and spends quota), which reports exact counts and real latency.
+    """
+    import httpx
+    from fake_gemini import create_app
+    from model import PROMPT_STYLES, VoiceClassifier
+
+    features_list = [extract_features(synthetic_voice(2.0, seed=seed), 16000) for seed in range(clips)]
+    target = "Gemini API" if live else "fake Gemini"
+    print(f"prompt styles against {target}, {clips} clips, batches of {batch_size}")
+    print(f"{'style':>8} {'batch':>6} {'prompt chars':>13} {'prompt tok':>11} {'output tok':>11} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'unknown':>8}")
+
+    async def run_style(style: str, size: int):
+        classifier = VoiceClassifier(api_key=None if live else "benchmark-stub", prompt_style=style)
+        if not live:
+            classifier._http_client = httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=create_app(latency_ms=fake_latency_ms, jitter_ms=0.0)),
+                base_url="http://fake-gemini",
+            )
+        latencies, verdicts, prompt_chars = [], [], []
+        try:
+            for start in range(0, clips, size):
+                group = features_list[start:start + size]
+                began = time.perf_counter()
+                if size == 1:
+                    prompt_chars.append(len(classifier._build_prompt(group[0])))
+                    verdicts.append(await classifier.apredict(group[0]))
+                else:
+                    prompt_chars.append(len(classifier._build_batch_prompt(group)))
+                    verdicts.extend(await classifier.apredict_batch(group))
+                latencies.append(time.perf_counter() - began)
+        finally:
+            await classifier.aclose()
+        usage = classifier.usage
+        unknown = sum(1 for v in verdicts if v is None or v["classification"] == "Unknown")
+        return {
+            "mode": style,
+            "batch": size,
+            "prompt_chars": float(np.mean(prompt_chars)),
+            "prompt_tokens_per_verdict": usage["prompt_tokens"] / clips,
+            "output_tokens_per_verdict": (usage["output_tokens"] + usage["thoughts_tokens"]) / clips,
+            **latency_summary(latencies),
+            "unknown": unknown,
+        }
+
+    async def run_all():
+        rows = []
+        for style in PROMPT_STYLES[::-1]:
+            for size in (1, batch_size):
+                row = await run_style(style, size)
+                rows.append(row)
+                print(f"{style:>8} {size:>6} {row['prompt_chars']:>13.0f} {row['prompt_tokens_per_verdict']:>11.1f} "
+                      f"{row['output_tokens_per_verdict']:>11.1f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+                      f"{row['unknown']:>8}")
+        return rows
+
+    return asyncio.run(run_all())
+
+
+# Run in a fresh interpreter per sample: times the app import, the first /health and the
+# first /detect (after an explicit warm-up when argv[1] is "warmed"), printing them as JSON
+STARTUP_PROBE = """
+import base64, json, os, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+from benchmark import StubVoiceClassifier, encode_clip, synthetic_voice
+client = TestClient(main.app)
+client.get("/health").raise_for_status()
+health = time.perf_counter()
+if sys.argv[1] == "warmed":
+    # The real classifier is built (SDK import included) but never called
+    os.environ["GEMINI_API_KEY"] = "benchmark-stub"
+    main.warm_up()
+warmed = time.perf_counter()
+main.classifier = main.inference.classifier = StubVoiceClassifier()
+clip = base64.b64encode(encode_clip(synthetic_voice(2.0), 16000)).decode()
+detect_start = time.perf_counter()
+client.post("/detect", json={"audio_base64": clip, "language": "English"}).raise_for_status()
+detected = time.perf_counter()
+print(json.dumps({"import": imported - start, "health": health - imported, "warm_up": warmed - health,
+                  "first_detect": detected - detect_start}))
+"""
+
+
+def bench_startup(runs: int = 5):
+    """
+    Cold-start cost as a serverless instance sees it: each sample is a fresh
+    interpreter importing the app without a Gemini key, answering /health, then
+    classifying its first clip, either straight away or after ``warm_up()``. The
+    first clip is answered by the stub, so the cold row leaves out the Gemini SDK
+    import that a real first request would also pay for; the warm-up row includes it.
+    """
+    print(f"cold start, {runs} fresh interpreters per mode")
+    print(f"{'mode':>8} {'import ms':>10} {'health ms':>10} {'warm-up ms':>11} {'first detect ms':>16}")
+    env = {k: v for k, v in os.environ.items() if k != "GEMINI_API_KEY"}
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    rows = []
+    for mode in ("cold", "warmed"):
+        samples = {"import": [], "health": [], "warm_up": [], "first_detect": []}
+        for _ in range(runs):
+            out = subprocess.run([sys.executable, "-c", STARTUP_PROBE, mode], capture_output=True, text=True,
+                                 env=env, cwd=cwd, check=True).stdout
+            timings = json.loads(out.strip().splitlines()[-1])
+            for name in samples:
+                samples[name].append(timings[name])
+        row = {"mode": mode, "runs": runs}
+        for name, values in samples.items():
+            row[f"{name}_ms"] = float(np.median(values)) * 1000.0
+        rows.append(row)
+        print(f"{mode:>8} {row['import_ms']:>10.1f} {row['health_ms']:>10.1f} {row['warm_up_ms']:>11.1f} "
+              f"{row['first_detect_ms']:>16.1f}")
+    return rows
+
+
+class FlakyBackend:
+    def __init__(self, seed: int = 0):
+        """
+        Simulated Gemini for the resilience suite: calls take ``latency`` seconds, a
+        ``tail_rate`` share take ``tail_latency`` instead, and an ``error_rate`` share
+        fail after their delay. The attributes are changed between phases.
+        """
+        self.rng = np.random.default_rng(seed)
+        self.latency, self.tail_rate, self.tail_latency, self.error_rate = 0.04, 0.02, 0.4, 0.0
+        self.calls = 0
+
+    async def __call__(self, features: dict, timeout: float = None):
+        self.calls += 1
+        slow = self.rng.random() < self.tail_rate
+        latency = (self.tail_latency if slow else self.latency) * self.rng.uniform(0.8, 1.2)
+        # Like the real clients, give up once the call's own timeout has passed
+        if timeout is not None and latency > timeout:
+            await asyncio.sleep(timeout)
+            raise asyncio.TimeoutError()
+        await asyncio.sleep(latency)
+        if self.rng.random() < self.error_rate:
+            raise RuntimeError("503 Service Unavailable (simulated)")
+        return StubVoiceClassifier._verdict(features)
+
+
+def bench_resilience(requests_per_phase: int = 300, rate: float = 100.0, budget: float = 1.0):
+    """
+    Tail latency and answer source across a healthy phase, a brownout (half the
+    calls fail, all are ten times slower) and a recovery, for ``ResilientPredictor``
+    configurations from "no budget, no retries" (how calls behaved before) to
+    retries, hedging and the circuit breaker together. Predictions arrive at a fixed
+    ``rate`` so every phase lasts as long in wall time whatever the latency.
+    ``gemini_calls`` is the load each configuration put on the backend.
+    """
+    from resilience import CircuitBreaker, ResilientPredictor
+
+    phases = {
+        "healthy": dict(latency=0.04, tail_rate=0.02, tail_latency=0.4, error_rate=0.0),
+        "brownout": dict(latency=0.4, tail_rate=0.05, tail_latency=3.0, error_rate=0.5),
+        "recovery": dict(latency=0.04, tail_rate=0.02, tail_latency=0.4, error_rate=0.0),
+    }
+    configs = {
+        "baseline": dict(budget=30.0, max_retries=0, breaker=CircuitBreaker(failure_rate=2.0)),
+        "retries": dict(budget=budget, max_retries=2, breaker=CircuitBreaker(failure_rate=2.0)),
+        "hedged": dict(budget=budget, max_retries=2, hedge=True, breaker=CircuitBreaker(failure_rate=2.0)),
+        "breaker": dict(budget=budget, max_retries=2, hedge=True, breaker=CircuitBreaker(reset_timeout=0.5)),
+    }
+    features = {"spectral_centroid_mean": 1200.0}
+
+    def fallback(_):
+        return {"classification": "Unknown", "confidence_score": 0.0, "explanation": "", "tier": "fallback"}
+
+    async def run_config(name, options):
+        backend = FlakyBackend()
+        predictor = ResilientPredictor(backend, None, fallback, backoff_base=0.05, backoff_max=0.5, **options)
+        rows = []
+        for phase, settings in phases.items():
+            vars(backend).update(settings)
+            calls_before, latencies, fallbacks = backend.calls, [], 0
+
+            async def one(delay):
+                nonlocal fallbacks
+                await asyncio.sleep(delay)
+                start = time.perf_counter()
+                result = await predictor.predict(features)
+                latencies.append(time.perf_counter() - start)
+                fallbacks += result.get("tier") == "fallback"
+
+            start = time.perf_counter()
+            await asyncio.gather(*(one(i / rate) for i in range(requests_per_phase)))
+            row = {"mode": name, "phase": phase, **latency_summary(latencies),
+                   "fallback_share": fallbacks / requests_per_phase,
+                   "gemini_calls": backend.calls - calls_before, "wall_s": time.perf_counter() - start,
+                   "circuit": predictor.breaker.state}
+            rows.append(row)
+            print(f"{name:>9} {phase:>9} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} "
+                  f"{row['fallback_share']:>9.2f} {row['gemini_calls']:>7} {row['circuit']:>9}")
+        return rows
+
+    async def run_all():
+        rows = []
+        for name, options in configs.items():
+            rows.extend(await run_config(name, options))
+        return rows
+
+    print(f"resilience, {requests_per_phase} predictions per phase at {rate:.0f}/s, budget {budget:.1f} s")
+    print(f"{'config':>9} {'phase':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'fallback':>9} {'calls':>7} {'circuit':>9}")
+    return asyncio.run(run_all())
+
+
+def run_metadata():
+    """
+    Describes the code and machine a result file came from.
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+# Fields that identify a row (everything else numeric is a measurement)
+ROW_KEYS = ("mode", "phase", "batch", "format", "sr", "channels", "seconds", "minutes", "concurrency", "frame_seconds")
+
+
+def compare_results(old: dict, new: dict):
+    """
+    Prints the relative change of every measurement present in both result files.
+    """
+    print(f"comparing {old['meta'].get('commit')} -> {new['meta'].get('commit')}")
+    for suite, new_rows in new["results"].items():
+        old_rows = old.get("results", {}).get(suite)
+        if old_rows is None:
+            continue
+        new_rows = new_rows if isinstance(new_rows, list) else [new_rows]
+        old_rows = old_rows if isinstance(old_rows, list) else [old_rows]
+        index = {tuple(row.get(k) for k in ROW_KEYS): row for row in old_rows}
+        for row in new_rows:
+            key = tuple(row.get(k) for k in ROW_KEYS)
+            before = index.get(key)
+            if before is None:
+                continue
+            label = " ".join(f"{k}={row[k]}" for k in ROW_KEYS if row.get(k) is not None)
+            for metric, value in row.items():
+                if metric in ROW_KEYS or not isinstance(value, (int, float)) or not before.get(metric):
+                    continue
+                change = (value - before[metric]) / before[metric] * 100.0
+                print(f"{suite:>14} {label:<40} {metric:<20} {before[metric]:>10.2f} -> {value:>10.2f} ({change:+.1f}%)")
+
+
+if __name__ == "__main__":
+    suites = ("features", "memory", "wav", "decode", "detect", "live", "startup", "prompt", "resilience")
+    parser = argparse.ArgumentParser(description="Benchmark the audio preprocessing pipeline and the API.")
+    parser.add_argument("--sr", type=int, default=16000, help="Sample rate of the synthetic clips")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is reported)")
+    parser.add_argument("--suite", action="append", choices=suites, help="Suite to run (repeatable, default: all)")
+    parser.add_argument("--quick", action="store_true", help="Smaller inputs for a fast smoke run")
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0, help="Delay of the stub classifier")
+    parser.add_argument("--live-gemini", action="store_true",
+                        help="Run the prompt suite against the real Gemini API (uses GEMINI_API_KEY and quota)")
+    parser.add_argument("--json", dest="json_path", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Print changes against an earlier --json result file")
+    args = parser.parse_args()
+    selected = args.suite or list(suites)
+    results = {}
+
+    if "features" in selected:
+        results["features"] = bench_features(durations=(10, 60) if args.quick else (10, 60, 300, 600),
+                                             sr=args.sr, repeat=args.repeat)
+        print()
+    if "memory" in selected:
+        results["streaming_memory"] = bench_streaming_memory(minutes=(1,) if args.quick else (1, 10, 30), sr=args.sr)
+        print()
+    if "wav" in selected:
+        results["wav_decode"] = bench_wav_decode(seconds=(10,) if args.quick else (10, 60, 300),
+                                                 sr=args.sr, repeat=args.repeat)
+        print()
+    if "decode" in selected:
+        results["decode_matrix"] = bench_decode_matrix(
+            durations=(1, 10) if args.quick else (1, 10, 60), repeat=max(args.repeat, 5)
+        )
+        print()
+    if "prompt" in selected:
+        results["prompt"] = bench_prompts(clips=16 if args.quick else 48, live=args.live_gemini,
+                                          fake_latency_ms=args.stub_latency_ms)
+        print()
+    if "resilience" in selected:
+        results["resilience"] = bench_resilience(requests_per_phase=100 if args.quick else 300)
+        print()
+    if "startup" in selected:
+        results["startup"] = bench_startup(runs=3 if args.quick else 10)
+        print()
+    if "detect" in selected or "live" in selected:
+        app_module = load_app(StubVoiceClassifier(args.stub_latency_ms))
+        # The live monitor runs first: its test client uses its own event loop
+        if "live" in selected:
+            results["live_monitor"] = bench_live_monitor(app_module, seconds=20 if args.quick else 60, sr=args.sr)
+            print()
+        if "detect" in selected:
+            results["detect"] = bench_detect(app_module, requests=40 if args.quick else 200, sr=args.sr)
+            print()
+
+    report = {"meta": run_metadata(), "results": results}
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"results written to {args.json_path}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare_results(json.load(f), report)
@@ -0,0 +1,113 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class VerdictCache:
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600.0):
+        """
+        Size-bounded LRU cache of classifier verdicts with a time-to-live.
+
+        Args:
+            max_entries: maximum number of verdicts kept; the least recently used
+                entry is evicted first. 0 disables the cache.
+            ttl_seconds: how long a verdict stays valid after it was stored.
+        """
+        self.max_entries = max(0, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    @staticmethod
+    def make_key(y, sr: int, language: str):
+        """
+        Content-addressed key built from the decoded PCM samples, so the same audio
+        hits the cache regardless of container or base64 encoding.
+        """
+        digest = VerdictCache.new_hasher()
+        VerdictCache.update_hasher(digest, y)
+        return VerdictCache.finish_key(digest, sr, language)
+
+    @staticmethod
+    def new_hasher():
+        """
+        Incremental form of ``make_key`` for audio decoded block by block.
+        """
+        return hashlib.sha256()
+
+    @staticmethod
+    def update_hasher(digest, y):
+        pcm = np.ascontiguousarray(y, dtype=np.float32)
+        digest.update(memoryview(pcm).cast("B"))
+
+    @staticmethod
+    def finish_key(digest, sr: int, language: str):
+        digest.update(f"|{int(sr)}|{(language or '').strip().lower()}".encode("utf-8"))
+        return digest.hexdigest()
+
+    @staticmethod
+    def make_feature_key(features: dict, language: str):
+        """
+        Key for feature sets computed by the client (``/detect/features``), where
+        there is no PCM to hash. Kept apart from the audio keys by a prefix.
+        """
+        digest = hashlib.sha256(b"features|")
+        digest.update(json.dumps(features, sort_keys=True).encode("utf-8"))
+        digest.update(f"|{(language or '').strip().lower()}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str):
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value):
+        if not self.enabled:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,109 @@
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+
+from fastapi import FastAPI, HTTPException, Request
+import uvicorn
+
+# Numbered feature sets in a batch prompt ("1. Duration: ..." or, compact, "1. duration_s=...")
+BATCH_ITEM = re.compile(r"^(\d+)\. (?:Duration: |duration_s=)([0-9.]+)", re.MULTILINE)
+SPECTRAL_CENTROID = re.compile(r"(?:Spectral Centroid \(mean\): |centroid_hz=)([0-9.]+)")
+
+
+def estimate_tokens(text: str):
+    # Roughly four characters per token for English text and numbers
+    return max(1, math.ceil(len(text) / 4))
+
+
+def create_app(latency_ms: float = 300.0, jitter_ms: float = 100.0, error_rate: float = 0.0,
+               malformed_rate: float = 0.0, seed: int = 0):
+    """
+    Stand-in for the Gemini ``generateContent`` REST endpoint, for load testing.
+
+    Replies after ``latency_ms`` ± ``jitter_ms``, with a verdict derived from the
+    spectral centroid in the prompt, so the API can be exercised at high rates
+    without a key, quota or cost. Point the server at it with GEMINI_API_ENDPOINT
+    and GEMINI_ASYNC_CLIENT=true. Replies carry ``usageMetadata`` with token counts
+    estimated from the text length, and requests asking for JSON output
+    (``responseMimeType``) never get malformed replies, as with the real API.
+
+    Args:
+        latency_ms: mean response delay.
+        jitter_ms: half-width of the uniform delay jitter.
+        error_rate: fraction of calls answered with HTTP 503.
+        malformed_rate: fraction of calls answered with text that is not JSON.
+        seed: seed of the delay and failure draws.
+    """
+    app = FastAPI(title="Fake Gemini")
+    rng = random.Random(seed)
+    counters = {"calls": 0, "errors": 0, "malformed": 0}
+
+    def verdict(centroid: float, index: int = None):
+        result = {
+            "classification": "AI-Generated" if centroid >= 1500.0 else "Human",
+            "confidence_score": round(0.5 + min(0.49, abs(centroid - 1500.0) / 10000.0), 4),
+            "explanation": "Fake Gemini verdict for load testing.",
+        }
+        if index is not None:
+            result = {"id": index, **result}
+        return result
+
+    @app.post("/v1beta/models/{model_action}")
+    async def generate_content(model_action: str, request: Request):
+        if not model_action.endswith(":generateContent"):
+            raise HTTPException(status_code=404, detail="Only generateContent is emulated")
+        counters["calls"] += 1
+        body = await request.json()
+        prompt = "".join(part.get("text", "") for part in body["contents"][0]["parts"])
+
+        delay = max(0.0, latency_ms + rng.uniform(-jitter_ms, jitter_ms)) / 1000.0
+        await asyncio.sleep(delay)
+        if rng.random() < error_rate:
+            counters["errors"] += 1
+            raise HTTPException(status_code=503, detail="Injected failure")
+        json_mode = body.get("generationConfig", {}).get("responseMimeType") == "application/json"
+        if rng.random() < malformed_rate and not json_mode:
+            counters["malformed"] += 1
+            text = "The voice sounds human to me."
+        else:
+            centroids = [float(c) for c in SPECTRAL_CENTROID.findall(prompt)] or [0.0]
+            items = BATCH_ITEM.findall(prompt)
+            if items:
+                text = json.dumps([verdict(centroids[i] if i < len(centroids) else 0.0, int(number))
+                                   for i, (number, _) in enumerate(items)])
+            else:
+                text = json.dumps(verdict(centroids[0]))
+        prompt_tokens, output_tokens = estimate_tokens(prompt), estimate_tokens(text)
+        return {
+            "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}],
+            "usageMetadata": {
+                "promptTokenCount": prompt_tokens,
+                "candidatesTokenCount": output_tokens,
+                "totalTokenCount": prompt_tokens + output_tokens,
+            },
+        }
+
+    @app.get("/stats")
+    def stats():
+        return counters
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a fake Gemini generateContent endpoint for load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Mean response delay")
+    parser.add_argument("--jitter-ms", type=float, default=100.0, help="Uniform jitter around the mean")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls failing with 503")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Fraction of non-JSON replies")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    uvicorn.run(
+        create_app(args.latency_ms, args.jitter_ms, args.error_rate, args.malformed_rate, args.seed),
+        host=args.host, port=args.port, log_level="warning",
+    )
@@ -0,0 +1,206 @@
+import json
+import sys
+
+import numpy as np
+
+FEATURE_NAMES = [
+    "duration",
+    "rms_mean",
+    "zero_crossing_rate_mean",
+    "spectral_centroid_mean",
+    "spectral_rolloff_mean",
+]
+
+
+def log_loss(logits, labels):
+    """
+    Mean negative log-likelihood of 0/1 ``labels`` under sigmoid(``logits``).
+    """
+    logits = np.asarray(logits, dtype=np.float64)
+    labels = np.asarray(labels, dtype=np.float64)
+    # log(1 + exp(-z)) for the true class, written to stay finite for large |z|
+    signed = np.where(labels > 0.5, logits, -logits)
+    return float(np.mean(np.logaddexp(0.0, -signed)))
+
+
+def fit_temperature(logits, labels):
+    """
+    Temperature T minimising ``log_loss(logits / T, labels)``, searched on a log
+    grid between 0.05 and 20 and refined around the best grid point.
+    """
+    grid = np.exp(np.linspace(np.log(0.05), np.log(20.0), 121))
+    for _ in range(3):
+        losses = [log_loss(logits / t, labels) for t in grid]
+        best = int(np.argmin(losses))
+        temperature = float(grid[best])
+        grid = np.linspace(grid[max(0, best - 1)], grid[min(len(grid) - 1, best + 1)], 41)
+    return temperature
+
+
+class FastPathClassifier:
+    def __init__(self, weights: dict, threshold: float = 0.9):
+        """
+        In-process logistic regression over the ``extract_features`` dict.
+
+        Clips whose calibrated confidence reaches ``threshold`` are answered locally;
+        everything else is escalated to Gemini.
+
+        Args:
+            weights: dict with ``features`` (names), ``mean``, ``scale``, ``coef``,
+                ``intercept`` and optionally ``temperature`` used to calibrate the
+                logit (values > 1 make the model less confident).
+            threshold: minimum probability of the predicted class needed to answer.
+        """
+        self.feature_names = list(weights.get("features", FEATURE_NAMES))
+        n = len(self.feature_names)
+        self.mean = np.asarray(weights.get("mean", [0.0] * n), dtype=np.float64)
+        self.scale = np.asarray(weights.get("scale", [1.0] * n), dtype=np.float64)
+        self.scale[self.scale == 0] = 1.0
+        self.coef = np.asarray(weights["coef"], dtype=np.float64)
+        self.intercept = float(weights.get("intercept", 0.0))
+        self.temperature = float(weights.get("temperature", 1.0)) or 1.0
+        if not (self.mean.shape == self.scale.shape == self.coef.shape == (n,)):
+            raise ValueError("Fast-path weights must have one mean, scale and coef per feature")
+        self.threshold = float(threshold)
+        self.answered = 0
+        self.escalated = 0
+
+    @classmethod
+    def load(cls, path: str, threshold: float = 0.9):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f), threshold=threshold)
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.weights(), f, indent=2)
+
+    def weights(self):
+        return {
+            "features": self.feature_names,
+            "mean": self.mean.tolist(),
+            "scale": self.scale.tolist(),
+            "coef": self.coef.tolist(),
+            "intercept": self.intercept,
+            "temperature": self.temperature,
+        }
+
+    def _vector(self, features: dict):
+        x = np.array([float(features.get(name, 0.0)) for name in self.feature_names], dtype=np.float64)
+        return (x - self.mean) / self.scale
+
+    def predict_proba(self, features: dict):
+        """
+        Calibrated probability that the clip is AI-generated.
+        """
+        logit = (float(self._vector(features) @ self.coef) + self.intercept) / self.temperature
+        logit = max(-50.0, min(50.0, logit))
+        return float(1.0 / (1.0 + np.exp(-logit)))
+
+    def predict(self, features: dict):
+        """
+        Returns a prediction dict when confident enough, otherwise None to escalate.
+        """
+        p_ai = self.predict_proba(features)
+        confidence = max(p_ai, 1.0 - p_ai)
+        if confidence < self.threshold:
+            self.escalated += 1
+            return None
+        self.answered += 1
+        classification = "AI-Generated" if p_ai >= 0.5 else "Human"
+        return {
+            "classification": classification,
+            "confidence_score": round(confidence, 4),
+            "explanation": f"Answered by the local fast-path classifier (P(AI-Generated) = {p_ai:.3f}).",
+            "tier": "fast_path",
+        }
+
+    def fallback(self, features: dict):
+        """
+        Always answers, whatever the confidence; used while Gemini is unavailable.
+        """
+        p_ai = self.predict_proba(features)
+        return {
+            "classification": "AI-Generated" if p_ai >= 0.5 else "Human",
+            "confidence_score": round(max(p_ai, 1.0 - p_ai), 4),
+            "explanation": f"Gemini was unavailable, so the local classifier answered (P(AI-Generated) = {p_ai:.3f}).",
+            "tier": "fallback",
+        }
+
+    @classmethod
+    def fit(cls, features_list: list, labels: list, threshold: float = 0.9,
+            l2: float = 1e-3, learning_rate: float = 0.1, epochs: int = 2000,
+            holdout: float = 0.2, seed: int = 0):
+        """
+        Fits the weights with batch gradient descent, e.g. on verdicts previously
+        returned by Gemini. ``labels`` are 1 for AI-Generated and 0 for Human.
+
+        A shuffled ``holdout`` share of the examples is kept out of training and
+        used to fit the temperature: the value minimising their negative
+        log-likelihood, so that confidences (and ``threshold``) mean what they say.
+        With fewer than two held-out examples of each class the temperature stays 1.
+        """
+        X = np.array([[float(f.get(name, 0.0)) for name in FEATURE_NAMES] for f in features_list], dtype=np.float64)
+        y = np.asarray(labels, dtype=np.float64)
+        if X.shape[0] == 0 or X.shape[0] != y.shape[0]:
+            raise ValueError("Need one label per feature dict to fit the fast-path classifier")
+        order = np.random.default_rng(seed).permutation(len(y))
+        n_holdout = int(len(y) * holdout)
+        held, train = order[:n_holdout], order[n_holdout:]
+        if len(train) == 0:
+            raise ValueError("Holdout leaves no examples to fit the fast-path classifier on")
+
+        mean = X[train].mean(axis=0)
+        scale = X[train].std(axis=0)
+        scale[scale == 0] = 1.0
+        Z = (X[train] - mean) / scale
+        y_train = y[train]
+        coef = np.zeros(Z.shape[1])
+        intercept = 0.0
+        for _ in range(epochs):
+            p = 1.0 / (1.0 + np.exp(-(Z @ coef + intercept)))
+            error = p - y_train
+            coef -= learning_rate * (Z.T @ error / len(y_train) + l2 * coef)
+            intercept -= learning_rate * float(error.mean())
+
+        temperature = 1.0
+        y_held = y[held]
+        if min(y_held.sum(), len(y_held) - y_held.sum()) >= 2:
+            logits = ((X[held] - mean) / scale) @ coef + intercept
+            temperature = fit_temperature(logits, y_held)
+        return cls({
+            "features": FEATURE_NAMES,
+            "mean": mean.tolist(),
+            "scale": scale.tolist(),
+            "coef": coef.tolist(),
+            "intercept": intercept,
+            "temperature": temperature,
+        }, threshold=threshold)
+
+    def stats(self):
+        total = self.answered + self.escalated
+        return {
+            "threshold": self.threshold,
+            "answered": self.answered,
+            "escalated": self.escalated,
+            "escalation_rate": round(self.escalated / total, 4) if total else 0.0,
+        }
+
+
+if __name__ == "__main__":
+    # Train weights from a JSONL file of {"features": {...}, "classification": "AI-Generated" | "Human"}
+    if len(sys.argv) != 3:
+        print("Usage: python fast_path.py <verdicts.jsonl> <weights.json>")
+        sys.exit(1)
+    features_list, labels = [], []
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if row.get("classification") not in ("AI-Generated", "Human"):
+                continue
+            features_list.append(row["features"])
+            labels.append(1 if row["classification"] == "AI-Generated" else 0)
+    model = FastPathClassifier.fit(features_list, labels)
+    model.save(sys.argv[2])
+    print(f"Trained on {len(labels)} verdicts, weights written to {sys.argv[2]}")
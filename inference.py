@@ -0,0 +1,308 @@
+import asyncio
+import base64
+import functools
+import io
+import multiprocessing
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+from cache import VerdictCache
+from metrics import INFERENCE_CALL_SECONDS, INFERENCE_WAIT_SECONDS, record_timing
+from preprocessing import decode_audio, extract_features, stream_features, stream_speech, trim_silence
+
+
+class InferenceQueueFull(Exception):
+    """Raised when too many predictions are already waiting for a worker."""
+
+
+class InferenceQueueTimeout(InferenceQueueFull):
+    """Raised when a prediction's timeout runs out while it waits for a free slot."""
+
+
+class InferenceTimeout(Exception):
+    """Raised when a prediction does not finish within the per-call timeout."""
+
+
+class InferenceExecutor:
+    def __init__(
+        self,
+        classifier,
+        max_concurrency: int = 4,
+        max_queue: int = 32,
+        timeout: float = 30.0,
+        use_async: bool = False,
+    ):
+        """
+        Run blocking VoiceClassifier calls on a worker pool so the event loop keeps serving.
+
+        Args:
+            classifier: object exposing a synchronous ``predict(features)`` method.
+            max_concurrency: number of predictions allowed to run at the same time.
+            max_queue: number of predictions allowed to wait for a free slot before
+                new ones are rejected with InferenceQueueFull.
+            timeout: seconds a single prediction may run before InferenceTimeout is raised.
+            use_async: await ``classifier.apredict`` on the event loop instead of running
+                ``classifier.predict`` on a worker thread.
+        """
+        self.classifier = classifier
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_queue = max(0, int(max_queue))
+        self.timeout = float(timeout)
+        self.use_async = bool(use_async)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="inference")
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._waiting = 0
+        self._in_flight = 0
+        # Moving average of successful call durations, None until a call has completed
+        self._call_seconds = None
+
+    async def predict(self, features: dict, timeout: float = None, raise_errors: bool = False):
+        """
+        Awaitable equivalent of ``classifier.predict(features)``.
+
+        Args:
+            features: extracted features.
+            timeout: seconds the call may run, capped at the executor's timeout.
+            raise_errors: forwarded to the classifier so call failures raise.
+        """
+        timeout = self._call_timeout(timeout)
+        if self.use_async:
+            return await self._limited(
+                lambda: self.classifier.apredict(features, timeout=timeout, raise_errors=raise_errors),
+                timeout=timeout,
+            )
+        call = functools.partial(self.classifier.predict, timeout=timeout, raise_errors=raise_errors)
+        return await self.submit(call, features, timeout=timeout)
+
+    async def predict_batch(self, features_list: list, timeout: float = None, raise_errors: bool = False):
+        """
+        Awaitable equivalent of ``classifier.predict_batch(features_list)``; the whole
+        batch occupies a single concurrency slot. Arguments are as for ``predict``.
+        """
+        timeout = self._call_timeout(timeout)
+        if self.use_async:
+            return await self._limited(
+                lambda: self.classifier.apredict_batch(features_list, timeout=timeout, raise_errors=raise_errors),
+                "batch",
+                timeout,
+            )
+        call = functools.partial(self.classifier.predict_batch, timeout=timeout, raise_errors=raise_errors)
+        return await self.submit(call, features_list, kind="batch", timeout=timeout)
+
+    def _call_timeout(self, timeout):
+        return self.timeout if timeout is None else max(0.0, min(self.timeout, float(timeout)))
+
+    async def submit(self, fn, *args, kind: str = "single", timeout: float = None):
+        """
+        Run ``fn(*args)`` on the inference pool, respecting the concurrency limit,
+        queue depth and per-call timeout. ``kind`` labels the call in the metrics.
+        """
+        return await self._limited(lambda: self._pool.submit(fn, *args), kind, timeout)
+
+    async def _limited(self, start, kind: str = "single", timeout: float = None):
+        """
+        Await the coroutine or pool future returned by ``start()`` once a concurrency
+        slot is free. Time spent waiting for the slot and in the call are recorded
+        separately.
+
+        The slot is held until the call has really finished: a worker thread cannot
+        be interrupted, so after a timeout or cancellation its slot is only given
+        back once the thread returns, and the concurrency limit stays a true bound
+        on calls running against the backend.
+
+        ``timeout`` covers both: running out while still waiting for a slot raises
+        InferenceQueueTimeout (the backend was never called), running out during
+        the call raises InferenceTimeout. A call that waited for its slot and has
+        less time left than a typical call takes is not started either, so only
+        the backend's own slowness ever ends in InferenceTimeout.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        if self._semaphore.locked() and self._waiting >= self.max_queue:
+            raise InferenceQueueFull(
+                f"Inference queue is full ({self._waiting} waiting, {self._in_flight} running)"
+            )
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        waited = self._semaphore.locked()
+        self._waiting += 1
+        queued_at = time.perf_counter()
+        try:
+            if waited:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout)
+            else:
+                await self._semaphore.acquire()
+        except asyncio.TimeoutError:
+            raise InferenceQueueTimeout(f"No inference slot became free within {timeout:.1f} seconds")
+        finally:
+            self._waiting -= 1
+        started_at = time.perf_counter()
+        INFERENCE_WAIT_SECONDS.observe(started_at - queued_at)
+        record_timing("model_wait", started_at - queued_at)
+
+        remaining = deadline - loop.time()
+        if remaining <= 0 or (waited and self._call_seconds is not None and remaining < self._call_seconds):
+            self._semaphore.release()
+            raise InferenceQueueTimeout(
+                f"Inference slot became free with {max(0.0, remaining):.1f} of {timeout:.1f} seconds left"
+            )
+
+        self._in_flight += 1
+        try:
+            job = start()
+        except BaseException:
+            self._release(started_at, kind)
+            raise
+        if isinstance(job, Future):
+            job.add_done_callback(lambda _: self._release_threadsafe(loop, started_at, kind))
+            call = asyncio.wrap_future(job)
+        else:
+            call = asyncio.ensure_future(job)
+            call.add_done_callback(lambda _: self._release(started_at, kind))
+        try:
+            result = await asyncio.wait_for(call, remaining)
+            call_seconds = time.perf_counter() - started_at
+            if self._call_seconds is None:
+                self._call_seconds = call_seconds
+            else:
+                self._call_seconds += 0.2 * (call_seconds - self._call_seconds)
+            return result
+        except asyncio.TimeoutError:
+            raise InferenceTimeout(f"Prediction did not complete within {timeout:.1f} seconds")
+        finally:
+            record_timing("model_call", time.perf_counter() - started_at)
+
+    def _release(self, started_at: float, kind: str):
+        self._in_flight -= 1
+        self._semaphore.release()
+        INFERENCE_CALL_SECONDS.observe(time.perf_counter() - started_at, kind)
+
+    def _release_threadsafe(self, loop, started_at: float, kind: str):
+        # Pool futures complete on the worker thread; the semaphore belongs to the loop
+        try:
+            loop.call_soon_threadsafe(self._release, started_at, kind)
+        except RuntimeError:
+            # The loop has been closed (shutdown), nothing is waiting for the slot any more
+            pass
+
+    def stats(self):
+        return {
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "timeout_seconds": self.timeout,
+            "typical_call_ms": round(self._call_seconds * 1000.0, 1) if self._call_seconds is not None else None,
+            "async_client": self.use_async,
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
+
+
+async def run_cpu_bound(fn, *args):
+    """
+    Run CPU-heavy work (audio decoding, feature extraction) on the loop's default
+    executor so large payloads do not stall other requests.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, fn, *args)
+
+
+def prepare_payload(audio_base64: str, language: str, with_cache_key: bool = True, streaming: bool = False,
+                    vad: dict = None):
+    """
+    Decodes one base64 clip and extracts its features.
+
+    Module-level so it can run in a worker process; only the small feature dict
+    and cache key travel back, not the decoded PCM. With ``streaming`` the audio
+    is decoded block by block so long recordings never exist as one float array.
+
+    When ``vad`` (keyword arguments for ``trim_silence``) is given, leading and
+    trailing silence is cut before hashing and feature extraction, and the
+    features carry ``has_speech``, ``speech_ratio`` and the untrimmed
+    ``clip_duration``. Clips without speech skip feature extraction and return
+    no cache key. Both decoders trim and hash the same samples, so a clip gets
+    the same key and features whichever one handles it.
+    """
+    if streaming:
+        return prepare_file(io.BytesIO(base64.b64decode(audio_base64)), language, with_cache_key, vad)
+
+    y, sr = decode_audio(audio_base64)
+    speech = None
+    if vad is not None:
+        trimmed, speech = trim_silence(y, sr, **vad)
+        if not speech["has_speech"]:
+            return None, no_speech_features(len(y), sr, speech)
+        y, n_samples = trimmed, len(y)
+    cache_key = VerdictCache.make_key(y, sr, language) if with_cache_key else None
+    features = extract_features(y, sr)
+    if speech is not None:
+        features.update(speech_features(n_samples, sr, speech))
+    return cache_key, features
+
+
+def speech_features(n_samples: int, sr: int, speech: dict):
+    """
+    VAD fields added to the features of a clip that was trimmed to its speech.
+    """
+    return {
+        "has_speech": True,
+        "speech_ratio": speech["speech_ratio"],
+        "clip_duration": float(n_samples / sr) if sr else 0.0,
+    }
+
+
+def no_speech_features(n_samples: int, sr: int, speech: dict):
+    """
+    Stand-in feature dict for clips the VAD found no speech in.
+    """
+    return {
+        "duration": float(n_samples / sr) if sr else 0.0,
+        "has_speech": False,
+        "speech_ratio": speech["speech_ratio"],
+    }
+
+
+def prepare_file(audio_file, language: str, with_cache_key: bool = True, vad: dict = None):
+    """
+    Streams a seekable audio file (or path) through the decoder block by block,
+    hashing the PCM for the verdict cache in the same pass.
+
+    With ``vad`` a first pass over the file finds the speech region, as
+    ``prepare_payload`` does in memory, and only that region is hashed and analysed.
+    """
+    speech = None
+    start, end = 0, None
+    if vad is not None:
+        speech, sr, n_samples = stream_speech(audio_file, **vad)
+        if not speech["has_speech"]:
+            return None, no_speech_features(n_samples, sr, speech)
+        start, end = speech["start"], speech["end"]
+        if hasattr(audio_file, "seek"):
+            audio_file.seek(0)
+    digest = VerdictCache.new_hasher() if with_cache_key else None
+    on_block = (lambda y: VerdictCache.update_hasher(digest, y)) if digest is not None else None
+    features, sr = stream_features(audio_file, on_block=on_block, start=start, end=end)
+    cache_key = VerdictCache.finish_key(digest, sr, language) if digest is not None else None
+    if speech is not None:
+        features.update(speech_features(n_samples, sr, speech))
+    return cache_key, features
+
+
+def create_cpu_pool(max_workers: int = None):
+    """
+    Process pool for spreading decoding across cores, falling back to threads on
+    platforms that cannot start worker processes (e.g. some serverless runtimes).
+
+    Workers are spawned rather than forked: the pool is created after the inference
+    and decode threads exist, and a forked child could inherit one of their locks
+    held and deadlock on it.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    try:
+        return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+    except (OSError, NotImplementedError, ImportError, ValueError) as e:
+        print(f"Process pool unavailable ({e}), decoding batches on threads instead")
+        return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="decode")
@@ -0,0 +1,361 @@
+import asyncio
+import struct
+import time
+from collections import deque
+
+import numpy as np
+
+from preprocessing import FeatureAccumulator
+
+
+class LiveSession:
+    def __init__(self, window_seconds: float = 4.0, hop_seconds: float = 2.0, ema_alpha: float = 0.5):
+        """
+        Per-connection state for the live monitor.
+
+        Incoming PCM is kept in a preallocated ring buffer and folded into feature
+        accumulators as it arrives, one accumulator per hop. Every ``hop_seconds``
+        of new audio the features of the last ``window_seconds`` are ready for
+        classification, and verdicts are smoothed with an exponential moving
+        average so alerts do not flicker from one window to the next.
+
+        Args:
+            window_seconds: length of audio each verdict is based on.
+            hop_seconds: new audio needed before the next verdict.
+            ema_alpha: weight of the newest verdict in the moving average (1 disables smoothing).
+        """
+        self.window_seconds = float(window_seconds)
+        self.hop_seconds = min(float(hop_seconds), self.window_seconds)
+        self.ema_alpha = min(1.0, max(0.0, float(ema_alpha)))
+        self.segments_per_window = max(1, int(round(self.window_seconds / self.hop_seconds)))
+        self.sr = None
+        self.ring = None
+        self.ring_pos = 0
+        self.ring_filled = 0
+        self.segments = deque(maxlen=self.segments_per_window)
+        self.current = None
+        self.hop_samples = 0
+        self.total_samples = 0
+        self.windows_ready = 0
+        self.gaps = 0
+        self.ema_ai_probability = None
+        # Declared by the client's messages; reported with each verdict like /detect's detected_language
+        self.language = LANGUAGES[0]
+
+    def _reset(self, sr: int):
+        self.sr = int(sr)
+        self.ring = np.zeros(max(1, int(self.window_seconds * self.sr)), dtype=np.float32)
+        self.hop_samples = max(1, int(self.hop_seconds * self.sr))
+        self._restart_window()
+        # Counted in samples at the session's rate, so they restart with it
+        self.total_samples = 0
+        self.windows_ready = 0
+        self.ema_ai_probability = None
+
+    def _restart_window(self):
+        # Drops the buffered audio and statistics, so the next window starts afresh
+        self.ring_pos = 0
+        self.ring_filled = 0
+        self.segments.clear()
+        self.current = FeatureAccumulator(self.sr)
+
+    def _write_ring(self, y):
+        capacity = len(self.ring)
+        if len(y) >= capacity:
+            self.ring[:] = y[-capacity:]
+            self.ring_pos = 0
+            self.ring_filled = capacity
+            return
+        end = self.ring_pos + len(y)
+        if end <= capacity:
+            self.ring[self.ring_pos:end] = y
+        else:
+            split = capacity - self.ring_pos
+            self.ring[self.ring_pos:] = y[:split]
+            self.ring[:end - capacity] = y[split:]
+        self.ring_pos = end % capacity
+        self.ring_filled = min(capacity, self.ring_filled + len(y))
+
+    def push(self, y, sr: int, gap: bool = False):
+        """
+        Adds a chunk of mono PCM. Returns the features of the current window when a
+        hop boundary was crossed, otherwise None. A change of sample rate restarts
+        the session; ``gap`` (audio was lost before this chunk) restarts the window,
+        so no window spans the discontinuity.
+        """
+        if self.sr != int(sr):
+            self._reset(sr)
+        elif gap:
+            self._restart_window()
+            self.gaps += 1
+        y = np.asarray(y, dtype=np.float32)
+        self._write_ring(y)
+        self.total_samples += len(y)
+
+        ready = False
+        offset = 0
+        while offset < len(y):
+            # Fill the current hop segment, closing it when it reaches hop length
+            take = min(len(y) - offset, self.hop_samples - self.current.n_samples)
+            self.current.update(y[offset:offset + take])
+            offset += take
+            if self.current.n_samples >= self.hop_samples:
+                self.segments.append(self.current)
+                self.current = self.current.continuation()
+                ready = True
+
+        if not ready:
+            return None
+        self.windows_ready += 1
+        return FeatureAccumulator.combine(self.segments)
+
+    def window_audio(self):
+        """
+        Copy of the most recent window of PCM, oldest sample first.
+        """
+        if self.ring is None:
+            return np.empty(0, dtype=np.float32)
+        if self.ring_filled < len(self.ring):
+            return self.ring[:self.ring_filled].copy()
+        return np.concatenate((self.ring[self.ring_pos:], self.ring[:self.ring_pos]))
+
+    def smooth(self, result: dict):
+        """
+        Folds a window verdict into the moving average and returns the smoothed verdict.
+        """
+        classification = result.get("classification")
+        smoothed = dict(result)
+        smoothed["raw_classification"] = classification
+        smoothed["raw_confidence_score"] = result.get("confidence_score")
+        if classification not in ("AI-Generated", "Human"):
+            # Unknown verdicts carry no evidence either way
+            if self.ema_ai_probability is None:
+                return smoothed
+        else:
+            confidence = float(result.get("confidence_score", 0.5))
+            ai_probability = confidence if classification == "AI-Generated" else 1.0 - confidence
+            if self.ema_ai_probability is None:
+                self.ema_ai_probability = ai_probability
+            else:
+                self.ema_ai_probability = (
+                    self.ema_alpha * ai_probability + (1.0 - self.ema_alpha) * self.ema_ai_probability
+                )
+        p = self.ema_ai_probability
+        smoothed["classification"] = "AI-Generated" if p >= 0.5 else "Human"
+        smoothed["confidence_score"] = round(max(p, 1.0 - p), 4)
+        return smoothed
+
+    def stats(self):
+        return {
+            "window_seconds": self.window_seconds,
+            "hop_seconds": self.hop_seconds,
+            "buffered_seconds": round(self.ring_filled / self.sr, 3) if self.sr else 0.0,
+            "received_seconds": round(self.total_samples / self.sr, 3) if self.sr else 0.0,
+            "windows": self.windows_ready,
+            "gaps": self.gaps,
+        }
+
+
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_COALESCE = "coalesce"
+
+
+class ChunkQueue:
+    def __init__(self, maxsize: int = 4, policy: str = OVERFLOW_DROP_OLDEST, coalesce_max: int = 4,
+                 max_age_seconds: float = 10.0):
+        """
+        Bounded queue of decoded audio chunks between a live-monitor connection's
+        receiver and its analysis worker. ``put`` never blocks the receiver.
+
+        Args:
+            maxsize: chunks held before the overflow policy applies.
+            policy: ``drop_oldest`` discards the oldest queued chunk; ``coalesce``
+                appends the new audio to the newest queued chunk (up to
+                ``coalesce_max`` chunks merged into one) and only drops once that
+                limit is reached.
+            max_age_seconds: chunks waiting longer than this are dropped as stale.
+
+        Whenever a chunk is dropped, the chunk that followed it is marked with
+        ``gap`` so the session does not join the audio on either side.
+        """
+        if policy not in (OVERFLOW_DROP_OLDEST, OVERFLOW_COALESCE):
+            raise ValueError(f"Unknown overflow policy '{policy}'")
+        self.maxsize = max(1, int(maxsize))
+        self.policy = policy
+        self.coalesce_max = max(1, int(coalesce_max))
+        self.max_age_seconds = float(max_age_seconds)
+        self._chunks = deque()
+        self._ready = asyncio.Event()
+        # A chunk was dropped and nothing queued after it yet carries the gap mark
+        self._gap_pending = False
+        self.received = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.stale = 0
+
+    @staticmethod
+    def make_chunk(y, sr: int, sequence=None, decode_seconds: float = 0.0, features: dict = None,
+                   language: str = None):
+        """
+        Queue entry for decoded audio, or with ``features`` (and ``y`` None) for a
+        window the client already extracted features from. ``language`` is the
+        language the client declared for the audio, if any.
+        """
+        return {
+            "y": y,
+            "sr": int(sr),
+            "sequence": sequence,
+            "received_at": time.monotonic(),
+            "decode_seconds": decode_seconds,
+            "features": features,
+            "language": language,
+            "count": 1,
+            "gap": False,
+        }
+
+    def _drop_oldest(self):
+        self._chunks.popleft()
+        if self._chunks:
+            self._chunks[0]["gap"] = True
+        else:
+            self._gap_pending = True
+
+    def put(self, chunk: dict):
+        self.received += 1
+        if len(self._chunks) >= self.maxsize:
+            last = self._chunks[-1]
+            if (self.policy == OVERFLOW_COALESCE and last["sr"] == chunk["sr"]
+                    and last["y"] is not None and chunk["y"] is not None
+                    and last["count"] + chunk["count"] <= self.coalesce_max):
+                last["y"] = np.concatenate((last["y"], chunk["y"]))
+                last["sequence"] = chunk["sequence"]
+                last["language"] = chunk["language"] or last["language"]
+                last["count"] += chunk["count"]
+                last["decode_seconds"] += chunk["decode_seconds"]
+                self.coalesced += 1
+                return
+            self._drop_oldest()
+            self.dropped += 1
+        if self._gap_pending:
+            chunk["gap"] = True
+            self._gap_pending = False
+        self._chunks.append(chunk)
+        self._ready.set()
+
+    def _drop_stale(self):
+        cutoff = time.monotonic() - self.max_age_seconds
+        while self._chunks and self._chunks[0]["received_at"] < cutoff:
+            self._drop_oldest()
+            self.stale += 1
+
+    async def get(self):
+        """
+        Waits for the next fresh chunk.
+        """
+        while True:
+            self._drop_stale()
+            if self._chunks:
+                chunk = self._chunks.popleft()
+                if not self._chunks:
+                    self._ready.clear()
+                return chunk
+            self._ready.clear()
+            await self._ready.wait()
+
+    def drain(self):
+        """
+        Removes and returns every fresh chunk queued right now.
+        """
+        self._drop_stale()
+        chunks = list(self._chunks)
+        self._chunks.clear()
+        self._ready.clear()
+        return chunks
+
+    def __len__(self):
+        return len(self._chunks)
+
+    def stats(self):
+        return {
+            "queue_depth": len(self._chunks),
+            "received_chunks": self.received,
+            "dropped_chunks": self.dropped + self.stale,
+            "coalesced_chunks": self.coalesced,
+        }
+
+# Binary frame protocol for /ws/live-monitor, negotiated via the WebSocket subprotocol.
+# Each binary message is a fixed 12-byte little-endian header followed by the audio bytes:
+#   uint8 version | uint8 encoding | uint8 language id | uint8 flags (reserved)
+#   uint32 sequence number | uint32 sample rate (ignored for ENCODING_CONTAINER)
+BINARY_SUBPROTOCOL = "voice-detect.binary.v1"
+FRAME_HEADER = struct.Struct("<BBBBII")
+FRAME_VERSION = 1
+
+ENCODING_CONTAINER = 0  # any format decode_audio understands (WAV, FLAC, OGG, ...)
+ENCODING_PCM_S16LE = 1
+ENCODING_PCM_F32LE = 2
+
+LANGUAGES = ["English", "Tamil", "Hindi", "Malayalam", "Telugu", "Kannada"]
+
+
+def decode_binary_frame(data: bytes):
+    """
+    Splits a binary live-monitor message into its header fields and payload.
+
+    Returns:
+        tuple: (header dict with version/encoding/language/sequence/sample_rate, payload memoryview)
+    """
+    if len(data) < FRAME_HEADER.size:
+        raise ValueError("Binary frame is shorter than its header")
+    version, encoding, language_id, _, sequence, sample_rate = FRAME_HEADER.unpack_from(data)
+    if version != FRAME_VERSION:
+        raise ValueError(f"Unsupported binary frame version {version}")
+    if language_id >= len(LANGUAGES):
+        raise ValueError(f"Unknown language id {language_id}")
+    header = {
+        "version": version,
+        "encoding": encoding,
+        "language": LANGUAGES[language_id],
+        "sequence": sequence,
+        "sample_rate": sample_rate,
+    }
+    return header, memoryview(data)[FRAME_HEADER.size:]
+
+
+def frame_pcm(header: dict, payload):
+    """
+    Views raw PCM payloads as mono float32 without a container decode.
+    Returns None for ENCODING_CONTAINER payloads, which need ``load_audio``.
+    """
+    encoding = header["encoding"]
+    if encoding == ENCODING_CONTAINER:
+        return None
+    if not header["sample_rate"]:
+        raise ValueError("Raw PCM frames must carry a sample rate")
+    if encoding == ENCODING_PCM_S16LE:
+        samples = np.frombuffer(payload, dtype="<i2", count=len(payload) // 2)
+        y = samples.astype(np.float32)
+        y *= 1.0 / 32768.0
+        return y
+    if encoding == ENCODING_PCM_F32LE:
+        return require_finite(np.frombuffer(payload, dtype="<f4", count=len(payload) // 4))
+    raise ValueError(f"Unsupported frame encoding {encoding}")
+
+
+def require_finite(y):
+    """
+    Rejects audio with NaN or Infinity samples, which would poison every later
+    window's features once folded into the session.
+    """
+    if not np.isfinite(y).all():
+        raise ValueError("Audio contains NaN or infinite samples")
+    return y
+
+
+def check_language(language):
+    """
+    Validates a live-monitor message's language name; None keeps the session's language.
+    """
+    if language is not None and language not in LANGUAGES:
+        raise ValueError(f"Unsupported language '{language}'")
+    return language
@@ -0,0 +1,308 @@
+import argparse
+import asyncio
+import base64
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+import soundfile as sf
+import websockets
+
+from benchmark import synthetic_voice
+from live import BINARY_SUBPROTOCOL, ENCODING_PCM_S16LE, FRAME_HEADER, FRAME_VERSION, LANGUAGES
+
+# Step is saturated when it falls this far short of its target rate, or the event-loop probe slows down this much
+SATURATION_THROUGHPUT_RATIO = 0.9
+SATURATION_PROBE_P95_MS = 50.0
+
+
+def percentiles(samples):
+    if not samples:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+    p50, p95, p99 = np.percentile(np.asarray(samples) * 1000.0, [50, 95, 99])
+    return {"p50_ms": round(float(p50), 2), "p95_ms": round(float(p95), 2), "p99_ms": round(float(p99), 2)}
+
+
+class ClipFactory:
+    def __init__(self, clip_seconds, sr: int = 16000, seed: int = 0):
+        """
+        Pre-encoded WAV clips of each size. ``payload`` patches a few random samples
+        per request so every clip is distinct and the verdict cache never answers.
+        """
+        self.rng = random.Random(seed)
+        self.clips = []
+        for i, seconds in enumerate(clip_seconds):
+            buffer = io.BytesIO()
+            sf.write(buffer, synthetic_voice(seconds, sr, seed=i, vary_pitch=True), sr, format="WAV", subtype="PCM_16")
+            self.clips.append((seconds, bytearray(buffer.getvalue())))
+
+    def payload(self):
+        seconds, wav = self.rng.choice(self.clips)
+        clip = bytearray(wav)
+        for _ in range(4):
+            # Data starts after the 44-byte header; keep samples 2-byte aligned
+            offset = 44 + 2 * self.rng.randrange((len(clip) - 44) // 2)
+            clip[offset:offset + 2] = self.rng.randrange(-3000, 3000).to_bytes(2, "little", signed=True)
+        return seconds, {
+            "audio_base64": base64.b64encode(bytes(clip)).decode("ascii"),
+            "language": self.rng.choice(LANGUAGES),
+        }
+
+
+async def detect_step(client, clips, rate: float, duration: float, max_in_flight: int):
+    """
+    Open-loop load: requests start at ``rate`` per second whether or not earlier
+    ones finished (up to ``max_in_flight``), as real independent clients would.
+    """
+    latencies, statuses, errors, rejected = [], {}, 0, 0
+    by_size = {}
+    in_flight = asyncio.Semaphore(max_in_flight)
+    skipped = 0
+
+    async def one(seconds, payload):
+        nonlocal errors, rejected
+        try:
+            start = time.perf_counter()
+            response = await client.post("/detect", json=payload)
+            elapsed = time.perf_counter() - start
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code == 200:
+                latencies.append(elapsed)
+                by_size.setdefault(seconds, []).append(elapsed)
+            elif response.status_code == 429:
+                # Turned away by admission control: a fast, deliberate rejection rather than a failure
+                rejected += 1
+            else:
+                errors += 1
+        except httpx.HTTPError as e:
+            errors += 1
+            statuses[type(e).__name__] = statuses.get(type(e).__name__, 0) + 1
+        finally:
+            in_flight.release()
+
+    tasks = []
+    interval = 1.0 / rate
+    start = time.perf_counter()
+    next_at = start
+    while next_at - start < duration:
+        await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+        next_at += interval
+        if in_flight.locked():
+            # The client-side cap was hit; counted separately from server errors
+            skipped += 1
+            continue
+        await in_flight.acquire()
+        tasks.append(asyncio.ensure_future(one(*clips.payload())))
+    await asyncio.gather(*tasks)
+    wall = time.perf_counter() - start
+    return {
+        "sent": len(tasks),
+        "skipped": skipped,
+        "achieved_rps": round(len(latencies) / wall, 2),
+        **percentiles(latencies),
+        "errors": errors,
+        "error_rate": round(errors / len(tasks), 4) if tasks else 0.0,
+        "rejected": rejected,
+        "rejected_rate": round(rejected / len(tasks), 4) if tasks else 0.0,
+        "statuses": {str(k): v for k, v in statuses.items()},
+        "p95_ms_by_clip_seconds": {str(k): percentiles(v)["p95_ms"] for k, v in sorted(by_size.items())},
+    }
+
+
+async def live_session(ws_url: str, duration: float, sr: int, frame_seconds: float, seed: int):
+    """
+    One live-monitor client streaming Int16 PCM frames in real time.
+    """
+    pcm = (synthetic_voice(duration, sr, seed=seed, vary_pitch=True) * 32767).astype("<i2")
+    frame_samples = int(frame_seconds * sr)
+    lags, messages = [], {}
+    async with websockets.connect(ws_url, subprotocols=[BINARY_SUBPROTOCOL], max_size=None) as ws:
+
+        async def receive():
+            async for raw in ws:
+                message = json.loads(raw)
+                messages[message["type"]] = messages.get(message["type"], 0) + 1
+                if message.get("lag_ms") is not None:
+                    lags.append(message["lag_ms"] / 1000.0)
+
+        receiver = asyncio.ensure_future(receive())
+        start = time.perf_counter()
+        for sequence, offset in enumerate(range(0, len(pcm), frame_samples)):
+            await asyncio.sleep(max(0.0, start + sequence * frame_seconds - time.perf_counter()))
+            header = FRAME_HEADER.pack(FRAME_VERSION, ENCODING_PCM_S16LE, seed % len(LANGUAGES), 0, sequence, sr)
+            await ws.send(header + pcm[offset:offset + frame_samples].tobytes())
+        # Let the last verdicts arrive
+        await asyncio.sleep(1.0)
+        receiver.cancel()
+    return lags, messages
+
+
+async def live_step(ws_url: str, sessions: int, duration: float, sr: int = 16000, frame_seconds: float = 0.5):
+    if sessions <= 0:
+        return None
+    results = await asyncio.gather(
+        *(live_session(ws_url, duration, sr, frame_seconds, seed) for seed in range(sessions)),
+        return_exceptions=True,
+    )
+    lags, messages, failures = [], {}, 0
+    for result in results:
+        if isinstance(result, Exception):
+            failures += 1
+            continue
+        session_lags, session_messages = result
+        lags.extend(session_lags)
+        for kind, count in session_messages.items():
+            messages[kind] = messages.get(kind, 0) + count
+    return {"sessions": sessions, "failed_sessions": failures, "messages": messages,
+            **{f"lag_{k}": v for k, v in percentiles(lags).items()}}
+
+
+async def probe_loop(client, stop: asyncio.Event, interval: float = 0.1):
+    """
+    Times a trivial async endpoint while load runs; its latency is a proxy for how
+    long the server's event loop takes to get to a new request.
+    """
+    samples = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            await client.get("/", params={"format": "json"})
+            samples.append(time.perf_counter() - start)
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(interval)
+    return samples
+
+
+async def client_lag(stop: asyncio.Event, interval: float = 0.01):
+    """
+    Measures how late this process wakes up from sleeps, to tell a saturated load
+    generator apart from a saturated server.
+    """
+    lags = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, time.perf_counter() - start - interval))
+    return lags
+
+
+async def run(args):
+    clips = ClipFactory(args.clip_seconds, seed=args.seed)
+    ws_url = args.url.replace("http", "ws", 1).rstrip("/") + "/ws/live-monitor"
+    limits = httpx.Limits(max_connections=args.max_in_flight + 8, max_keepalive_connections=args.max_in_flight + 8)
+    # Last rate that met the SLO before the first one that did not
+    steps, sustained, saturated = [], None, None
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout) as client:
+        await client.post("/detect", json=clips.payload()[1])  # warm-up
+        print(f"{'target':>7} {'achieved':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'429s':>7} "
+              f"{'probe p95':>10} {'ws lag p95':>11} {'client lag':>11}")
+        for rate in args.rates:
+            stop = asyncio.Event()
+            probe = asyncio.ensure_future(probe_loop(client, stop))
+            lag = asyncio.ensure_future(client_lag(stop))
+            detect, live = await asyncio.gather(
+                detect_step(client, clips, rate, args.duration, args.max_in_flight),
+                live_step(ws_url, args.ws_sessions, args.duration),
+            )
+            stop.set()
+            probe_p95 = percentiles(await probe)["p95_ms"]
+            client_p99 = percentiles(await lag)["p99_ms"]
+            step = {"target_rps": rate, **detect, "probe_p95_ms": probe_p95, "client_lag_p99_ms": client_p99,
+                    "live": live}
+            steps.append(step)
+            ws_lag = live["lag_p95_ms"] if live and live["lag_p95_ms"] is not None else float("nan")
+            print(f"{rate:>7g} {detect['achieved_rps']:>9.1f} {detect['p50_ms'] or 0:>8.1f} {detect['p95_ms'] or 0:>8.1f} "
+                  f"{detect['p99_ms'] or 0:>8.1f} {detect['error_rate']:>7.1%} {detect['rejected_rate']:>7.1%} {probe_p95 or 0:>10.1f} "
+                  f"{ws_lag:>11.1f} {client_p99 or 0:>11.1f}")
+            if saturated is None:
+                if (detect["achieved_rps"] < SATURATION_THROUGHPUT_RATIO * rate
+                        or (probe_p95 or 0) > SATURATION_PROBE_P95_MS):
+                    saturated = rate
+                else:
+                    sustained = rate
+        if sustained is None:
+            print("saturation point: no tested rate was sustained")
+        elif saturated is None:
+            print(f"saturation point: not reached, {sustained:g} req/s sustained")
+        else:
+            print(f"saturation point: {sustained:g} req/s (the next rate, {saturated:g} req/s, was not sustained)")
+        if any((s["client_lag_p99_ms"] or 0) > 20 for s in steps):
+            print("warning: the load generator's own event loop lagged; results may understate the server")
+    return {"url": args.url, "clip_seconds": args.clip_seconds, "ws_sessions": args.ws_sessions,
+            "duration_seconds": args.duration, "saturation_rps": sustained,
+            "first_unsustained_rps": saturated, "steps": steps}
+
+
+def spawn_stack(args):
+    """
+    Starts the fake Gemini endpoint and the API server pointed at it.
+    """
+    env = dict(os.environ)
+    env.update({
+        "GEMINI_API_KEY": env.get("GEMINI_API_KEY", "loadtest"),
+        "GEMINI_API_ENDPOINT": f"http://127.0.0.1:{args.fake_port}",
+        "GEMINI_ASYNC_CLIENT": "true",
+    })
+    here = os.path.dirname(os.path.abspath(__file__))
+    fake = subprocess.Popen(
+        [sys.executable, "fake_gemini.py", "--port", str(args.fake_port), "--latency-ms", str(args.gemini_latency_ms),
+         "--error-rate", str(args.gemini_error_rate)],
+        cwd=here, env=env,
+    )
+    port = httpx.URL(args.url).port or 8000
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=here, env=env,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{args.url.rstrip('/')}/health", timeout=1).status_code == 200:
+                return [server, fake]
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    for process in (server, fake):
+        process.terminate()
+    raise RuntimeError("API server did not become healthy within 60 seconds")
+
+
+def parse_floats(value: str):
+    return [float(v) for v in value.split(",") if v.strip()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent load generator for /detect and /ws/live-monitor.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="API base URL")
+    parser.add_argument("--rates", type=parse_floats, default=[5, 10, 20, 50, 100], help="Comma-separated req/s steps")
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds per step")
+    parser.add_argument("--clip-seconds", type=parse_floats, default=[1, 3, 10], help="Comma-separated clip lengths")
+    parser.add_argument("--ws-sessions", type=int, default=4, help="Live-monitor sessions streaming during each step")
+    parser.add_argument("--max-in-flight", type=int, default=512, help="Client-side cap on concurrent requests")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--spawn", action="store_true", help="Start the API and a fake Gemini endpoint locally")
+    parser.add_argument("--fake-port", type=int, default=8765)
+    parser.add_argument("--gemini-latency-ms", type=float, default=300.0, help="Fake Gemini delay (with --spawn)")
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0, help="Fake Gemini failure rate (with --spawn)")
+    parser.add_argument("--json", dest="json_path", help="Write the latency/throughput curve to this JSON file")
+    args = parser.parse_args()
+
+    processes = spawn_stack(args) if args.spawn else []
+    try:
+        report = asyncio.run(run(args))
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"results written to {args.json_path}")
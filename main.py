@@ -1,13 +1,56 @@
 from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Request
-from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
+from starlette.datastructures import UploadFile
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response
 from pydantic import BaseModel, Field
-from typing import Optional
-from preprocessing import decode_audio, extract_features
-from model import VoiceClassifier
+from typing import List, Optional
+from preprocessing import (
+    HOP_LENGTH,
+    N_FFT,
+    VAD_FRAME_SECONDS,
+    VAD_MAX_ZCR,
+    VAD_PAD_SECONDS,
+    VAD_TOP_DB,
+    detect_speech,
+    extract_features,
+    load_audio,
+    trim_silence,
+)
+from model import ClassifierUnavailable, LazyClassifier, VoiceClassifier
+from inference import (
+    InferenceExecutor,
+    InferenceQueueFull,
+    InferenceTimeout,
+    create_cpu_pool,
+    no_speech_features,
+    prepare_file,
+    prepare_payload,
+    run_cpu_bound,
+    speech_features,
+)
+from cache import VerdictCache
+from batching import MicroBatcher
+from fast_path import FastPathClassifier
+from resilience import GEMINI_TIMEOUTS, CircuitBreaker, ResilientPredictor
+from admission import AdmissionController, AdmissionMiddleware, Throttled, client_address
+from live import BINARY_SUBPROTOCOL, ChunkQueue, LiveSession, check_language, decode_binary_frame, frame_pcm, require_finite
+from static_assets import StaticAssetStore
+from metrics import REGISTRY, VERDICTS, WEBSOCKET_CONNECTIONS, MetricsMiddleware, start_timings, timed_stage
 from dotenv import load_dotenv
 import uvicorn
 import json
 import asyncio
+import math
+import base64
+import hashlib
+import io
+import os
+import tempfile
+import time
+import wave
+
+import numpy as np
 
 # Load environment variables from .env file
 load_dotenv()
@@ -19,9 +62,237 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Admission control: a global concurrency limit plus token buckets for the model quota and
+# per client, so overload is answered with fast 429s (Retry-After) instead of slow failures
+admission = AdmissionController(
+    max_concurrent=int(os.getenv("ADMISSION_MAX_CONCURRENT", "64")),
+    client_rate=float(os.getenv("RATE_LIMIT_PER_MINUTE", "0")) / 60.0,
+    client_burst=float(os.getenv("RATE_LIMIT_BURST", "10")),
+    global_rate=float(os.getenv("RATE_LIMIT_GLOBAL_PER_MINUTE", "0")) / 60.0,
+    global_burst=float(os.getenv("RATE_LIMIT_GLOBAL_BURST")) if os.getenv("RATE_LIMIT_GLOBAL_BURST") else None,
+)
+TRUST_FORWARDED_FOR = os.getenv("TRUST_FORWARDED_FOR", "false").lower() in ("1", "true", "yes")
+ADMISSION_PATHS = ("/detect", "/detect/upload", "/detect/features", "/detect/batch")
+
+# Added before the metrics middleware so 429s still show up in the request metrics
+app.add_middleware(AdmissionMiddleware, controller=admission, paths=ADMISSION_PATHS,
+                   trust_forwarded=TRUST_FORWARDED_FOR)
+
+# Request latency and in-flight gauges; paths outside the app's routes share one label
+_route_paths = None
+
+def route_paths():
+    global _route_paths
+    if _route_paths is None:
+        _route_paths = {getattr(route, "path", None) for route in app.routes}
+    return _route_paths
+
+app.add_middleware(MetricsMiddleware, paths=route_paths)
+
 # Initialize the classifier with Gemini API
-# API key should be set in GEMINI_API_KEY environment variable
-classifier = VoiceClassifier()
+# API key should be set in GEMINI_API_KEY environment variable.
+# It is built on first use, so cold starts and /health do not pay for the Gemini client.
+classifier = LazyClassifier(VoiceClassifier)
+
+# Gemini calls are blocking, so they run on a bounded worker pool instead of the event loop
+inference = InferenceExecutor(
+    classifier,
+    max_concurrency=int(os.getenv("INFERENCE_MAX_CONCURRENCY", "4")),
+    max_queue=int(os.getenv("INFERENCE_MAX_QUEUE", "32")),
+    timeout=float(os.getenv("INFERENCE_TIMEOUT_SECONDS", "30")),
+    use_async=os.getenv("GEMINI_ASYNC_CLIENT", "false").lower() in ("1", "true", "yes"),
+)
+
+def local_fallback(features: dict):
+    """
+    Verdict given while Gemini is failing or out of budget: the fast-path model's
+    best guess when weights are loaded, otherwise an immediate "Unknown".
+    """
+    if fast_path is not None:
+        return fast_path.fallback(features)
+    return {
+        "classification": "Unknown",
+        "confidence_score": 0.0,
+        "explanation": "Gemini is currently unavailable and no local classifier is configured.",
+        "tier": "fallback",
+    }
+
+# Each prediction gets a latency budget for Gemini, retries and hedged calls included;
+# a circuit breaker answers from the local fallback while Gemini keeps failing
+resilient = ResilientPredictor(
+    lambda features, timeout: inference.predict(features, timeout=timeout, raise_errors=True),
+    lambda features_list, timeout: inference.predict_batch(features_list, timeout=timeout, raise_errors=True),
+    local_fallback,
+    budget=float(os.getenv("GEMINI_BUDGET_SECONDS", "15")),
+    max_retries=int(os.getenv("GEMINI_MAX_RETRIES", "2")),
+    backoff_base=float(os.getenv("GEMINI_RETRY_BACKOFF_MS", "200")) / 1000.0,
+    backoff_max=float(os.getenv("GEMINI_RETRY_BACKOFF_MAX_MS", "2000")) / 1000.0,
+    hedge=os.getenv("GEMINI_HEDGE", "false").lower() in ("1", "true", "yes"),
+    hedge_quantile=float(os.getenv("GEMINI_HEDGE_QUANTILE", "0.95")),
+    breaker=CircuitBreaker(
+        failure_rate=float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5")),
+        min_calls=int(os.getenv("CIRCUIT_MIN_CALLS", "5")),
+        window=int(os.getenv("CIRCUIT_WINDOW", "20")),
+        reset_timeout=float(os.getenv("CIRCUIT_RESET_SECONDS", "30")),
+    ),
+    passthrough=(InferenceQueueFull, ClassifierUnavailable),
+    timeouts=GEMINI_TIMEOUTS + (InferenceTimeout,),
+)
+
+# Concurrent predictions arriving within a short window share one Gemini prompt
+BATCH_MAX_SIZE = int(os.getenv("GEMINI_BATCH_MAX_SIZE", "1"))
+batcher = None
+if BATCH_MAX_SIZE > 1:
+    batcher = MicroBatcher(
+        resilient.predict_batch,
+        resilient.predict,
+        max_batch_size=BATCH_MAX_SIZE,
+        max_wait_ms=float(os.getenv("GEMINI_BATCH_MAX_WAIT_MS", "20")),
+    )
+
+# Local classifier that answers clear-cut clips in-process and escalates the rest to Gemini
+FAST_PATH_WEIGHTS = os.getenv("FAST_PATH_WEIGHTS")
+fast_path = None
+if FAST_PATH_WEIGHTS:
+    fast_path = FastPathClassifier.load(
+        FAST_PATH_WEIGHTS,
+        threshold=float(os.getenv("FAST_PATH_THRESHOLD", "0.9")),
+    )
+
+async def predict_features(features: dict):
+    """
+    Classifies one feature set: the local fast path answers when it is confident,
+    otherwise Gemini is called (through the micro-batcher when it is enabled) and,
+    if it fails or runs out of budget, the local fallback answers. The result's
+    ``tier`` says which one answered.
+    """
+    with timed_stage("model"):
+        if fast_path is not None:
+            result = fast_path.predict(features)
+            if result is not None:
+                return result
+        if batcher is not None:
+            result = await batcher.submit(features)
+        else:
+            result = await resilient.predict(features)
+        return {"tier": "gemini", **result}
+
+# Worker processes used by /detect/batch to decode clips in parallel, created on first use
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "32"))
+BATCH_DECODE_WORKERS = int(os.getenv("BATCH_DECODE_WORKERS", "0")) or None
+_decode_pool = None
+
+def get_decode_pool():
+    global _decode_pool
+    if _decode_pool is None:
+        _decode_pool = create_cpu_pool(BATCH_DECODE_WORKERS)
+    return _decode_pool
+
+@app.on_event("shutdown")
+async def close_inference():
+    inference.shutdown()
+    if _decode_pool is not None:
+        _decode_pool.shutdown(wait=False)
+    await classifier.aclose()
+
+# Base64 payloads at least this long are decoded off the event loop; binary payloads
+# are measured in bytes against the same threshold converted from base64 characters
+OFFLOAD_PAYLOAD_CHARS = int(os.getenv("INFERENCE_OFFLOAD_PAYLOAD_CHARS", "262144"))
+OFFLOAD_PAYLOAD_BYTES = OFFLOAD_PAYLOAD_CHARS * 3 // 4
+
+# Decoded PCM at least this many samples long is analysed off the event loop; by default
+# as much audio as an OFFLOAD_PAYLOAD_BYTES payload of 16-bit samples
+OFFLOAD_PCM_SAMPLES = int(os.getenv("INFERENCE_OFFLOAD_PCM_SAMPLES", str(OFFLOAD_PAYLOAD_BYTES // 2)))
+
+# Base64 payloads at least this long are decoded block by block to bound peak memory
+STREAMING_PAYLOAD_CHARS = int(os.getenv("STREAMING_PAYLOAD_CHARS", "8388608"))
+
+# Largest raw body accepted by /detect/upload; bodies are spooled to disk past UPLOAD_SPOOL_BYTES
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(50 * 1024 * 1024)))
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", str(1024 * 1024)))
+
+# Verdicts keyed on the decoded PCM, so resubmitted clips skip feature extraction and Gemini
+verdict_cache = VerdictCache(
+    max_entries=int(os.getenv("VERDICT_CACHE_MAX_ENTRIES", "1024")),
+    ttl_seconds=float(os.getenv("VERDICT_CACHE_TTL_SECONDS", "3600")),
+)
+
+async def run_stage(offload: bool, fn, *args, stage: Optional[str] = None):
+    """
+    Runs a CPU-bound pipeline stage, on a worker thread when the payload is large.
+    With ``stage`` its duration is recorded in the stage latency histogram and the
+    current request's timings.
+    """
+    if stage is None:
+        return await run_cpu_bound(fn, *args) if offload else fn(*args)
+    with timed_stage(stage):
+        return await run_cpu_bound(fn, *args) if offload else fn(*args)
+
+# Live monitor: verdicts cover the last LIVE_WINDOW_SECONDS and are refreshed every LIVE_HOP_SECONDS
+LIVE_WINDOW_SECONDS = float(os.getenv("LIVE_WINDOW_SECONDS", "4"))
+LIVE_HOP_SECONDS = float(os.getenv("LIVE_HOP_SECONDS", "2"))
+LIVE_EMA_ALPHA = float(os.getenv("LIVE_EMA_ALPHA", "0.5"))
+# Chunks buffered per connection while a prediction runs, and what happens when the buffer is full
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "4"))
+LIVE_OVERFLOW_POLICY = os.getenv("LIVE_OVERFLOW_POLICY", "drop_oldest")
+LIVE_COALESCE_MAX = int(os.getenv("LIVE_COALESCE_MAX", "4"))
+LIVE_MAX_CHUNK_AGE_SECONDS = float(os.getenv("LIVE_MAX_CHUNK_AGE_SECONDS", "10"))
+
+# Voice activity detection: silence is trimmed and clips without speech are answered without Gemini
+VAD_ENABLED = os.getenv("VAD_ENABLED", "true").lower() in ("1", "true", "yes")
+VAD_ENERGY_FLOOR_DB = float(os.getenv("VAD_ENERGY_FLOOR_DB", "-50"))
+VAD_MIN_SPEECH_SECONDS = float(os.getenv("VAD_MIN_SPEECH_SECONDS", "0.2"))
+VAD_OPTIONS = {"energy_floor_db": VAD_ENERGY_FLOOR_DB, "min_speech_seconds": VAD_MIN_SPEECH_SECONDS} if VAD_ENABLED else None
+
+# Build the classifier and prime the audio pipeline at startup instead of on the first request
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "false").lower() in ("1", "true", "yes")
+WARMUP_SAMPLE_RATES = (16000, 44100, 48000)
+
+def warm_up():
+    """
+    Pays the one-off costs of the first request up front: builds the Gemini client
+    the configured path uses, computes the STFT bases and FFT plans for common
+    sample rates, decodes a tiny WAV and renders the compressed static pages.
+    Returns the time of each step in ms.
+    """
+    steps = {}
+
+    start = time.perf_counter()
+    try:
+        classifier.warm_up(inference.use_async)
+    except ClassifierUnavailable as e:
+        print(f"Warm-up skipped the classifier: {e}")
+    steps["classifier_ms"] = round((time.perf_counter() - start) * 1000.0, 3)
+
+    start = time.perf_counter()
+    for sr in WARMUP_SAMPLE_RATES:
+        y = (0.1 * np.sin(2 * np.pi * 220.0 * np.arange(sr) / sr)).astype(np.float32)
+        extract_features(y, sr)
+        detect_speech(y, sr)
+    steps["features_ms"] = round((time.perf_counter() - start) * 1000.0, 3)
+
+    start = time.perf_counter()
+    t = np.arange(16000, dtype=np.float32) / 16000.0
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(16000)
+        wav.writeframes((np.sin(2 * np.pi * 220.0 * t) * 3000).astype("<i2").tobytes())
+    buffer.seek(0)
+    load_audio(buffer)
+    steps["decode_ms"] = round((time.perf_counter() - start) * 1000.0, 3)
+
+    start = time.perf_counter()
+    static_assets.build_all()
+    steps["static_ms"] = round((time.perf_counter() - start) * 1000.0, 3)
+    return steps
+
+@app.on_event("startup")
+async def warm_up_on_startup():
+    if WARMUP_ON_STARTUP:
+        steps = await run_cpu_bound(warm_up)
+        print(f"Warm-up finished: {steps}")
 
 class AudioRequest(BaseModel):
     audio_base64: str = Field(..., description="Base64 encoded MP3 audio string")
@@ -33,20 +304,78 @@ class AudioResponse(BaseModel):
     explanation: str
     metadata: Optional[dict] = None
 
-@app.get("/", response_class=HTMLResponse)
-async def root(request: Request, format: str | None = None):
-    accept = request.headers.get("accept", "")
-    if format == "json" or "application/json" in accept:
-        return JSONResponse({
-            "status": "active",
-            "message": "AI Voice Detection System is running",
-            "endpoints": {
-                "detect": "/detect",
-                "docs": "/docs",
-                "app": "/app",
-                "health": "/health"
-            }
-        })
+# Upper bounds for client-computed features; centroid and rolloff are at most half the sample rate,
+# so their variances are at most its square. Every field is bounded, which also rejects NaN and Infinity.
+FEATURES_MAX_DURATION_SECONDS = float(os.getenv("FEATURES_MAX_DURATION_SECONDS", "3600"))
+FEATURES_MAX_FREQUENCY_HZ = 96000.0
+FEATURES_MAX_VARIANCE = FEATURES_MAX_FREQUENCY_HZ ** 2
+
+class AudioFeatures(BaseModel):
+    duration: float = Field(..., ge=0, le=FEATURES_MAX_DURATION_SECONDS, description="Clip length in seconds")
+    rms_mean: float = Field(..., ge=0, le=2.0)
+    zero_crossing_rate_mean: float = Field(..., ge=0, le=1.0)
+    spectral_centroid_mean: float = Field(..., ge=0, le=FEATURES_MAX_FREQUENCY_HZ)
+    spectral_centroid_var: float = Field(0.0, ge=0, le=FEATURES_MAX_VARIANCE)
+    spectral_rolloff_mean: float = Field(..., ge=0, le=FEATURES_MAX_FREQUENCY_HZ)
+    spectral_rolloff_var: float = Field(0.0, ge=0, le=FEATURES_MAX_VARIANCE)
+    has_speech: Optional[bool] = Field(None, description="Client-side VAD verdict; false skips classification")
+    speech_ratio: Optional[float] = Field(None, ge=0, le=1.0)
+    clip_duration: Optional[float] = Field(None, ge=0, le=FEATURES_MAX_DURATION_SECONDS,
+                                           description="Untrimmed clip length when ``duration`` covers only the speech")
+
+class FeaturesRequest(BaseModel):
+    features: AudioFeatures = Field(..., description="Output of extract_features (or /features.js) for the clip")
+    language: str = Field(..., description="Language of the audio (Tamil, English, Hindi, Malayalam, Telugu, Kannada)")
+
+def json_safe(value):
+    """
+    Replaces NaN and Infinity, which JSON cannot carry, with their string form.
+    """
+    if isinstance(value, float) and not math.isfinite(value):
+        return str(value)
+    if isinstance(value, dict):
+        return {key: json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_safe(item) for item in value]
+    return value
+
+@app.exception_handler(RequestValidationError)
+async def validation_error_handler(request: Request, exc: RequestValidationError):
+    """
+    The usual 422 body, but a rejected NaN or Infinity input is echoed as a string:
+    the default handler cannot encode it and would answer 500 instead.
+    """
+    return JSONResponse(status_code=422, content={"detail": json_safe(jsonable_encoder(exc.errors()))})
+
+class BatchAudioRequest(BaseModel):
+    items: List[AudioRequest] = Field(..., description="Audio clips to analyze in one request")
+
+class BatchItemResult(BaseModel):
+    index: int
+    status: str = Field(..., description="\"ok\" or \"error\"")
+    response: Optional[AudioResponse] = None
+    error: Optional[str] = None
+
+class BatchAudioResponse(BaseModel):
+    results: List[BatchItemResult]
+    succeeded: int
+    failed: int
+
+ROOT_INFO = {
+    "status": "active",
+    "message": "AI Voice Detection System is running",
+    "endpoints": {
+        "detect": "/detect",
+        "detect_batch": "/detect/batch",
+        "detect_upload": "/detect/upload",
+        "detect_features": "/detect/features",
+        "docs": "/docs",
+        "app": "/app",
+        "health": "/health"
+    }
+}
+
+def root_page():
     return """
     <!doctype html>
     <html>
@@ -530,6 +859,9 @@ async def root(request: Request, format: str | None = None):
                   <option>Telugu</option>
                   <option>Kannada</option>
                 </select>
+                <label style="display: flex; align-items: center; gap: 0.35rem; font-size: 0.85rem; color: #475569;">
+                  <input id="live-features-only" type="checkbox"> Send features only
+                </label>
               </div>
               
               <div class="audio-visualizer" id="visualizer">
@@ -562,6 +894,7 @@ async def root(request: Request, format: str | None = None):
           </div>
         </div>
       </div>
+      <script src="/features.js"></script>
       <script>
         // Tab switching
         document.querySelectorAll('.tab').forEach(tab => {
@@ -574,15 +907,6 @@ async def root(request: Request, format: str | None = None):
         });
         
         // File upload functionality
-        async function toBase64(file) {
-          return new Promise((resolve, reject) => {
-            const reader = new FileReader();
-            reader.onload = () => resolve(reader.result.split(',')[1]);
-            reader.onerror = reject;
-            reader.readAsDataURL(file);
-          });
-        }
-        
         async function detect() {
           const btn = document.getElementById('send');
           const resultPre = document.getElementById('result');
@@ -595,18 +919,24 @@ async def root(request: Request, format: str | None = None):
           let audioB64 = document.getElementById('base64').value.trim();
           
           try {
+            let res;
             if (!audioB64) {
               const f = fileInput.files[0];
               if (!f) throw new Error('Please select an audio file or paste Base64 audio');
-              audioB64 = await toBase64(f);
+              // Send the file as-is; base64 would inflate it by a third
+              res = await fetch('/detect/upload?language=' + encodeURIComponent(lang), {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/octet-stream' },
+                body: f
+              });
+            } else {
+              res = await fetch('/detect', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ audio_base64: audioB64, language: lang })
+              });
             }
             
-            const res = await fetch('/detect', {
-              method: 'POST',
-              headers: { 'Content-Type': 'application/json' },
-              body: JSON.stringify({ audio_base64: audioB64, language: lang })
-            });
-            
             const data = await res.json();
             const formatted = JSON.stringify(data, null, 2);
             resultPre.textContent = formatted;
@@ -638,19 +968,214 @@ async def root(request: Request, format: str | None = None):
         // Live monitoring functionality
         let ws = null;
         let mediaRecorder = null;
+        let micStream = null;
+        let captureNode = null;
         let audioContext = null;
         let analyser = null;
         let animationId = null;
         let recordingInterval = null;
+        let chunkSequence = 0;
+        
+        // Binary frame protocol (see live.py): version, encoding, language id,
+        // flags, sequence number and sample rate, little-endian, then the audio bytes
+        const BINARY_PROTOCOL = 'voice-detect.binary.v1';
+        const FRAME_HEADER_BYTES = 12;
+        const ENCODING_CONTAINER = 0;
+        const ENCODING_PCM_S16LE = 1;
+        // PCM capture: mono Int16 at a fixed rate, sent in fixed-size frames
+        const CAPTURE_SAMPLE_RATE = 16000;
+        const CAPTURE_FRAME_SAMPLES = 8000;
+        
+        function encodeFrame(sequence, encoding, languageId, sampleRate, audioBytes) {
+          const frame = new Uint8Array(FRAME_HEADER_BYTES + audioBytes.byteLength);
+          const header = new DataView(frame.buffer);
+          header.setUint8(0, 1);
+          header.setUint8(1, encoding);
+          header.setUint8(2, Math.max(0, languageId));
+          header.setUint8(3, 0);
+          header.setUint32(4, sequence >>> 0, true);
+          header.setUint32(8, sampleRate >>> 0, true);
+          frame.set(audioBytes, FRAME_HEADER_BYTES);
+          return frame.buffer;
+        }
+        
+        function wavBytes(pcm, sampleRate) {
+          // Minimal 16-bit mono WAV wrapper for servers without the binary protocol
+          const bytes = new Uint8Array(44 + pcm.byteLength);
+          const view = new DataView(bytes.buffer);
+          const tag = (offset, text) => {
+            for (let i = 0; i < 4; i++) view.setUint8(offset + i, text.charCodeAt(i));
+          };
+          tag(0, 'RIFF');
+          view.setUint32(4, 36 + pcm.byteLength, true);
+          tag(8, 'WAVE');
+          tag(12, 'fmt ');
+          view.setUint32(16, 16, true);
+          view.setUint16(20, 1, true);
+          view.setUint16(22, 1, true);
+          view.setUint32(24, sampleRate, true);
+          view.setUint32(28, sampleRate * 2, true);
+          view.setUint16(32, 2, true);
+          view.setUint16(34, 16, true);
+          tag(36, 'data');
+          view.setUint32(40, pcm.byteLength, true);
+          bytes.set(new Uint8Array(pcm.buffer, pcm.byteOffset, pcm.byteLength), 44);
+          return bytes;
+        }
+        
+        function bytesToBase64(bytes) {
+          let binary = '';
+          for (let i = 0; i < bytes.length; i += 0x8000) {
+            binary += String.fromCharCode.apply(null, bytes.subarray(i, i + 0x8000));
+          }
+          return btoa(binary);
+        }
+        
+        function sendPcmFrame(pcm, sampleRate) {
+          if (!ws || ws.readyState !== WebSocket.OPEN || pcm.length === 0) {
+            return;
+          }
+          const langSelect = document.getElementById('live-lang');
+          const sequence = chunkSequence++;
+          if (ws.protocol === BINARY_PROTOCOL) {
+            // 12-byte header + raw Int16 samples, decoded server-side without a container
+            const audio = new Uint8Array(pcm.buffer, pcm.byteOffset, pcm.byteLength);
+            ws.send(encodeFrame(sequence, ENCODING_PCM_S16LE, langSelect.selectedIndex, sampleRate, audio));
+            return;
+          }
+          ws.send(JSON.stringify({
+            type: 'audio_chunk',
+            audio: bytesToBase64(wavBytes(pcm, sampleRate)),
+            language: langSelect.value,
+            sequence: sequence
+          }));
+        }
+        
+        // Features-only mode: the browser keeps its own window and sends one
+        // small features message per hop instead of the audio
+        const FEATURE_WINDOW_SECONDS = 4;
+        const FEATURE_HOP_SECONDS = 2;
+        let featureWindow = null;
+        let featureFilled = 0;
+        let featureSinceHop = 0;
+        
+        function sendFeatureFrame(pcm, sampleRate) {
+          if (!ws || ws.readyState !== WebSocket.OPEN || pcm.length === 0) {
+            return;
+          }
+          const capacity = FEATURE_WINDOW_SECONDS * sampleRate;
+          if (!featureWindow || featureWindow.length !== capacity) {
+            featureWindow = new Float32Array(capacity);
+            featureFilled = 0;
+            featureSinceHop = 0;
+          }
+          // Slide the window: keep the newest samples that still fit, then append
+          const samples = Float32Array.from(pcm, (v) => v / 32768);
+          const keep = Math.max(0, Math.min(featureFilled, capacity - samples.length));
+          featureWindow.copyWithin(0, featureFilled - keep, featureFilled);
+          featureWindow.set(samples.subarray(Math.max(0, samples.length - capacity)), keep);
+          featureFilled = Math.min(capacity, keep + samples.length);
+          featureSinceHop += samples.length;
+          if (featureSinceHop < FEATURE_HOP_SECONDS * sampleRate) {
+            return;
+          }
+          featureSinceHop = 0;
+          ws.send(JSON.stringify({
+            type: 'features',
+            features: VoiceFeatures.computeFeatures(featureWindow.subarray(0, featureFilled), sampleRate),
+            language: document.getElementById('live-lang').value,
+            sequence: chunkSequence++
+          }));
+        }
+        
+        function createAudioContext() {
+          const AudioContextClass = window.AudioContext || window.webkitAudioContext;
+          try {
+            // Let the browser resample the microphone to the capture rate
+            return new AudioContextClass({ sampleRate: CAPTURE_SAMPLE_RATE });
+          } catch (e) {
+            return new AudioContextClass();
+          }
+        }
+        
+        async function startPcmCapture(source) {
+          // The worklet downmixes, resamples when the context runs at another
+          // rate, and posts fixed-size Int16 frames without restarting capture
+          await audioContext.audioWorklet.addModule('/pcm-worklet.js');
+          captureNode = new AudioWorkletNode(audioContext, 'pcm-capture', {
+            numberOfInputs: 1,
+            numberOfOutputs: 0,
+            processorOptions: {
+              targetSampleRate: CAPTURE_SAMPLE_RATE,
+              frameSamples: CAPTURE_FRAME_SAMPLES
+            }
+          });
+          const featuresOnly = document.getElementById('live-features-only').checked;
+          featureWindow = null;
+          captureNode.port.onmessage = (event) => {
+            const pcm = new Int16Array(event.data);
+            if (featuresOnly) {
+              sendFeatureFrame(pcm, CAPTURE_SAMPLE_RATE);
+            } else {
+              sendPcmFrame(pcm, CAPTURE_SAMPLE_RATE);
+            }
+          };
+          source.connect(captureNode);
+        }
+        
+        function startRecorderCapture(stream) {
+          // Fallback for browsers without AudioWorklet: restarted MediaRecorder
+          // segments, sent as container payloads
+          const options = { mimeType: 'audio/webm' };
+          mediaRecorder = new MediaRecorder(stream, options);
+          
+          mediaRecorder.ondataavailable = async (event) => {
+            if (event.data.size > 0 && ws && ws.readyState === WebSocket.OPEN) {
+              const langSelect = document.getElementById('live-lang');
+              const sequence = chunkSequence++;
+              if (ws.protocol === BINARY_PROTOCOL) {
+                const audio = new Uint8Array(await event.data.arrayBuffer());
+                ws.send(encodeFrame(sequence, ENCODING_CONTAINER, langSelect.selectedIndex, 0, audio));
+                return;
+              }
+              // Convert audio chunk to base64
+              const reader = new FileReader();
+              reader.onloadend = () => {
+                const base64 = reader.result.split(',')[1];
+                ws.send(JSON.stringify({
+                  type: 'audio_chunk',
+                  audio: base64,
+                  language: langSelect.value,
+                  sequence: sequence
+                }));
+              };
+              reader.readAsDataURL(event.data);
+            }
+          };
+          
+          mediaRecorder.start();
+          // Capture audio every 2 seconds
+          recordingInterval = setInterval(() => {
+            if (mediaRecorder && mediaRecorder.state === 'recording') {
+              mediaRecorder.stop();
+              mediaRecorder.start();
+            }
+          }, 2000);
+        }
         
         async function startLiveMonitoring() {
           try {
             // Request microphone access
-            const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
+            micStream = await navigator.mediaDevices.getUserMedia({
+              audio: { channelCount: 1, echoCancellation: false, noiseSuppression: false, autoGainControl: false }
+            });
             
             // Setup WebSocket connection
             const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-            ws = new WebSocket(`${protocol}//${window.location.host}/ws/live-monitor`);
+            // Offer the binary frame protocol; older servers fall back to JSON messages
+            ws = new WebSocket(`${protocol}//${window.location.host}/ws/live-monitor`, [BINARY_PROTOCOL]);
+            ws.binaryType = 'arraybuffer';
+            chunkSequence = 0;
             
             ws.onopen = () => {
               console.log('WebSocket connected');
@@ -660,7 +1185,12 @@ async def root(request: Request, format: str | None = None):
             ws.onmessage = (event) => {
               const data = JSON.parse(event.data);
               if (data.type === 'detection_result') {
+                updateMonitorStatus('listening', 'Listening...');
                 handleDetectionResult(data);
+              } else if (data.type === 'no_speech') {
+                updateMonitorStatus('listening', 'Listening... (no speech)');
+              } else if (data.type === 'throttle') {
+                updateMonitorStatus('listening', `Listening... (rate limited, next verdict in ${Math.ceil(data.retry_after)} s)`);
               }
             };
             
@@ -674,43 +1204,26 @@ async def root(request: Request, format: str | None = None):
             };
             
             // Setup audio visualization
-            audioContext = new (window.AudioContext || window.webkitAudioContext)();
+            audioContext = createAudioContext();
+            let source;
+            try {
+              source = audioContext.createMediaStreamSource(micStream);
+            } catch (e) {
+              // Some browsers cannot connect a microphone to a context running at another rate
+              audioContext.close();
+              audioContext = new (window.AudioContext || window.webkitAudioContext)();
+              source = audioContext.createMediaStreamSource(micStream);
+            }
             analyser = audioContext.createAnalyser();
-            const source = audioContext.createMediaStreamSource(stream);
             source.connect(analyser);
             analyser.fftSize = 32;
             startVisualization();
             
-            // Setup MediaRecorder to capture audio chunks
-            const options = { mimeType: 'audio/webm' };
-            mediaRecorder = new MediaRecorder(stream, options);
-            const audioChunks = [];
-            
-            mediaRecorder.ondataavailable = async (event) => {
-              if (event.data.size > 0 && ws && ws.readyState === WebSocket.OPEN) {
-                // Convert audio chunk to base64
-                const reader = new FileReader();
-                reader.onloadend = () => {
-                  const base64 = reader.result.split(',')[1];
-                  const language = document.getElementById('live-lang').value;
-                  ws.send(JSON.stringify({
-                    type: 'audio_chunk',
-                    audio: base64,
-                    language: language
-                  }));
-                };
-                reader.readAsDataURL(event.data);
-              }
-            };
-            
-            mediaRecorder.start();
-            // Capture audio every 2 seconds
-            recordingInterval = setInterval(() => {
-              if (mediaRecorder && mediaRecorder.state === 'recording') {
-                mediaRecorder.stop();
-                mediaRecorder.start();
-              }
-            }, 2000);
+            if (audioContext.audioWorklet && window.AudioWorkletNode) {
+              await startPcmCapture(source);
+            } else {
+              startRecorderCapture(micStream);
+            }
             
             // Update UI
             document.getElementById('start-monitor').disabled = true;
@@ -723,17 +1236,30 @@ async def root(request: Request, format: str | None = None):
         }
         
         function stopLiveMonitoring() {
+          if (captureNode) {
+            // Send the partially filled last frame before closing the socket
+            captureNode.port.postMessage('flush');
+            captureNode.disconnect();
+            captureNode = null;
+          }
           if (mediaRecorder && mediaRecorder.state !== 'inactive') {
             mediaRecorder.stop();
           }
           if (recordingInterval) {
             clearInterval(recordingInterval);
           }
+          if (micStream) {
+            micStream.getTracks().forEach(track => track.stop());
+            micStream = null;
+          }
           if (ws) {
-            ws.close();
+            const socket = ws;
+            // Give the flushed frame a moment to arrive before closing
+            setTimeout(() => socket.close(), 100);
           }
           if (audioContext) {
-            audioContext.close();
+            const context = audioContext;
+            setTimeout(() => context.close(), 100);
           }
           if (animationId) {
             cancelAnimationFrame(animationId);
@@ -841,6 +1367,12 @@ async def root(request: Request, format: str | None = None):
         
         document.getElementById('start-monitor').addEventListener('click', startLiveMonitoring);
         document.getElementById('stop-monitor').addEventListener('click', stopLiveMonitoring);
+
+        if ('serviceWorker' in navigator) {
+          window.addEventListener('load', () => {
+            navigator.serviceWorker.register('/sw.js').catch(() => {});
+          });
+        }
       </script>
     </body>
     </html>
@@ -848,9 +1380,69 @@ async def root(request: Request, format: str | None = None):
 
 @app.get("/health")
 def health_check():
-    return {"status": "active", "message": "AI Voice Detection System is running"}
+    return {
+        "status": "active",
+        "message": "AI Voice Detection System is running",
+        "classifier": classifier.stats(),
+        "admission": admission.stats(),
+        "inference": inference.stats(),
+        "resilience": resilient.stats(),
+        "cache": verdict_cache.stats(),
+        "batching": batcher.stats() if batcher is not None else None,
+        "fast_path": fast_path.stats() if fast_path is not None else None,
+        "static": static_assets.stats()
+    }
+
+@app.get("/warmup")
+async def warmup_endpoint():
+    """
+    Runs the warm-up steps, for serverless platforms that ping a fresh instance
+    before routing traffic to it. Repeated calls are cheap.
+    """
+    return {"status": "warm", "steps": await run_cpu_bound(warm_up)}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Prometheus scrape endpoint: per-stage latency histograms, Gemini call outcomes,
+    verdict tiers, in-flight HTTP requests and open WebSocket connections.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@REGISTRY.collector
+def collect_component_stats():
+    """
+    Exposes the counters the admission controller, executor, cache, batcher and fast path already keep.
+    """
+    inference_stats = inference.stats()
+    cache_stats = verdict_cache.stats()
+    families = [
+        ("voice_detect_admission_in_flight", "gauge", "Requests holding an admission slot.",
+         [({}, admission.in_flight)]),
+        ("voice_detect_inference_in_flight", "gauge", "Classifier calls currently running.",
+         [({}, inference_stats["in_flight"])]),
+        ("voice_detect_inference_waiting", "gauge", "Predictions waiting for an inference slot.",
+         [({}, inference_stats["waiting"])]),
+        ("voice_detect_cache_entries", "gauge", "Verdicts held in the cache.",
+         [({}, cache_stats["entries"])]),
+        ("voice_detect_cache_lookups_total", "counter", "Verdict cache lookups by result.",
+         [({"result": "hit"}, cache_stats["hits"]), ({"result": "miss"}, cache_stats["misses"])]),
+        ("voice_detect_cache_evictions_total", "counter", "Verdicts evicted from the cache.",
+         [({}, cache_stats["evictions"])]),
+    ]
+    if batcher is not None:
+        batch_stats = batcher.stats()
+        families.append(("voice_detect_batches_total", "counter", "Batched Gemini calls.",
+                         [({}, batch_stats["batches"])]))
+        families.append(("voice_detect_batch_fallbacks_total", "counter", "Batched items retried one by one.",
+                         [({}, batch_stats["fallbacks"])]))
+    if fast_path is not None:
+        fast_stats = fast_path.stats()
+        families.append(("voice_detect_fast_path_decisions_total", "counter", "Fast-path decisions by outcome.",
+                         [({"decision": "answered"}, fast_stats["answered"]),
+                          ({"decision": "escalated"}, fast_stats["escalated"])]))
+    return families
 
-@app.get("/app", response_class=HTMLResponse)
 def app_page():
     return """
     <!doctype html>
@@ -904,6 +1496,9 @@ def app_page():
             </select>
           </div>
         </div>
+        <label class="small" style="font-weight: normal;">
+          <input id="features-only" type="checkbox"> Analyze in the browser and send only the audio features
+        </label>
         <button id="send">Detect</button>
         <div id="out" style="margin-top:1rem;">
           <pre id="result">{ "status": "waiting for input" }</pre>
@@ -911,15 +1506,23 @@ def app_page():
         <p class="small">Or paste Base64 audio below (optional):</p>
         <textarea id="base64" rows="4" placeholder="Base64 audio string"></textarea>
       </div>
+      <script src="/features.js"></script>
       <script>
-        async function toBase64(file) {
-          return new Promise((resolve, reject) => {
-            const reader = new FileReader();
-            reader.onload = () => resolve(reader.result.split(',')[1]);
-            reader.onerror = reject;
-            reader.readAsDataURL(file);
-          });
+        // Mono samples of a file: WAV is decoded like the server does, other formats by the browser
+        async function decodeFile(f) {
+          const buffer = await f.arrayBuffer();
+          const wav = VoiceFeatures.decodeWav(buffer);
+          if (wav) return wav;
+          const ctx = new OfflineAudioContext(1, 1, 48000);
+          const audio = await ctx.decodeAudioData(buffer);
+          const y = new Float32Array(audio.length);
+          for (let c = 0; c < audio.numberOfChannels; c++) {
+            const data = audio.getChannelData(c);
+            for (let i = 0; i < y.length; i++) y[i] += data[i] / audio.numberOfChannels;
+          }
+          return { y, sampleRate: audio.sampleRate };
         }
+
         async function detect() {
           const btn = document.getElementById('send');
           btn.disabled = true;
@@ -927,16 +1530,31 @@ def app_page():
           const lang = document.getElementById('lang').value;
           let audioB64 = document.getElementById('base64').value.trim();
           try {
-            if (!audioB64) {
+            let res;
+            if (!audioB64 && document.getElementById('features-only').checked) {
+              const f = fileInput.files[0];
+              if (!f) throw new Error('Select a file to analyze');
+              const { y, sampleRate } = await decodeFile(f);
+              res = await fetch('/detect/features', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ features: VoiceFeatures.computeFeatures(y, sampleRate), language: lang })
+              });
+            } else if (!audioB64) {
               const f = fileInput.files[0];
               if (!f) throw new Error('Select a file or paste Base64 audio');
-              audioB64 = await toBase64(f);
+              res = await fetch('/detect/upload?language=' + encodeURIComponent(lang), {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/octet-stream' },
+                body: f
+              });
+            } else {
+              res = await fetch('/detect', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ audio_base64: audioB64, language: lang })
+              });
             }
-            const res = await fetch('/detect', {
-              method: 'POST',
-              headers: { 'Content-Type': 'application/json' },
-              body: JSON.stringify({ audio_base64: audioB64, language: lang })
-            });
             const txt = await res.text();
             document.getElementById('result').textContent = txt;
           } catch (err) {
@@ -951,7 +1569,6 @@ def app_page():
     </html>
     """
 
-@app.get("/manifest.json", response_class=JSONResponse)
 def manifest():
     return {
         "name": "AI Voice Detection",
@@ -963,25 +1580,522 @@ def manifest():
         "icons": []
     }
 
-@app.get("/sw.js", response_class=PlainTextResponse)
+def pcm_worklet():
+    """
+    Source of the AudioWorklet processor the live monitor captures PCM with.
+    """
+    return """
+    class PcmCaptureProcessor extends AudioWorkletProcessor {
+      constructor(options) {
+        super();
+        const opts = options.processorOptions || {};
+        this.frameSamples = opts.frameSamples || 8000;
+        // Input samples per output sample; 1 when the context already runs at the target rate
+        this.step = sampleRate / (opts.targetSampleRate || sampleRate);
+        this.position = 0;
+        this.previous = 0;
+        this.frame = new Int16Array(this.frameSamples);
+        this.filled = 0;
+        this.mono = new Float32Array(128);
+        this.port.onmessage = (event) => {
+          if (event.data === 'flush') {
+            this.flush();
+          }
+        };
+      }
+
+      flush() {
+        if (this.filled > 0) {
+          const frame = this.frame.slice(0, this.filled);
+          this.port.postMessage(frame.buffer, [frame.buffer]);
+          this.filled = 0;
+        }
+      }
+
+      emit(value) {
+        const clipped = value < -1 ? -1 : (value > 1 ? 1 : value);
+        this.frame[this.filled++] = clipped < 0 ? clipped * 0x8000 : clipped * 0x7fff;
+        if (this.filled === this.frameSamples) {
+          this.flush();
+        }
+      }
+
+      process(inputs) {
+        const channels = inputs[0];
+        if (!channels || channels.length === 0) {
+          return true;
+        }
+        const n = channels[0].length;
+        if (this.mono.length !== n) {
+          this.mono = new Float32Array(n);
+        }
+        const mono = this.mono;
+        mono.set(channels[0]);
+        for (let c = 1; c < channels.length; c++) {
+          const channel = channels[c];
+          for (let i = 0; i < n; i++) mono[i] += channel[i];
+        }
+        if (channels.length > 1) {
+          const scale = 1 / channels.length;
+          for (let i = 0; i < n; i++) mono[i] *= scale;
+        }
+
+        if (this.step === 1) {
+          for (let i = 0; i < n; i++) this.emit(mono[i]);
+          return true;
+        }
+        // Linear interpolation; position -1 refers to the last sample of the previous block
+        let t = this.position;
+        while (t < n - 1) {
+          const i = Math.floor(t);
+          const a = i < 0 ? this.previous : mono[i];
+          this.emit(a + (mono[i + 1] - a) * (t - i));
+          t += this.step;
+        }
+        this.position = t - n;
+        this.previous = mono[n - 1];
+        return true;
+      }
+    }
+
+    registerProcessor('pcm-capture', PcmCaptureProcessor);
+    """
+
+def feature_extractor():
+    """
+    Browser port of ``extract_features`` and ``detect_speech`` (same framing, Hann
+    window, rfft bins and the server's VAD thresholds), used by the UIs' "features only" mode
+    to send a few hundred bytes to ``/detect/features`` instead of the audio.
+    Also loads in Node, where the parity test runs it.
+    """
+    return """
+    (function (root) {
+      const N_FFT = %(n_fft)d;
+      const HOP_LENGTH = %(hop_length)d;
+      const VAD_FRAME_SECONDS = %(vad_frame_seconds)r;
+      const VAD_ENERGY_FLOOR_DB = %(vad_energy_floor_db)r;
+      const VAD_TOP_DB = %(vad_top_db)r;
+      const VAD_MAX_ZCR = %(vad_max_zcr)r;
+      const VAD_PAD_SECONDS = %(vad_pad_seconds)r;
+      const VAD_MIN_SPEECH_SECONDS = %(vad_min_speech_seconds)r;
+      const VAD_ENABLED = %(vad_enabled)s;
+
+      const plans = new Map();
+
+      // Hann window (float32, as np.hanning(n).astype(float32)) and FFT tables per frame size
+      function plan(n) {
+        let p = plans.get(n);
+        if (p) return p;
+        const window = new Float32Array(n);
+        if (n === 1) {
+          window[0] = 1;
+        } else {
+          for (let i = 0; i < n; i++) window[i] = 0.5 + 0.5 * Math.cos(Math.PI * (2 * i + 1 - n) / (n - 1));
+        }
+        const radix2 = (n & (n - 1)) === 0;
+        const bins = Math.floor(n / 2) + 1;
+        const cos = new Float64Array(radix2 ? n / 2 : n);
+        const sin = new Float64Array(cos.length);
+        for (let i = 0; i < cos.length; i++) {
+          cos[i] = Math.cos(-2 * Math.PI * i / n);
+          sin[i] = Math.sin(-2 * Math.PI * i / n);
+        }
+        let reverse = null;
+        if (radix2) {
+          reverse = new Uint32Array(n);
+          const bits = Math.round(Math.log2(n));
+          for (let i = 0; i < n; i++) {
+            let r = 0;
+            for (let b = 0; b < bits; b++) r |= ((i >> b) & 1) << (bits - 1 - b);
+            reverse[i] = r;
+          }
+        }
+        p = { n, window, radix2, bins, cos, sin, reverse, re: new Float64Array(n), im: new Float64Array(n), mag: new Float64Array(bins) };
+        plans.set(n, p);
+        return p;
+      }
+
+      // Magnitudes of the rfft bins of the windowed frame y[start:start+n] into p.mag
+      function magnitudes(y, start, p) {
+        const { n, window, re, im, mag, cos, sin } = p;
+        if (!p.radix2) {
+          // Frames shorter than N_FFT (clips under N_FFT samples) have arbitrary length
+          for (let k = 0; k < p.bins; k++) {
+            let sr = 0, si = 0;
+            for (let t = 0; t < n; t++) {
+              const x = Math.fround(y[start + t] * window[t]);
+              const j = (k * t) %% n;
+              sr += x * cos[j];
+              si += x * sin[j];
+            }
+            mag[k] = Math.hypot(sr, si);
+          }
+          return mag;
+        }
+        for (let i = 0; i < n; i++) {
+          re[p.reverse[i]] = Math.fround(y[start + i] * window[i]);
+          im[p.reverse[i]] = 0;
+        }
+        for (let size = 2; size <= n; size <<= 1) {
+          const half = size >> 1;
+          const step = n / size;
+          for (let i = 0; i < n; i += size) {
+            for (let j = 0; j < half; j++) {
+              const wr = cos[j * step], wi = sin[j * step];
+              const a = i + j, b = a + half;
+              const tr = re[b] * wr - im[b] * wi;
+              const ti = re[b] * wi + im[b] * wr;
+              re[b] = re[a] - tr; im[b] = im[a] - ti;
+              re[a] += tr; im[a] += ti;
+            }
+          }
+        }
+        for (let k = 0; k < p.bins; k++) mag[k] = Math.hypot(re[k], im[k]);
+        return mag;
+      }
+
+      function meanVar(values) {
+        let mean = 0;
+        for (const v of values) mean += v;
+        mean /= values.length;
+        let v2 = 0;
+        for (const v of values) v2 += (v - mean) * (v - mean);
+        return [mean, v2 / values.length];
+      }
+
+      // Same dict as preprocessing.extract_features for mono float samples y at rate sr
+      function extractFeatures(y, sr) {
+        y = y instanceof Float32Array ? y : Float32Array.from(y);
+        const features = {
+          rms_mean: 0, zero_crossing_rate_mean: 0,
+          spectral_centroid_mean: 0, spectral_centroid_var: 0,
+          spectral_rolloff_mean: 0, spectral_rolloff_var: 0,
+          duration: sr ? y.length / sr : 0
+        };
+        if (!y.length) return features;
+
+        let energy = 0, crossings = 0;
+        for (let i = 0; i < y.length; i++) {
+          energy += y[i] * y[i];
+          if (i) crossings += Math.abs(Math.sign(y[i]) - Math.sign(y[i - 1]));
+        }
+        features.rms_mean = Math.sqrt(energy / y.length);
+        features.zero_crossing_rate_mean = y.length > 1 ? crossings / (y.length - 1) / 2 : 0;
+
+        const n = Math.min(N_FFT, y.length);
+        const p = plan(n);
+        const binHz = sr ? sr / n : 1;
+        const centroids = [], rolloffs = [];
+        for (let start = 0; start + n <= y.length; start += HOP_LENGTH) {
+          const mag = magnitudes(y, start, p);
+          let total = 0, weighted = 0;
+          for (let k = 0; k < p.bins; k++) {
+            total += mag[k];
+            weighted += mag[k] * k * binHz;
+          }
+          centroids.push(total > 0 ? weighted / total : 0);
+          // Rolloff: first bin where the cumulative magnitude reaches 85%% of the total
+          let cumulative = 0, k = 0;
+          for (; k < p.bins; k++) {
+            cumulative += mag[k];
+            if (cumulative >= 0.85 * total) break;
+          }
+          rolloffs.push(k * binHz);
+        }
+        [features.spectral_centroid_mean, features.spectral_centroid_var] = meanVar(centroids);
+        [features.spectral_rolloff_mean, features.spectral_rolloff_var] = meanVar(rolloffs);
+        return features;
+      }
+
+      // Same result as preprocessing.detect_speech
+      function detectSpeech(y, sr, energyFloorDb = VAD_ENERGY_FLOOR_DB, minSpeechSeconds = VAD_MIN_SPEECH_SECONDS,
+                            topDb = VAD_TOP_DB, maxZcr = VAD_MAX_ZCR) {
+        let frame = sr ? Math.max(1, Math.trunc(sr * VAD_FRAME_SECONDS)) : Math.max(1, y.length);
+        let frames = Math.floor(y.length / frame);
+        if (frames === 0) {
+          frame = y.length;
+          frames = y.length ? 1 : 0;
+        }
+        if (frames === 0) {
+          return { has_speech: false, speech_ratio: 0, speech_seconds: 0, start: 0, end: 0 };
+        }
+        const level = new Float64Array(frames);
+        const zcr = new Float64Array(frames);
+        let loudest = -Infinity;
+        for (let f = 0; f < frames; f++) {
+          let power = 0, crossings = 0;
+          let previous = null;
+          for (let i = f * frame; i < (f + 1) * frame; i++) {
+            power += y[i] * y[i];
+            const negative = y[i] < 0 || Object.is(y[i], -0);
+            if (previous !== null && negative !== previous) crossings++;
+            previous = negative;
+          }
+          level[f] = 10 * Math.log10(Math.max(power / frame, 1e-12));
+          zcr[f] = crossings / Math.max(1, frame - 1);
+          loudest = Math.max(loudest, level[f]);
+        }
+        const threshold = Math.max(energyFloorDb, loudest - topDb);
+        let first = -1, last = -1, count = 0;
+        for (let f = 0; f < frames; f++) {
+          if (level[f] >= threshold && zcr[f] <= maxZcr) {
+            if (first < 0) first = f;
+            last = f;
+            count++;
+          }
+        }
+        const speechSeconds = sr ? count * frame / sr : 0;
+        let start = 0, end = 0;
+        if (count) {
+          const pad = sr ? Math.trunc(VAD_PAD_SECONDS * sr) : 0;
+          start = Math.max(0, first * frame - pad);
+          end = Math.min(y.length, (last + 1) * frame + pad);
+        }
+        return {
+          has_speech: count > 0 && speechSeconds >= minSpeechSeconds,
+          speech_ratio: Math.round(count / frames * 1e4) / 1e4,
+          speech_seconds: Math.round(speechSeconds * 1e3) / 1e3,
+          start, end
+        };
+      }
+
+      // Feature payload for /detect/features, trimming silence first like the server's VAD
+      function computeFeatures(y, sr, vad = VAD_ENABLED) {
+        y = y instanceof Float32Array ? y : Float32Array.from(y);
+        if (!vad) return extractFeatures(y, sr);
+        const speech = detectSpeech(y, sr);
+        if (!speech.has_speech) {
+          // The remaining fields are required by the endpoint but not used for silent clips
+          const silent = extractFeatures(new Float32Array(0), sr);
+          return { ...silent, duration: sr ? y.length / sr : 0, has_speech: false, speech_ratio: speech.speech_ratio };
+        }
+        const features = extractFeatures(y.subarray(speech.start, speech.end), sr);
+        features.has_speech = true;
+        features.speech_ratio = speech.speech_ratio;
+        features.clip_duration = sr ? y.length / sr : 0;
+        return features;
+      }
+
+      // Mono float samples of a PCM WAV file, decoded the way the server's read_wav does
+      function decodeWav(buffer) {
+        const view = new DataView(buffer);
+        const tag = (offset) => String.fromCharCode(...new Uint8Array(buffer, offset, 4));
+        if (buffer.byteLength < 12 || tag(0) !== 'RIFF' || tag(8) !== 'WAVE') return null;
+        let format = null, offset = 12;
+        while (offset + 8 <= buffer.byteLength) {
+          const id = tag(offset);
+          const size = view.getUint32(offset + 4, true);
+          const body = offset + 8;
+          if (id === 'fmt ') {
+            format = {
+              tag: view.getUint16(body, true), channels: view.getUint16(body + 2, true),
+              sampleRate: view.getUint32(body + 4, true), bits: view.getUint16(body + 14, true)
+            };
+            if (format.tag === 0xFFFE && size >= 40) format.tag = view.getUint16(body + 24, true);
+          } else if (id === 'data' && format) {
+            const width = format.bits / 8;
+            if (!((format.tag === 1 && format.bits === 16) || (format.tag === 3 && format.bits === 32))) return null;
+            const frames = Math.floor(Math.min(size, buffer.byteLength - body) / (width * format.channels));
+            const y = new Float32Array(frames);
+            for (let i = 0; i < frames; i++) {
+              let sum = 0;
+              for (let c = 0; c < format.channels; c++) {
+                const at = body + (i * format.channels + c) * width;
+                sum += format.tag === 1 ? view.getInt16(at, true) / 32768 : view.getFloat32(at, true);
+              }
+              y[i] = sum / format.channels;
+            }
+            return { y, sampleRate: format.sampleRate };
+          }
+          offset = body + size + (size & 1);
+        }
+        return null;
+      }
+
+      root.VoiceFeatures = { extractFeatures, detectSpeech, computeFeatures, decodeWav };
+    })(globalThis);
+    """ % {
+        "n_fft": N_FFT, "hop_length": HOP_LENGTH,
+        "vad_frame_seconds": VAD_FRAME_SECONDS, "vad_energy_floor_db": VAD_ENERGY_FLOOR_DB,
+        "vad_top_db": VAD_TOP_DB, "vad_max_zcr": VAD_MAX_ZCR, "vad_pad_seconds": VAD_PAD_SECONDS,
+        "vad_min_speech_seconds": VAD_MIN_SPEECH_SECONDS, "vad_enabled": json.dumps(VAD_ENABLED),
+    }
+
+# App shell the service worker serves from its cache
+APP_SHELL = ["/", "/app", "/manifest.json", "/pcm-worklet.js", "/features.js"]
+
 def service_worker():
+    """
+    Service worker caching the app shell. Pages load from the cache and are
+    revalidated in the background (a 304 when unchanged); API calls and the
+    WebSocket go straight to the network. The cache name carries the shell's
+    ETags, so a deploy that changes any page installs a fresh cache.
+    """
+    version = hashlib.sha256("".join(static_assets.get(name).etag for name in SHELL_ASSETS).encode("utf-8")).hexdigest()[:12]
     return """
+    const CACHE = 'voice-detect-shell-%s';
+    const SHELL = %s;
+
     self.addEventListener('install', (event) => {
-      self.skipWaiting();
+      event.waitUntil(caches.open(CACHE).then((cache) => cache.addAll(SHELL)).then(() => self.skipWaiting()));
     });
     self.addEventListener('activate', (event) => {
-      event.waitUntil(clients.claim());
+      event.waitUntil(
+        caches.keys()
+          .then((keys) => Promise.all(keys
+            .filter((key) => key.startsWith('voice-detect-shell-') && key !== CACHE)
+            .map((key) => caches.delete(key))))
+          .then(() => clients.claim())
+      );
     });
     self.addEventListener('fetch', (event) => {
-      event.respondWith(fetch(event.request));
+      const request = event.request;
+      const url = new URL(request.url);
+      if (request.method !== 'GET' || url.origin !== self.location.origin || url.search || !SHELL.includes(url.pathname)) {
+        return;
+      }
+      // "/" also answers JSON clients; only page loads come from the cache
+      if (url.pathname === '/' && request.mode !== 'navigate') {
+        return;
+      }
+      event.respondWith(caches.open(CACHE).then(async (cache) => {
+        const cached = await cache.match(request);
+        const network = fetch(request).then((response) => {
+          if (response.ok) {
+            cache.put(request, response.clone());
+          }
+          return response;
+        });
+        if (cached) {
+          event.waitUntil(network.catch(() => {}));
+          return cached;
+        }
+        return network;
+      }));
     });
+    """ % (version, json.dumps(APP_SHELL))
+
+# Pages and scripts rendered and compressed once, served with ETags and 304 revalidation
+STATIC_MAX_AGE_SECONDS = int(os.getenv("STATIC_MAX_AGE_SECONDS", "3600"))
+STATIC_CACHE_CONTROL = f"public, max-age={STATIC_MAX_AGE_SECONDS}"
+static_assets = StaticAssetStore()
+static_assets.register("root.html", root_page, "text/html; charset=utf-8", vary=("Accept",))
+static_assets.register("root.json", lambda: json.dumps(ROOT_INFO, ensure_ascii=False, separators=(",", ":")),
+                       "application/json", vary=("Accept",))
+static_assets.register("app.html", app_page, "text/html; charset=utf-8")
+static_assets.register("manifest.json", lambda: json.dumps(manifest(), ensure_ascii=False, separators=(",", ":")),
+                       "application/json", cache_control=STATIC_CACHE_CONTROL)
+static_assets.register("pcm-worklet.js", pcm_worklet, "text/javascript", cache_control=STATIC_CACHE_CONTROL)
+static_assets.register("features.js", feature_extractor, "text/javascript", cache_control=STATIC_CACHE_CONTROL)
+static_assets.register("sw.js", service_worker, "text/javascript")
+SHELL_ASSETS = ("root.html", "app.html", "manifest.json", "pcm-worklet.js", "features.js")
+
+@app.get("/", response_class=HTMLResponse)
+async def root(request: Request, format: str | None = None):
+    accept = request.headers.get("accept", "")
+    if format == "json" or "application/json" in accept:
+        return static_assets.response("root.json", request.headers)
+    return static_assets.response("root.html", request.headers)
+
+@app.get("/app", response_class=HTMLResponse)
+def app_page_route(request: Request):
+    return static_assets.response("app.html", request.headers)
+
+@app.get("/manifest.json", response_class=JSONResponse)
+def manifest_route(request: Request):
+    return static_assets.response("manifest.json", request.headers)
+
+@app.get("/pcm-worklet.js")
+def pcm_worklet_route(request: Request):
     """
+    AudioWorklet processor used by the live monitor to capture mono Int16 PCM.
+    Served as JavaScript because ``audioWorklet.addModule`` rejects other MIME types.
+    """
+    return static_assets.response("pcm-worklet.js", request.headers)
+
+@app.get("/features.js")
+def feature_extractor_route(request: Request):
+    return static_assets.response("features.js", request.headers)
+
+@app.get("/sw.js", response_class=PlainTextResponse)
+def service_worker_route(request: Request):
+    return static_assets.response("sw.js", request.headers)
+
+def no_speech_result():
+    return {
+        "classification": "Unknown",
+        "confidence_score": 0.0,
+        "explanation": "No speech detected in the audio, so it was not classified.",
+        "tier": "vad",
+    }
+
+async def classify(features: dict, cache_key: Optional[str] = None):
+    """
+    Predicts a verdict for the features and remembers it under ``cache_key``.
+    Clips the VAD found no speech in are answered without calling a model.
+    """
+    if features.get("has_speech") is False:
+        return no_speech_result()
+    result = await predict_features(features)
+    # Fallback verdicts are not cached, so the clip gets Gemini's answer once it recovers
+    if cache_key is not None and result["classification"] != "Unknown" and result.get("tier") != "fallback":
+        verdict_cache.put(cache_key, (features, result))
+    return result
+
+def from_cache(cached, features: dict):
+    """
+    A cached (features, verdict) pair with this clip's own length and speech ratio:
+    keys only cover the speech, so clips differing in leading or trailing silence
+    share a verdict but not these.
+    """
+    cached_features, result = cached
+    clip = {k: features[k] for k in ("clip_duration", "speech_ratio") if k in features}
+    return {**cached_features, **clip}, result
+
+def build_audio_response(result: dict, features: dict, language: str, cache_hit: bool = False):
+    VERDICTS.inc("cache" if cache_hit else result.get("tier", "gemini"))
+    return AudioResponse(
+        classification=result["classification"],
+        confidence_score=result["confidence_score"],
+        explanation=result["explanation"],
+        metadata={
+            # Length of the clip as sent, even when only its speech was analysed
+            "duration_seconds": features.get("clip_duration", features["duration"]),
+            "detected_language": language,
+            "cache_hit": cache_hit,
+            "tier": "cache" if cache_hit else result.get("tier", "gemini"),
+            "speech_ratio": features.get("speech_ratio"),
+            "features_summary": {
+                k: v for k, v in features.items()
+                if k not in ("duration", "clip_duration", "mfcc_mean", "has_speech", "speech_ratio")
+            }
+        }
+    )
+
+def timed_response(response: AudioResponse, stage_timings, include_timings: bool = False):
+    """
+    Serializes the response with a ``Server-Timing`` header covering every stage,
+    serialization and the total. With ``include_timings`` the same breakdown (up to
+    serialization) is added as ``metadata.timings``.
+    """
+    stage_timings.tier = (response.metadata or {}).get("tier")
+    if include_timings and response.metadata is not None:
+        response.metadata["timings"] = stage_timings.as_dict()
+    with timed_stage("serialize"):
+        body = json.dumps(jsonable_encoder(response))
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"Server-Timing": stage_timings.server_timing(stage_timings.elapsed())},
+    )
 
 @app.post("/detect", response_model=AudioResponse)
-async def detect_voice(request: AudioRequest):
+async def detect_voice(request: AudioRequest, timings: bool = False):
     """
     Analyzes the uploaded audio and returns whether it is AI-generated or Human.
+    Pass ``?timings=true`` to get the per-stage breakdown in ``metadata.timings``.
     """
+    stage_timings = start_timings()
     # Validate language
     supported_languages = ["tamil", "english", "hindi", "malayalam", "telugu", "kannada"]
     if request.language.lower() not in supported_languages:
@@ -990,76 +2104,408 @@ async def detect_voice(request: AudioRequest):
         pass 
 
     try:
-        # 1. Decode Audio
-        y, sr = decode_audio(request.audio_base64)
-        
-        # 2. Extract Features
-        features = extract_features(y, sr)
-        
-        # 3. Predict
-        result = classifier.predict(features)
+        offload = len(request.audio_base64) >= OFFLOAD_PAYLOAD_CHARS
+        features = None
+        cache_key = None
+        cached = None
+
+        if len(request.audio_base64) >= STREAMING_PAYLOAD_CHARS:
+            # 1 + 2. Long recordings are decoded and analysed block by block in one pass
+            cache_key, features = await run_stage(
+                True, prepare_payload, request.audio_base64, request.language, verdict_cache.enabled, True,
+                VAD_OPTIONS, stage="stream_decode"
+            )
+            cached = verdict_cache.get(cache_key) if cache_key is not None else None
+        else:
+            # 1. Decode Audio
+            audio_bytes = await run_stage(offload, base64.b64decode, request.audio_base64, stage="base64")
+            y, sr = await run_stage(offload, load_audio, io.BytesIO(audio_bytes), stage="decode")
+
+            # Silence is trimmed before hashing and analysis; clips without speech stop here
+            clip = {}
+            if VAD_ENABLED:
+                trimmed, speech = await run_stage(
+                    offload, trim_silence, y, sr, VAD_ENERGY_FLOOR_DB, VAD_MIN_SPEECH_SECONDS, stage="vad"
+                )
+                if not speech["has_speech"]:
+                    response = build_audio_response(no_speech_result(), no_speech_features(len(y), sr, speech), request.language)
+                    return timed_response(response, stage_timings, timings)
+                clip = speech_features(len(y), sr, speech)
+                y = trimmed
+
+            # Identical audio in the same language reuses the earlier verdict
+            if verdict_cache.enabled:
+                cache_key = await run_stage(offload, verdict_cache.make_key, y, sr, request.language, stage="cache_key")
+                cached = verdict_cache.get(cache_key)
+
+        if cached is not None:
+            features, result = from_cache(cached, features if features is not None else clip)
+        else:
+            # 2. Extract Features
+            if features is None:
+                features = await run_stage(offload, extract_features, y, sr, stage="features")
+                features.update(clip)
+
+            # 3. Predict
+            result = await classify(features, cache_key)
         
         # 4. Construct Response
-        return AudioResponse(
-            classification=result["classification"],
-            confidence_score=result["confidence_score"],
-            explanation=result["explanation"],
-            metadata={
-                "duration_seconds": features["duration"],
-                "detected_language": request.language,
-                "features_summary": {k: v for k, v in features.items() if k != "duration" and k != "mfcc_mean"}
-            }
-        )
+        response = build_audio_response(result, features, request.language, cache_hit=cached is not None)
+        return timed_response(response, stage_timings, timings)
         
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
+    except (InferenceQueueFull, ClassifierUnavailable) as qf:
+        raise HTTPException(status_code=503, detail=str(qf))
+    except InferenceTimeout as te:
+        raise HTTPException(status_code=504, detail=str(te))
+    except Exception as e:
+        print(f"Internal Error: {e}")
+        raise HTTPException(status_code=500, detail="Internal Server Error processing audio")
+
+@app.post("/detect/features", response_model=AudioResponse)
+async def detect_voice_features(request: FeaturesRequest, timings: bool = False):
+    """
+    Classifies a feature set the client computed itself (see ``/features.js``),
+    so only a few hundred bytes are uploaded instead of the clip. Features with
+    ``has_speech: false`` are answered without a model call, as on ``/detect``.
+    ``?timings=true`` works as for ``/detect``.
+    """
+    stage_timings = start_timings()
+    try:
+        features = request.features.model_dump(exclude_none=True)
+        if features.get("has_speech") is False:
+            features = {"duration": features["duration"], "has_speech": False,
+                        "speech_ratio": features.get("speech_ratio", 0.0)}
+            cache_key = None
+        else:
+            cache_key = VerdictCache.make_feature_key(features, request.language) if verdict_cache.enabled else None
+        cached = verdict_cache.get(cache_key) if cache_key is not None else None
+        if cached is not None:
+            features, result = cached
+        else:
+            result = await classify(features, cache_key)
+        response = build_audio_response(result, features, request.language, cache_hit=cached is not None)
+        return timed_response(response, stage_timings, timings)
+
+    except (InferenceQueueFull, ClassifierUnavailable) as qf:
+        raise HTTPException(status_code=503, detail=str(qf))
+    except InferenceTimeout as te:
+        raise HTTPException(status_code=504, detail=str(te))
     except Exception as e:
         print(f"Internal Error: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error processing audio")
 
+async def classify_file(audio_file, language: str):
+    """
+    Streams an audio file through the decoder and classifies it, using the verdict cache.
+    """
+    cache_key, features = await run_stage(
+        True, prepare_file, audio_file, language, verdict_cache.enabled, VAD_OPTIONS, stage="stream_decode"
+    )
+    cached = verdict_cache.get(cache_key) if cache_key is not None else None
+    if cached is not None:
+        features, result = from_cache(cached, features)
+    else:
+        result = await classify(features, cache_key)
+    return build_audio_response(result, features, language, cache_hit=cached is not None)
+
+def limited_receive(receive, limit: int):
+    """
+    Wraps an ASGI ``receive`` so that reading more than ``limit`` body bytes raises
+    a 413, whatever Content-Length claimed (or when there is none, as with chunked
+    uploads). Used where a parser, not the endpoint, reads the body.
+    """
+    received = 0
+
+    async def wrapped():
+        nonlocal received
+        message = await receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > limit:
+                raise HTTPException(status_code=413, detail=f"Upload exceeds {limit} bytes")
+        return message
+
+    return wrapped
+
+@app.post("/detect/upload", response_model=AudioResponse)
+async def detect_voice_upload(request: Request, language: str = "English", timings: bool = False):
+    """
+    Analyzes raw audio sent without base64, either as ``multipart/form-data`` (field
+    ``file``, optional field ``language``) or as an ``application/octet-stream`` body
+    with the language in the query string. The body is spooled straight into the
+    streaming decoder. ``?timings=true`` works as for ``/detect``.
+    """
+    stage_timings = start_timings()
+    content_type = request.headers.get("content-type", "")
+    content_length = int(request.headers.get("content-length") or 0)
+    if content_length > UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds {UPLOAD_MAX_BYTES} bytes")
+
+    try:
+        if content_type.startswith("multipart/form-data"):
+            # Content-Length may be missing or wrong, so the multipart parser's reads are counted too
+            form = await Request(request.scope, limited_receive(request.receive, UPLOAD_MAX_BYTES)).form()
+            upload = form.get("file")
+            if not isinstance(upload, UploadFile):
+                raise HTTPException(status_code=400, detail="Multipart upload must contain a 'file' field")
+            language = str(form.get("language") or language)
+            try:
+                return timed_response(await classify_file(upload.file, language), stage_timings, timings)
+            finally:
+                await form.close()
+
+        with tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES) as body:
+            received = 0
+            async for chunk in request.stream():
+                received += len(chunk)
+                if received > UPLOAD_MAX_BYTES:
+                    raise HTTPException(status_code=413, detail=f"Upload exceeds {UPLOAD_MAX_BYTES} bytes")
+                body.write(chunk)
+            if not received:
+                raise HTTPException(status_code=400, detail="Request body is empty")
+            body.seek(0)
+            return timed_response(await classify_file(body, language), stage_timings, timings)
+
+    except HTTPException:
+        raise
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except (InferenceQueueFull, ClassifierUnavailable) as qf:
+        raise HTTPException(status_code=503, detail=str(qf))
+    except InferenceTimeout as te:
+        raise HTTPException(status_code=504, detail=str(te))
+    except Exception as e:
+        print(f"Internal Error: {e}")
+        raise HTTPException(status_code=500, detail="Internal Server Error processing audio")
+
+@app.post("/detect/batch", response_model=BatchAudioResponse)
+async def detect_voice_batch(request: BatchAudioRequest, http_request: Request):
+    """
+    Analyzes several clips in one request. Clips are decoded in parallel worker
+    processes and classified concurrently; a failing clip is reported in its own
+    result without affecting the others. Each clip counts against the rate limits.
+    """
+    if not request.items:
+        raise HTTPException(status_code=400, detail="Batch must contain at least one item")
+    if len(request.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Batch may contain at most {BATCH_MAX_ITEMS} items")
+    try:
+        # The middleware already took one token for the request; charge the batch as a whole
+        admission.charge(client_address(http_request.scope, TRUST_FORWARDED_FOR), len(request.items), paid=1)
+    except Throttled as t:
+        raise HTTPException(status_code=429, detail=str(t), headers={"Retry-After": t.retry_after_header})
+
+    loop = asyncio.get_running_loop()
+    pool = get_decode_pool()
+
+    async def analyze_item(index: int, item: AudioRequest):
+        try:
+            with timed_stage("batch_decode"):
+                cache_key, features = await loop.run_in_executor(
+                    pool, prepare_payload, item.audio_base64, item.language, verdict_cache.enabled,
+                    len(item.audio_base64) >= STREAMING_PAYLOAD_CHARS, VAD_OPTIONS
+                )
+            cached = verdict_cache.get(cache_key) if cache_key is not None else None
+            if cached is not None:
+                features, result = from_cache(cached, features)
+            else:
+                result = await classify(features, cache_key)
+            response = build_audio_response(result, features, item.language, cache_hit=cached is not None)
+            return BatchItemResult(index=index, status="ok", response=response)
+        except Exception as e:
+            print(f"Batch item {index} failed: {e}")
+            message = str(e) if isinstance(e, (ValueError, InferenceQueueFull, InferenceTimeout, ClassifierUnavailable)) else "Internal Server Error processing audio"
+            return BatchItemResult(index=index, status="error", error=message)
+
+    results = await asyncio.gather(*(analyze_item(i, item) for i, item in enumerate(request.items)))
+    succeeded = sum(1 for r in results if r.status == "ok")
+    return BatchAudioResponse(results=results, succeeded=succeeded, failed=len(results) - succeeded)
+
 @app.websocket("/ws/live-monitor")
 async def websocket_live_monitor(websocket: WebSocket):
     """
     WebSocket endpoint for real-time audio monitoring.
     Receives audio chunks and returns classification results.
+
+    Each connection runs a small pipeline: a receiver decodes incoming chunks
+    into a bounded queue, an analysis worker folds every queued chunk into the
+    session's sliding window and classifies only the newest window, and a
+    sender delivers results. When the worker falls behind, the overflow policy
+    drops or coalesces chunks so verdicts stay close to real time; results
+    report the lag and drop counts.
+
+    Clients offering the ``voice-detect.binary.v1`` subprotocol send audio as
+    binary frames (see ``live.py``); others use JSON ``audio_chunk`` messages
+    with base64 audio. Clients extracting features themselves send one JSON
+    ``features`` message per window instead of any audio.
+
+    Every classified window goes through admission control like an HTTP request;
+    a window over the limits is skipped with a ``throttle`` message.
     """
-    await websocket.accept()
-    try:
+    binary = BINARY_SUBPROTOCOL in websocket.scope.get("subprotocols", [])
+    await websocket.accept(subprotocol=BINARY_SUBPROTOCOL if binary else None)
+    session = LiveSession(LIVE_WINDOW_SECONDS, LIVE_HOP_SECONDS, LIVE_EMA_ALPHA)
+    chunks = ChunkQueue(LIVE_QUEUE_SIZE, LIVE_OVERFLOW_POLICY, LIVE_COALESCE_MAX, LIVE_MAX_CHUNK_AGE_SECONDS)
+    outbox = asyncio.Queue()
+    client = client_address(websocket.scope, TRUST_FORWARDED_FOR)
+    WEBSOCKET_CONNECTIONS.inc()
+
+    async def analyze_chunks():
         while True:
-            # Receive audio data from client
-            data = await websocket.receive_text()
-            message = json.loads(data)
-            
-            if message.get("type") == "audio_chunk":
-                audio_base64 = message.get("audio")
-                language = message.get("language", "English")
-                
-                try:
-                    # Decode and analyze audio
-                    y, sr = decode_audio(audio_base64)
-                    features = extract_features(y, sr)
-                    result = classifier.predict(features)
-                    
-                    # Send result back
-                    await websocket.send_json({
-                        "type": "detection_result",
-                        "classification": result["classification"],
-                        "confidence_score": result["confidence_score"],
-                        "explanation": result["explanation"],
+            # Everything queued while the last prediction ran goes into the window,
+            # but only the newest window is classified
+            pending = [await chunks.get()] + chunks.drain()
+            window_timings = start_timings()
+            window_timings.add("queue", time.monotonic() - pending[0]["received_at"])
+            window_timings.add("decode", sum(chunk["decode_seconds"] for chunk in pending))
+            try:
+                features = None
+                client_features = False
+                for chunk in pending:
+                    if chunk["language"] is not None:
+                        session.language = chunk["language"]
+                    if chunk["features"] is not None:
+                        # A window the client extracted features from itself; there is no audio to fold in
+                        features, client_features = chunk["features"], True
+                        continue
+                    offload = len(chunk["y"]) >= OFFLOAD_PCM_SAMPLES
+                    window_features = await run_stage(offload, session.push, chunk["y"], chunk["sr"], chunk["gap"],
+                                                      stage="live_features")
+                    if window_features is not None:
+                        features, client_features = window_features, False
+                if features is None:
+                    # Not a full hop of new audio yet
+                    continue
+                newest = pending[-1]
+                speech_ratio = None
+                has_speech = True
+                if client_features:
+                    # The client ran the same VAD before extracting features
+                    speech_ratio = features.get("speech_ratio")
+                    has_speech = features.get("has_speech") is not False
+                elif VAD_ENABLED:
+                    with timed_stage("vad"):
+                        speech = detect_speech(session.window_audio(), session.sr, VAD_ENERGY_FLOOR_DB, VAD_MIN_SPEECH_SECONDS)
+                    speech_ratio = speech["speech_ratio"]
+                    has_speech = speech["has_speech"]
+                if not has_speech:
+                    # Silent windows are reported without a model call and leave the average untouched
+                    outbox.put_nowait({
+                        "type": "no_speech",
+                        "sequence": newest["sequence"],
+                        "language": session.language,
+                        "speech_ratio": speech_ratio,
+                        "window": session.stats(),
+                        "lag_ms": round((time.monotonic() - newest["received_at"]) * 1000.0, 1),
+                        "pipeline": chunks.stats(),
+                        "timings": window_timings.as_dict(),
                         "timestamp": asyncio.get_event_loop().time()
                     })
-                except Exception as e:
-                    await websocket.send_json({
-                        "type": "error",
-                        "message": str(e)
+                    continue
+                try:
+                    ticket = admission.acquire(client, transport="websocket")
+                except Throttled as t:
+                    # Over a limit: this window is skipped and the client told when to expect verdicts again
+                    outbox.put_nowait({
+                        "type": "throttle",
+                        "sequence": newest["sequence"],
+                        "reason": t.reason,
+                        "retry_after": round(t.retry_after, 3),
+                        "message": str(t),
+                        "timestamp": asyncio.get_event_loop().time()
                     })
-            elif message.get("type") == "ping":
-                await websocket.send_json({"type": "pong"})
-                
+                    continue
+                try:
+                    result = session.smooth(await predict_features(features))
+                finally:
+                    admission.release(ticket)
+                VERDICTS.inc(result.get("tier", "gemini"))
+                window_timings.tier = result.get("tier", "gemini")
+                outbox.put_nowait({
+                    "type": "detection_result",
+                    "sequence": newest["sequence"],
+                    "language": session.language,
+                    "classification": result["classification"],
+                    "confidence_score": result["confidence_score"],
+                    "raw_classification": result["raw_classification"],
+                    "raw_confidence_score": result["raw_confidence_score"],
+                    "explanation": result["explanation"],
+                    "tier": result.get("tier", "gemini"),
+                    "speech_ratio": speech_ratio,
+                    "window": session.stats(),
+                    "lag_ms": round((time.monotonic() - newest["received_at"]) * 1000.0, 1),
+                    "pipeline": chunks.stats(),
+                    "timings": window_timings.as_dict(),
+                    "timestamp": asyncio.get_event_loop().time()
+                })
+            except Exception as e:
+                outbox.put_nowait({
+                    "type": "error",
+                    "message": str(e)
+                })
+
+    async def send_results():
+        while True:
+            # Send result back
+            await websocket.send_json(await outbox.get())
+
+    # The receiver runs in this coroutine; analysis and sending run alongside it
+    tasks = [
+        asyncio.ensure_future(analyze_chunks()),
+        asyncio.ensure_future(send_results()),
+    ]
+    try:
+        while True:
+            # Receive audio data from client
+            received = await websocket.receive()
+            if received["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(received.get("code", 1000))
+            try:
+                decode_start = time.perf_counter()
+                if received.get("bytes") is not None:
+                    header, payload = decode_binary_frame(received["bytes"])
+                    y = frame_pcm(header, payload)
+                    if y is not None:
+                        sr = header["sample_rate"]
+                    else:
+                        offload = len(payload) >= OFFLOAD_PAYLOAD_BYTES
+                        y, sr = await run_stage(offload, load_audio, io.BytesIO(payload), stage="decode")
+                        require_finite(y)
+                    chunks.put(ChunkQueue.make_chunk(y, sr, header["sequence"], time.perf_counter() - decode_start,
+                                                     language=header["language"]))
+                else:
+                    message = json.loads(received["text"])
+                    if message.get("type") == "ping":
+                        outbox.put_nowait({"type": "pong"})
+                    elif message.get("type") == "audio_chunk":
+                        language = check_language(message.get("language"))
+                        audio_base64 = message.get("audio")
+                        offload = len(audio_base64) >= OFFLOAD_PAYLOAD_CHARS
+                        audio_bytes = await run_stage(offload, base64.b64decode, audio_base64, stage="base64")
+                        y, sr = await run_stage(offload, load_audio, io.BytesIO(audio_bytes), stage="decode")
+                        require_finite(y)
+                        chunks.put(ChunkQueue.make_chunk(y, sr, message.get("sequence"), time.perf_counter() - decode_start,
+                                                         language=language))
+                    elif message.get("type") == "features":
+                        language = check_language(message.get("language"))
+                        features = AudioFeatures(**message.get("features", {})).model_dump(exclude_none=True)
+                        chunks.put(ChunkQueue.make_chunk(None, 0, message.get("sequence"), time.perf_counter() - decode_start,
+                                                         features=features, language=language))
+            except Exception as e:
+                outbox.put_nowait({
+                    "type": "error",
+                    "message": str(e)
+                })
     except WebSocketDisconnect:
         print("WebSocket disconnected")
     except Exception as e:
         print(f"WebSocket error: {e}")
+    finally:
+        WEBSOCKET_CONNECTIONS.dec()
+        for task in tasks:
+            task.cancel()
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
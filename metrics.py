@@ -0,0 +1,403 @@
+import bisect
+import contextvars
+import math
+import threading
+import time
+
+# Latency buckets in seconds, from sub-millisecond feature extraction up to slow Gemini calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{_escape(value)}"' for name, value in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if len(labels) != len(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {labels}")
+        return tuple(str(label) for label in labels)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1.0):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0.0) + amount
+
+    def render(self):
+        with self._lock:
+            series = list(self._series.items())
+        lines = self.header()
+        for key, value in series:
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = float(value)
+
+    def inc(self, *labels, amount: float = 1.0):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0.0) + amount
+
+    def dec(self, *labels, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+    def render(self):
+        with self._lock:
+            series = list(self._series.items())
+        lines = self.header()
+        for key, value in series:
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels=(), buckets=DEFAULT_BUCKETS):
+        """
+        Fixed-bucket histogram. ``observe`` is a bisect and three additions under a
+        lock, so it is cheap enough to call on every request.
+        """
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+
+    def observe(self, value: float, *labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts (last slot is +Inf), sum, count
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, *labels):
+        """
+        Context manager observing the wall time of its block.
+        """
+        return _Timer(self, labels)
+
+    def render(self):
+        with self._lock:
+            series = [(key, list(counts), total, count) for key, (counts, total, count) in self._series.items()]
+        lines = self.header()
+        for key, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names, key, (("le", _format_value(bound)),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+        return False
+
+
+class RequestTimings:
+    def __init__(self):
+        """
+        Stage durations of one request, reported back to the client in the
+        ``Server-Timing`` header, ``metadata.timings`` and live-monitor results.
+        Stages that run several times (e.g. one decode per live chunk) add up.
+        """
+        self.started_at = time.perf_counter()
+        self.stages = {}
+        self.tier = None
+
+    def add(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def elapsed(self):
+        return time.perf_counter() - self.started_at
+
+    def as_dict(self):
+        """
+        Stage durations in milliseconds, plus the tier that answered.
+        """
+        timings = {f"{stage}_ms": round(seconds * 1000.0, 3) for stage, seconds in self.stages.items()}
+        timings["tier"] = self.tier
+        return timings
+
+    def server_timing(self, total: float = None):
+        entries = [f"{stage};dur={seconds * 1000.0:.3f}" for stage, seconds in self.stages.items()]
+        if total is not None:
+            entries.append(f"total;dur={total * 1000.0:.3f}")
+        if self.tier:
+            entries.append(f'tier;desc="{self.tier}"')
+        return ", ".join(entries)
+
+
+_current_timings = contextvars.ContextVar("current_timings", default=None)
+
+
+def start_timings():
+    """
+    Starts collecting stage timings for the current request (or live window).
+    """
+    timings = RequestTimings()
+    _current_timings.set(timings)
+    return timings
+
+
+def record_timing(stage: str, seconds: float):
+    """
+    Adds a duration to the current request's timings, if one is being collected.
+    """
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+def merge_timings(timings: "RequestTimings"):
+    """
+    Adds timings collected apart (e.g. by the hedged attempt that answered) to the
+    current request's, if one is being collected.
+    """
+    current = _current_timings.get()
+    if current is not None:
+        for stage, seconds in timings.stages.items():
+            current.add(stage, seconds)
+
+
+def timed_stage(stage: str):
+    """
+    Context manager recording its block in the stage histogram and in the current
+    request's timings.
+    """
+    return _StageTimer(stage)
+
+
+class _StageTimer:
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        STAGE_SECONDS.observe(elapsed, self.stage)
+        record_timing(self.stage, elapsed)
+        return False
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """
+        Collection of metrics rendered together in the Prometheus text format.
+
+        Besides metrics updated as events happen, ``collector`` functions are
+        called at scrape time to turn counters kept elsewhere (e.g. the ``stats()``
+        of the cache or the inference executor) into samples.
+        """
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labels=()):
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels=()):
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def collector(self, fn):
+        """
+        Registers ``fn()`` returning an iterable of (name, kind, documentation,
+        [(labels dict, value), ...]) families. Usable as a decorator.
+        """
+        self._collectors.append(fn)
+        return fn
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            try:
+                families = list(collect())
+            except Exception as e:
+                print(f"Metrics collector failed: {e}")
+                continue
+            for name, kind, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    rendered = _format_labels(labels.keys(), labels.values())
+                    lines.append(f"{name}{rendered} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "voice_detect_stage_seconds",
+    "Time spent in each stage of the detection pipeline.",
+    ("stage",),
+)
+INFERENCE_WAIT_SECONDS = REGISTRY.histogram(
+    "voice_detect_inference_wait_seconds",
+    "Time predictions waited for a free inference slot.",
+)
+INFERENCE_CALL_SECONDS = REGISTRY.histogram(
+    "voice_detect_inference_call_seconds",
+    "Duration of classifier calls once a slot was free.",
+    ("kind",),
+)
+GEMINI_CALLS = REGISTRY.counter(
+    "voice_detect_gemini_calls_total",
+    "Gemini calls by kind (single or batch) and outcome (success, parse_fallback or error).",
+    ("kind", "outcome"),
+)
+# Tokens per call, from short single prompts up to large batches
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+GEMINI_TOKENS = REGISTRY.histogram(
+    "voice_detect_gemini_tokens",
+    "Tokens per Gemini call by kind (single or batch) and direction (prompt, output or thoughts).",
+    ("kind", "direction"),
+    buckets=TOKEN_BUCKETS,
+)
+GEMINI_ATTEMPTS = REGISTRY.counter(
+    "voice_detect_gemini_attempts_total",
+    "Gemini attempts made by the resilient predictor, by attempt (primary, retry or hedge) "
+    "and outcome (success, error, timeout or cancelled).",
+    ("attempt", "outcome"),
+)
+GEMINI_FALLBACKS = REGISTRY.counter(
+    "voice_detect_gemini_fallbacks_total",
+    "Predictions answered locally instead of by Gemini, by reason "
+    "(circuit_open, budget_exhausted or not_retryable).",
+    ("reason",),
+)
+CIRCUIT_STATE = REGISTRY.gauge(
+    "voice_detect_circuit_state",
+    "1 for the state the Gemini circuit breaker is in (closed, open or half_open), 0 for the others.",
+    ("state",),
+)
+CIRCUIT_TRANSITIONS = REGISTRY.counter(
+    "voice_detect_circuit_transitions_total",
+    "Gemini circuit breaker state changes.",
+    ("from_state", "to_state"),
+)
+ADMISSION_REJECTIONS = REGISTRY.counter(
+    "voice_detect_admission_rejections_total",
+    "Requests and live windows turned away by admission control, by reason "
+    "(concurrency, global_rate or client_rate) and transport (http or websocket).",
+    ("reason", "transport"),
+)
+VERDICTS = REGISTRY.counter(
+    "voice_detect_verdicts_total",
+    "Verdicts returned, by the tier that answered.",
+    ("tier",),
+)
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    "voice_detect_http_requests_in_flight",
+    "HTTP requests currently being served.",
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "voice_detect_http_request_seconds",
+    "HTTP request latency by method, route and status code.",
+    ("method", "path", "status"),
+)
+WEBSOCKET_CONNECTIONS = REGISTRY.gauge(
+    "voice_detect_websocket_connections",
+    "Open live-monitor WebSocket connections.",
+)
+HTTP_REQUESTS_IN_FLIGHT.set(0)
+WEBSOCKET_CONNECTIONS.set(0)
+
+
+class MetricsMiddleware:
+    def __init__(self, app, paths=None):
+        """
+        ASGI middleware recording in-flight HTTP requests and their latency.
+
+        Args:
+            app: the wrapped ASGI application.
+            paths: callable returning the set of known paths; other paths are
+                labelled ``other`` so unknown URLs cannot explode label cardinality.
+        """
+        self.app = app
+        self.paths = paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope.get("path", "")
+        if self.paths is not None and path not in self.paths():
+            path = "other"
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, scope.get("method", ""), path, status["code"])
@@ -1,51 +1,242 @@
 import os
-import google.generativeai as genai
+import threading
+import httpx
 import json
 
+from metrics import GEMINI_CALLS, GEMINI_TOKENS
+
+DEFAULT_API_ENDPOINT = "https://generativelanguage.googleapis.com"
+DEFAULT_MODEL_NAME = "gemini-2.5-flash"
+
+# Prompt styles: "compact" sends a short template and has Gemini constrain its reply to
+# VERDICT_SCHEMA; "legacy" is the original long-form prompt, kept for comparison and rollback
+PROMPT_COMPACT = "compact"
+PROMPT_LEGACY = "legacy"
+PROMPT_STYLES = (PROMPT_COMPACT, PROMPT_LEGACY)
+
+_VERDICT_PROPERTIES = {
+    "classification": {"type": "STRING", "enum": ["AI-Generated", "Human"]},
+    "confidence_score": {"type": "NUMBER"},
+    "explanation": {"type": "STRING"},
+}
+VERDICT_SCHEMA = {
+    "type": "OBJECT",
+    "properties": _VERDICT_PROPERTIES,
+    "required": ["classification", "confidence_score", "explanation"],
+}
+BATCH_VERDICT_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {"id": {"type": "INTEGER"}, **_VERDICT_PROPERTIES},
+        "required": ["id", "classification", "confidence_score", "explanation"],
+    },
+}
+
+COMPACT_INSTRUCTIONS = (
+    "Classify the speaker as AI-Generated or Human from these clip-level audio features. "
+    "Synthetic voices tend to show unnaturally steady spectra, regular zero-crossing rates "
+    "and smooth energy. Give confidence_score in [0, 1] and a one-sentence explanation."
+)
+
 class VoiceClassifier:
-    def __init__(self, api_key: str = None):
+    def __init__(
+        self,
+        api_key: str = None,
+        endpoint: str = None,
+        pool_size: int = None,
+        connect_timeout: float = None,
+        read_timeout: float = None,
+        prompt_style: str = None,
+    ):
         """
         Initialize the classifier with Gemini API.
         
         Args:
             api_key: Google Gemini API key. If not provided, will look for GEMINI_API_KEY env variable.
+            endpoint: Base URL of the Gemini API. Defaults to GEMINI_API_ENDPOINT or the public endpoint;
+                point it at a local stand-in server for load testing.
+            pool_size: Maximum pooled keep-alive connections used by ``apredict`` (GEMINI_HTTP_POOL_SIZE, default 20).
+            connect_timeout: Seconds to establish a connection (GEMINI_CONNECT_TIMEOUT, default 5).
+            read_timeout: Seconds to wait for a response (GEMINI_READ_TIMEOUT, default 30).
+            prompt_style: ``compact`` (short prompt, JSON schema output) or ``legacy``
+                (GEMINI_PROMPT_STYLE, default compact).
         """
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
+        self.endpoint = (endpoint or os.getenv("GEMINI_API_ENDPOINT") or DEFAULT_API_ENDPOINT).rstrip("/")
+        self.pool_size = int(pool_size or os.getenv("GEMINI_HTTP_POOL_SIZE", "20"))
+        self.connect_timeout = float(connect_timeout or os.getenv("GEMINI_CONNECT_TIMEOUT", "5"))
+        self.read_timeout = float(read_timeout or os.getenv("GEMINI_READ_TIMEOUT", "30"))
+        self.model_name = DEFAULT_MODEL_NAME
+        self.prompt_style = (prompt_style or os.getenv("GEMINI_PROMPT_STYLE", PROMPT_COMPACT)).lower()
+        if self.prompt_style not in PROMPT_STYLES:
+            raise ValueError(f"Unknown prompt style '{self.prompt_style}', expected one of {PROMPT_STYLES}")
+        self.usage = {"calls": 0, "prompt_tokens": 0, "output_tokens": 0, "thoughts_tokens": 0}
+        self._usage_lock = threading.Lock()
+        self._http_client = None
+        self._model = None
+        self._model_lock = threading.Lock()
         
         if not self.api_key:
             raise ValueError(
                 "Gemini API key is required. Set GEMINI_API_KEY environment variable or pass api_key parameter."
             )
-        
-        # Configure Gemini with custom endpoint
-        genai.configure(
-            api_key=self.api_key,
-            transport='rest',
-            client_options={'api_endpoint': 'https://generativelanguage.googleapis.com'}
-        )
-        # Using gemini-2.5-flash for cost-effective text generation
-        # Available models: gemini-2.5-flash, gemini-2.5-pro, gemini-flash-latest
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
         self.is_loaded = True
-        print("Gemini API initialized successfully with endpoint: https://generativelanguage.googleapis.com")
 
-    def predict(self, features: dict):
+    @property
+    def model(self):
         """
-        Predicts whether the voice is AI-generated or Human using Gemini AI.
-        
-        Args:
-            features (dict): extracted features from preprocessing.
-            
-        Returns:
-            dict: {
-                "classification": "AI-Generated" | "Human",
-                "confidence_score": float (0.0 to 1.0),
-                "explanation": str
+        The SDK model used by the blocking ``predict`` path. ``google.generativeai``
+        is imported and configured on first use: the import alone is most of a cold
+        start, and the async path never needs it.
+        """
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    import google.generativeai as genai
+
+                    # Configure Gemini with custom endpoint
+                    genai.configure(
+                        api_key=self.api_key,
+                        transport='rest',
+                        client_options={'api_endpoint': self.endpoint}
+                    )
+                    # Using gemini-2.5-flash for cost-effective text generation
+                    # Available models: gemini-2.5-flash, gemini-2.5-pro, gemini-flash-latest
+                    self._model = genai.GenerativeModel(self.model_name)
+                    print(f"Gemini API initialized successfully with endpoint: {self.endpoint}")
+        return self._model
+
+    def warm_up(self, use_async: bool = False):
+        """
+        Builds the client the configured prediction path will use, so the first
+        request does not pay for it.
+        """
+        if use_async:
+            self._get_http_client()
+        else:
+            self.model
+
+    def _get_http_client(self):
+        """
+        Returns the shared keep-alive HTTP client used by ``apredict``, creating it on first use.
+        """
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = httpx.AsyncClient(
+                base_url=self.endpoint,
+                headers={"x-goog-api-key": self.api_key},
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.pool_size,
+                ),
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            )
+        return self._http_client
+
+    async def aclose(self):
+        """
+        Closes the pooled HTTP client used by ``apredict``.
+        """
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+    @staticmethod
+    def _feature_line(features: dict):
+        return (
+            f"duration_s={features.get('duration', 0):.2f} "
+            f"centroid_hz={features.get('spectral_centroid_mean', 0):.1f} "
+            f"rolloff_hz={features.get('spectral_rolloff_mean', 0):.1f} "
+            f"zcr={features.get('zero_crossing_rate_mean', 0):.5f} "
+            f"rms={features.get('rms_mean', 0):.5f}"
+        )
+
+    def _build_prompt(self, features: dict):
+        if self.prompt_style == PROMPT_LEGACY:
+            return self._build_legacy_prompt(features)
+        return f"{COMPACT_INSTRUCTIONS}\n{self._feature_line(features)}"
+
+    def _build_batch_prompt(self, features_list: list):
+        if self.prompt_style == PROMPT_LEGACY:
+            return self._build_legacy_batch_prompt(features_list)
+        lines = "\n".join(f"{i}. {self._feature_line(features)}" for i, features in enumerate(features_list, start=1))
+        return f"{COMPACT_INSTRUCTIONS} Judge each numbered clip independently and answer with its id.\n{lines}"
+
+    def _generation_config(self, batch: bool = False):
+        """
+        Structured-output settings for the compact prompt (None for the legacy one):
+        Gemini is constrained to JSON matching the verdict schema, so replies parse
+        without fence stripping or text matching.
+        """
+        if self.prompt_style == PROMPT_LEGACY:
+            return None
+        return {
+            "response_mime_type": "application/json",
+            "response_schema": BATCH_VERDICT_SCHEMA if batch else VERDICT_SCHEMA,
+        }
+
+    def _request_body(self, prompt: str, batch: bool = False):
+        """
+        REST ``generateContent`` body for ``apredict``/``apredict_batch``.
+        """
+        body = {"contents": [{"parts": [{"text": prompt}]}]}
+        config = self._generation_config(batch)
+        if config is not None:
+            body["generationConfig"] = {
+                "responseMimeType": config["response_mime_type"],
+                "responseSchema": config["response_schema"],
             }
+        return body
+
+    def _record_usage(self, kind: str, prompt_tokens: int, output_tokens: int, thoughts_tokens: int = 0):
         """
-        try:
-            # Prepare prompt with audio features for Gemini
-            prompt = f"""
+        Adds one call's token counts to the per-call histograms and the running totals.
+        """
+        GEMINI_TOKENS.observe(prompt_tokens, kind, "prompt")
+        GEMINI_TOKENS.observe(output_tokens, kind, "output")
+        if thoughts_tokens:
+            GEMINI_TOKENS.observe(thoughts_tokens, kind, "thoughts")
+        with self._usage_lock:
+            self.usage["calls"] += 1
+            self.usage["prompt_tokens"] += prompt_tokens
+            self.usage["output_tokens"] += output_tokens
+            self.usage["thoughts_tokens"] += thoughts_tokens
+
+    def _record_sdk_usage(self, kind: str, response):
+        usage = getattr(response, "usage_metadata", None)
+        if usage is None:
+            return
+        self._record_usage(
+            kind,
+            int(getattr(usage, "prompt_token_count", 0) or 0),
+            int(getattr(usage, "candidates_token_count", 0) or 0),
+            int(getattr(usage, "thoughts_token_count", 0) or 0),
+        )
+
+    def _record_rest_usage(self, kind: str, payload: dict):
+        usage = payload.get("usageMetadata")
+        if not usage:
+            return
+        self._record_usage(
+            kind,
+            int(usage.get("promptTokenCount", 0)),
+            int(usage.get("candidatesTokenCount", 0)),
+            int(usage.get("thoughtsTokenCount", 0)),
+        )
+
+    def stats(self):
+        with self._usage_lock:
+            usage = dict(self.usage)
+        calls = usage["calls"]
+        return {
+            "prompt_style": self.prompt_style,
+            **usage,
+            "prompt_tokens_per_call": round(usage["prompt_tokens"] / calls, 1) if calls else 0.0,
+            "output_tokens_per_call": round(usage["output_tokens"] / calls, 1) if calls else 0.0,
+        }
+
+    def _build_legacy_prompt(self, features: dict):
+        return f"""
 You are an expert audio forensics AI specializing in detecting AI-generated voices.
 
 Analyze the following audio features and determine if this voice is AI-Generated or Human:
@@ -74,44 +265,86 @@ Key indicators to look for:
 Respond ONLY with valid JSON, no additional text.
 """
 
-            # Call Gemini API
-            response = self.model.generate_content(prompt)
-            response_text = response.text.strip()
-            
+    def _build_legacy_batch_prompt(self, features_list: list):
+        feature_sets = "\n".join(
+            f"{i}. Duration: {features.get('duration', 0):.2f} s | "
+            f"Spectral Centroid (mean): {features.get('spectral_centroid_mean', 0):.2f} Hz | "
+            f"Spectral Rolloff (mean): {features.get('spectral_rolloff_mean', 0):.2f} Hz | "
+            f"Zero Crossing Rate (mean): {features.get('zero_crossing_rate_mean', 0):.6f} | "
+            f"RMS Energy (mean): {features.get('rms_mean', 0):.6f}"
+            for i, features in enumerate(features_list, start=1)
+        )
+        return f"""
+You are an expert audio forensics AI specializing in detecting AI-generated voices.
+
+Analyze each numbered set of audio features below and determine, for each one independently, if the voice is AI-Generated or Human:
+
+{feature_sets}
+
+Key indicators to look for:
+- AI-generated voices often have unnatural spectral consistency
+- Unusual patterns in zero-crossing rates
+- Artificial smoothness in energy levels
+- Anomalies in formant transitions
+
+Respond ONLY with a valid JSON array of exactly {len(features_list)} objects, one per feature set, in the same order:
+[
+  {{"id": 1, "classification": "AI-Generated" or "Human", "confidence_score": a number between 0.0 and 1.0, "explanation": "Short explanation"}}
+]
+"""
+
+    @staticmethod
+    def _strip_code_fences(response_text: str):
+        response_text = response_text.strip()
+        # Sometimes the model might wrap it in markdown code blocks
+        if response_text.startswith("```"):
+            # Remove code block markers
+            response_text = response_text.replace("```json", "").replace("```", "").strip()
+        return response_text
+
+    @staticmethod
+    def _normalize_result(result: dict):
+        """
+        Validates and normalizes one parsed verdict object.
+        """
+        classification = str(result.get("classification", "Unknown"))
+        if classification not in ["AI-Generated", "Human"]:
+            # Try to normalize common variations
+            classification_lower = classification.lower()
+            if "ai" in classification_lower or "generated" in classification_lower:
+                classification = "AI-Generated"
+            elif "human" in classification_lower:
+                classification = "Human"
+            else:
+                classification = "Unknown"
+        
+        confidence_score = float(result.get("confidence_score", 0.5))
+        confidence_score = max(0.0, min(1.0, confidence_score))  # Clamp between 0 and 1
+        
+        explanation = result.get("explanation", "Analysis completed using Gemini AI.")
+        
+        return {
+            "classification": classification,
+            "confidence_score": round(confidence_score, 4),
+            "explanation": explanation
+        }
+
+    def _parse_response(self, response_text: str):
+        """
+        Turns the raw Gemini reply into a normalized prediction dict.
+        """
+        try:
             # Clean response to extract JSON
-            # Sometimes the model might wrap it in markdown code blocks
-            if response_text.startswith("```"):
-                # Remove code block markers
-                response_text = response_text.replace("```json", "").replace("```", "").strip()
+            response_text = self._strip_code_fences(response_text)
             
             # Parse JSON response
-            result = json.loads(response_text)
-            
-            # Validate and normalize the response
-            classification = result.get("classification", "Unknown")
-            if classification not in ["AI-Generated", "Human"]:
-                # Try to normalize common variations
-                classification_lower = classification.lower()
-                if "ai" in classification_lower or "generated" in classification_lower:
-                    classification = "AI-Generated"
-                elif "human" in classification_lower:
-                    classification = "Human"
-                else:
-                    classification = "Unknown"
-            
-            confidence_score = float(result.get("confidence_score", 0.5))
-            confidence_score = max(0.0, min(1.0, confidence_score))  # Clamp between 0 and 1
-            
-            explanation = result.get("explanation", "Analysis completed using Gemini AI.")
-            
-            return {
-                "classification": classification,
-                "confidence_score": round(confidence_score, 4),
-                "explanation": explanation
-            }
+            result = self._normalize_result(json.loads(response_text))
+            GEMINI_CALLS.inc("single", "success")
+            return result
             
         except json.JSONDecodeError as e:
             print(f"Failed to parse Gemini response: {response_text}")
+            GEMINI_CALLS.inc("single", "parse_fallback")
             # Fallback: Try to extract information from text
             response_lower = response_text.lower()
             if "ai-generated" in response_lower or "ai generated" in response_lower:
@@ -126,11 +359,212 @@ Respond ONLY with valid JSON, no additional text.
                 "confidence_score": 0.5,
                 "explanation": f"Analysis completed but response format was unexpected. Raw response: {response_text[:200]}"
             }
+
+    @staticmethod
+    def _request_options(timeout, raise_errors: bool = False):
+        # Bounds the SDK call by the caller's remaining budget. A caller that handles
+        # failures itself also gets no SDK-side retries, which would overrun that budget.
+        options = {}
+        if timeout:
+            options["timeout"] = timeout
+        if raise_errors:
+            options["retry"] = None
+        return options or None
+
+    def _request_timeout(self, timeout):
+        if not timeout:
+            return httpx.USE_CLIENT_DEFAULT
+        return httpx.Timeout(min(self.read_timeout, timeout), connect=min(self.connect_timeout, timeout))
+
+    def _error_result(self, error: Exception, raise_errors: bool = False):
+        print(f"Error during Gemini prediction: {error}")
+        GEMINI_CALLS.inc("single", "error")
+        if raise_errors:
+            raise error
+        return {
+            "classification": "Unknown",
+            "confidence_score": 0.0,
+            "explanation": f"Error during analysis: {str(error)}"
+        }
+
+    def predict(self, features: dict, timeout: float = None, raise_errors: bool = False):
+        """
+        Predicts whether the voice is AI-generated or Human using Gemini AI.
+        
+        Args:
+            features (dict): extracted features from preprocessing.
+            timeout (float): seconds the Gemini call may take; the SDK default when None.
+            raise_errors (bool): re-raise call failures instead of returning an
+                "Unknown" verdict, so the caller can retry or fall back.
             
-        except Exception as e:
-            print(f"Error during Gemini prediction: {e}")
-            return {
-                "classification": "Unknown",
-                "confidence_score": 0.0,
-                "explanation": f"Error during analysis: {str(e)}"
+        Returns:
+            dict: {
+                "classification": "AI-Generated" | "Human",
+                "confidence_score": float (0.0 to 1.0),
+                "explanation": str
             }
+        """
+        try:
+            # Call Gemini API
+            response = self.model.generate_content(
+                self._build_prompt(features),
+                generation_config=self._generation_config(),
+                request_options=self._request_options(timeout, raise_errors),
+            )
+            self._record_sdk_usage("single", response)
+            return self._parse_response(response.text)
+        except Exception as e:
+            return self._error_result(e, raise_errors)
+
+    async def apredict(self, features: dict, timeout: float = None, raise_errors: bool = False):
+        """
+        Async equivalent of ``predict`` that calls the Gemini REST API over a pooled
+        keep-alive HTTP client instead of the blocking SDK.
+        """
+        try:
+            client = self._get_http_client()
+            response = await client.post(
+                f"/v1beta/models/{self.model_name}:generateContent",
+                json=self._request_body(self._build_prompt(features)),
+                timeout=self._request_timeout(timeout),
+            )
+            response.raise_for_status()
+            payload = response.json()
+            self._record_rest_usage("single", payload)
+            parts = payload["candidates"][0]["content"]["parts"]
+            return self._parse_response("".join(part.get("text", "") for part in parts))
+        except Exception as e:
+            return self._error_result(e, raise_errors)
+
+    def _parse_batch_response(self, response_text: str, size: int):
+        """
+        Maps a JSON array reply back onto the numbered feature sets.
+
+        Returns a list of ``size`` prediction dicts, with None for every item the
+        reply did not answer usably so the caller can fall back to ``predict``.
+        """
+        results = [None] * size
+        try:
+            items = json.loads(self._strip_code_fences(response_text))
+        except json.JSONDecodeError:
+            print(f"Failed to parse Gemini batch response: {response_text[:200]}")
+            GEMINI_CALLS.inc("batch", "parse_fallback")
+            return results
+        if not isinstance(items, list):
+            GEMINI_CALLS.inc("batch", "parse_fallback")
+            return results
+
+        for position, item in enumerate(items):
+            if not isinstance(item, dict):
+                continue
+            index = item.get("id")
+            if isinstance(index, int) and 1 <= index <= size:
+                index -= 1
+            elif len(items) == size:
+                # No usable id, so only trust the position when the length matches
+                index = position
+            else:
+                continue
+            if results[index] is not None:
+                continue
+            try:
+                result = self._normalize_result(item)
+            except (TypeError, ValueError):
+                continue
+            if result["classification"] != "Unknown":
+                results[index] = result
+        GEMINI_CALLS.inc("batch", "success" if all(r is not None for r in results) else "parse_fallback")
+        return results
+
+    def predict_batch(self, features_list: list, timeout: float = None, raise_errors: bool = False):
+        """
+        Classifies several feature sets with a single Gemini call.
+
+        Returns a list aligned with ``features_list``; entries are None where the
+        batched reply was missing, malformed or the call failed. ``timeout`` and
+        ``raise_errors`` are as for ``predict``.
+        """
+        try:
+            response = self.model.generate_content(
+                self._build_batch_prompt(features_list),
+                generation_config=self._generation_config(batch=True),
+                request_options=self._request_options(timeout, raise_errors),
+            )
+            self._record_sdk_usage("batch", response)
+            return self._parse_batch_response(response.text, len(features_list))
+        except Exception as e:
+            print(f"Error during Gemini batch prediction: {e}")
+            GEMINI_CALLS.inc("batch", "error")
+            if raise_errors:
+                raise
+            return [None] * len(features_list)
+
+    async def apredict_batch(self, features_list: list, timeout: float = None, raise_errors: bool = False):
+        """
+        Async equivalent of ``predict_batch`` over the pooled HTTP client.
+        """
+        try:
+            client = self._get_http_client()
+            response = await client.post(
+                f"/v1beta/models/{self.model_name}:generateContent",
+                json=self._request_body(self._build_batch_prompt(features_list), batch=True),
+                timeout=self._request_timeout(timeout),
+            )
+            response.raise_for_status()
+            payload = response.json()
+            self._record_rest_usage("batch", payload)
+            parts = payload["candidates"][0]["content"]["parts"]
+            return self._parse_batch_response("".join(part.get("text", "") for part in parts), len(features_list))
+        except Exception as e:
+            print(f"Error during Gemini batch prediction: {e}")
+            GEMINI_CALLS.inc("batch", "error")
+            if raise_errors:
+                raise
+            return [None] * len(features_list)
+
+
+class ClassifierUnavailable(RuntimeError):
+    """Raised when the classifier cannot be built, e.g. because no API key is configured."""
+
+
+class LazyClassifier:
+    def __init__(self, factory=VoiceClassifier):
+        """
+        Stands in for a VoiceClassifier that is only built on first use, so the app
+        imports and serves ``/health`` and the static pages without the Gemini
+        client, or even an API key. Attribute access is forwarded to the real
+        instance; concurrent first uses build exactly one.
+
+        Args:
+            factory: zero-argument callable returning the classifier.
+        """
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+
+    @property
+    def initialized(self):
+        return self._instance is not None
+
+    def get(self):
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    try:
+                        self._instance = self._factory()
+                    except ValueError as e:
+                        raise ClassifierUnavailable(str(e)) from e
+        return self._instance
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+    def stats(self):
+        if self._instance is None:
+            return {"initialized": False}
+        return {"initialized": True, **self._instance.stats()}
+
+    async def aclose(self):
+        # Nothing to close if the classifier was never built
+        if self._instance is not None:
+            await self._instance.aclose()
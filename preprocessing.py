@@ -1,8 +1,8 @@
 import base64
+import functools
 import io
 import numpy as np
 import soundfile as sf
-import wave
 import struct
 
 def decode_audio(base64_string: str):
@@ -11,7 +11,12 @@ def decode_audio(base64_string: str):
     """
     # Decode base64 string
     audio_bytes = base64.b64decode(base64_string)
-    audio_file = io.BytesIO(audio_bytes)
+    return load_audio(io.BytesIO(audio_bytes))
+
+def load_audio(audio_file):
+    """
+    Reads a seekable file-like object (or path) into a mono float32 array and sampling rate.
+    """
     # Try reading with soundfile (supports many formats on libsndfile)
     try:
         y, sr = sf.read(audio_file, always_2d=False)
@@ -20,75 +25,528 @@ def decode_audio(base64_string: str):
             y = np.mean(y, axis=1)
         return y.astype(np.float32), int(sr)
     except Exception:
-        # Fallback: try WAV via built-in wave module
+        # Fallback: parse WAV directly
         try:
-            audio_file.seek(0)
-            with wave.open(audio_file, "rb") as wf:
-                sr = wf.getframerate()
-                n_frames = wf.getnframes()
-                n_channels = wf.getnchannels()
-                sampwidth = wf.getsampwidth()
-                frames = wf.readframes(n_frames)
-                # Convert bytes to numpy array
-                fmt_char = {1: 'b', 2: 'h', 4: 'i'}.get(sampwidth)
-                if not fmt_char:
-                    raise ValueError("Unsupported sample width")
-                fmt = f"<{n_frames * n_channels}{fmt_char}"
-                data = struct.unpack(fmt, frames)
-                y = np.array(data, dtype=np.float32)
-                if n_channels > 1:
-                    y = y.reshape(-1, n_channels).mean(axis=1)
-                # Normalize based on bit depth
-                max_val = float(2 ** (8 * sampwidth - 1))
-                y = y / max_val
-                return y, sr
+            if hasattr(audio_file, "seek"):
+                audio_file.seek(0)
+            return read_wav(audio_file)
         except Exception as e:
             raise ValueError(f"Unsupported or unreadable audio format: {str(e)}")
 
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+def read_wav(audio_file):
+    """
+    Decodes a RIFF/WAVE file (or path) into a mono float32 array and sampling rate.
+
+    Supports 8/16/24/32-bit integer PCM and 32/64-bit float, including
+    WAVE_FORMAT_EXTENSIBLE headers. Samples are viewed in place with
+    ``np.frombuffer`` and converted to float32 once; downmixing and
+    normalisation reuse that array.
+    """
+    if isinstance(audio_file, (str, bytes)) or hasattr(audio_file, "__fspath__"):
+        with open(audio_file, "rb") as f:
+            return read_wav(f)
+
+    header = audio_file.read(12)
+    if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+        raise ValueError("file does not start with RIFF/WAVE header")
+
+    fmt = None
+    data = None
+    while True:
+        chunk_header = audio_file.read(8)
+        if len(chunk_header) < 8:
+            break
+        chunk_id = chunk_header[:4]
+        chunk_size = struct.unpack("<I", chunk_header[4:])[0]
+        if chunk_id == b"fmt ":
+            fmt = audio_file.read(chunk_size)
+        elif chunk_id == b"data":
+            # Streamed writers may leave the size unset; read to the end in that case
+            data = audio_file.read(chunk_size if chunk_size not in (0, 0xFFFFFFFF) else -1)
+            break
+        else:
+            audio_file.seek(chunk_size, 1)
+        if chunk_size % 2:
+            audio_file.seek(1, 1)
+
+    if fmt is None or len(fmt) < 16:
+        raise ValueError("missing fmt chunk")
+    if data is None:
+        raise ValueError("missing data chunk")
+
+    format_tag, n_channels, sr, _, block_align, bits = struct.unpack("<HHIIHH", fmt[:16])
+    if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+        # The sub-format GUID starts with the actual format tag
+        format_tag = struct.unpack("<H", fmt[24:26])[0]
+    if n_channels < 1:
+        raise ValueError("invalid channel count")
+    # Samples sit in containers of block_align / channels bytes; 12- or 20-bit audio is
+    # stored left-justified in 16- or 24-bit containers and reads like those
+    sampwidth = block_align // n_channels if block_align >= n_channels else (bits + 7) // 8
+
+    # Drop a trailing partial frame, if any
+    n_bytes = len(data) - len(data) % (sampwidth * n_channels)
+    data = memoryview(data)[:n_bytes]
+
+    if format_tag == WAVE_FORMAT_IEEE_FLOAT and sampwidth in (4, 8):
+        samples = np.frombuffer(data, dtype="<f4" if sampwidth == 4 else "<f8")
+        scale = 1.0
+    elif format_tag == WAVE_FORMAT_PCM and sampwidth == 1:
+        # 8-bit WAV is unsigned, centred on 128
+        samples = np.frombuffer(data, dtype=np.uint8)
+        scale = 1.0 / 128.0
+    elif format_tag == WAVE_FORMAT_PCM and sampwidth == 2:
+        samples = np.frombuffer(data, dtype="<i2")
+        scale = 1.0 / 32768.0
+    elif format_tag == WAVE_FORMAT_PCM and sampwidth == 3:
+        # Place each 3-byte sample in the top of an int32, then shift back down to sign-extend
+        packed = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)
+        samples = np.zeros(len(packed), dtype="<i4")
+        samples.view(np.uint8).reshape(-1, 4)[:, 1:] = packed
+        samples >>= 8
+        scale = 1.0 / 8388608.0
+    elif format_tag == WAVE_FORMAT_PCM and sampwidth == 4:
+        samples = np.frombuffer(data, dtype="<i4")
+        scale = 1.0 / 2147483648.0
+    else:
+        raise ValueError(f"Unsupported WAV encoding (format {format_tag}, {bits} bits)")
+
+    # One float32 allocation; remaining channels are summed into it in place
+    y = samples[0::n_channels].astype(np.float32)
+    for channel in range(1, n_channels):
+        y += samples[channel::n_channels]
+    if sampwidth == 1 and format_tag == WAVE_FORMAT_PCM:
+        y -= 128.0 * n_channels
+    scale /= n_channels
+    if scale != 1.0:
+        y *= scale
+    return y, int(sr)
+
+# STFT framing used for the spectral features
+N_FFT = 2048
+HOP_LENGTH = 512
+# Frames transformed per rfft call; bounds the temporary spectrum memory on long clips
+FRAME_BLOCK = 512
+
+@functools.lru_cache(maxsize=32)
+def _stft_basis(n_fft: int, sr: int):
+    """
+    Hann window and rfft bin frequencies for a frame size, cached per (n_fft, sr).
+    """
+    window = np.hanning(n_fft).astype(np.float32)
+    if sr:
+        freqs = np.fft.rfftfreq(n_fft, d=1.0 / sr)
+    else:
+        freqs = np.arange(n_fft // 2 + 1, dtype=np.float64)
+    window.flags.writeable = False
+    freqs.flags.writeable = False
+    return window, freqs
+
+def frame_signal(y, n_fft: int = N_FFT, hop_length: int = HOP_LENGTH):
+    """
+    Returns a read-only (n_frames, n_fft) strided view of ``y`` without copying samples.
+    Signals shorter than ``n_fft`` yield a single frame covering the whole signal.
+    """
+    y = np.asarray(y)
+    n_fft = min(n_fft, len(y))
+    return np.lib.stride_tricks.sliding_window_view(y, n_fft)[::hop_length]
+
+def spectral_frame_stats(frames, sr):
+    """
+    Per-frame spectral centroid and 85% rolloff for a block of frames, computed with
+    one batched rfft per FRAME_BLOCK frames.
+    """
+    n_frames, n_fft = frames.shape
+    window, freqs = _stft_basis(n_fft, sr)
+    centroids = np.empty(n_frames, dtype=np.float64)
+    rolloffs = np.empty(n_frames, dtype=np.float64)
+    for start in range(0, n_frames, FRAME_BLOCK):
+        stop = min(start + FRAME_BLOCK, n_frames)
+        spectrum = np.abs(np.fft.rfft(frames[start:stop] * window, axis=1))
+
+        # Spectral centroid (0 for silent frames)
+        total = spectrum.sum(axis=1)
+        weighted = spectrum @ freqs
+        centroids[start:stop] = np.divide(weighted, total, out=np.zeros_like(weighted), where=total > 0)
+
+        # Spectral rolloff (frequency below which 85% of energy is contained)
+        cumsum = np.cumsum(spectrum, axis=1)
+        rolloff_idx = np.argmax(cumsum >= 0.85 * cumsum[:, -1:], axis=1)
+        rolloffs[start:stop] = freqs[rolloff_idx]
+    return centroids, rolloffs
+
 def extract_features(y, sr):
     """
     Extracts features from the audio signal for AI voice detection.
     Returns features that are analyzed by Gemini AI.
+
+    Spectral features are per-frame means and variances over the whole signal
+    (Hann window of N_FFT samples, HOP_LENGTH hop).
     """
     # Basic feature set implemented using numpy
     y = np.asarray(y, dtype=np.float32)
     duration = float(len(y) / sr) if sr else 0.0
     
     # RMS energy
-    rms_mean = float(np.sqrt(np.mean(y ** 2))) if y.size else 0.0
+    rms_mean = float(np.sqrt(np.mean(np.square(y, dtype=np.float64)))) if y.size else 0.0
     
     # Zero crossing rate
-    zero_crossing_rate_mean = float(np.mean(np.abs(np.diff(np.sign(y)))) / 2.0) if y.size else 0.0
+    zero_crossing_rate_mean = float(np.mean(np.abs(np.diff(np.sign(y))), dtype=np.float64) / 2.0) if y.size else 0.0
     
     # Spectral features
     if y.size:
-        # Use a window to avoid edge artifacts
-        win = min(len(y), 2048)
-        segment = y[:win]
-        window = np.hanning(win)
-        segment = segment * window
-        spectrum = np.abs(np.fft.rfft(segment))
-        freqs = np.fft.rfftfreq(win, d=1.0 / sr) if sr else np.arange(len(spectrum))
-        
-        # Spectral centroid
-        if spectrum.sum() > 0:
-            spectral_centroid_mean = float((freqs * spectrum).sum() / spectrum.sum())
-        else:
-            spectral_centroid_mean = 0.0
-        
-        # Spectral rolloff (frequency below which 85% of energy is contained)
-        cumsum = np.cumsum(spectrum)
-        rolloff_threshold = 0.85 * cumsum[-1]
-        rolloff_idx = np.where(cumsum >= rolloff_threshold)[0]
-        spectral_rolloff_mean = float(freqs[rolloff_idx[0]]) if len(rolloff_idx) > 0 else 0.0
+        centroids, rolloffs = spectral_frame_stats(frame_signal(y), sr)
+        spectral_centroid_mean = float(centroids.mean())
+        spectral_centroid_var = float(centroids.var())
+        spectral_rolloff_mean = float(rolloffs.mean())
+        spectral_rolloff_var = float(rolloffs.var())
     else:
         spectral_centroid_mean = 0.0
+        spectral_centroid_var = 0.0
         spectral_rolloff_mean = 0.0
+        spectral_rolloff_var = 0.0
     
     return {
         "rms_mean": rms_mean,
         "zero_crossing_rate_mean": zero_crossing_rate_mean,
         "spectral_centroid_mean": spectral_centroid_mean,
+        "spectral_centroid_var": spectral_centroid_var,
         "spectral_rolloff_mean": spectral_rolloff_mean,
+        "spectral_rolloff_var": spectral_rolloff_var,
         "duration": duration
     }
+
+# Voice activity detection: 20 ms frames scored by RMS level and zero-crossing rate
+VAD_FRAME_SECONDS = 0.02
+VAD_ENERGY_FLOOR_DB = -50.0
+VAD_TOP_DB = 40.0
+VAD_MAX_ZCR = 0.45
+VAD_PAD_SECONDS = 0.1
+VAD_MIN_SPEECH_SECONDS = 0.2
+
+class SpeechDetector:
+    """
+    Running form of ``detect_speech``: feed consecutive blocks of mono float32
+    samples with ``update`` and read the result with ``result``. Only a level and
+    a zero-crossing rate per VAD frame are kept, so whole recordings can be
+    scanned block by block. Arguments are as for ``detect_speech``.
+    """
+    def __init__(self, sr: int, energy_floor_db: float = VAD_ENERGY_FLOOR_DB,
+                 min_speech_seconds: float = VAD_MIN_SPEECH_SECONDS,
+                 top_db: float = VAD_TOP_DB, max_zcr: float = VAD_MAX_ZCR):
+        self.sr = int(sr)
+        self.energy_floor_db = energy_floor_db
+        self.min_speech_seconds = min_speech_seconds
+        self.top_db = top_db
+        self.max_zcr = max_zcr
+        # Without a sampling rate the whole signal is scored as one frame
+        self.frame = max(1, int(self.sr * VAD_FRAME_SECONDS)) if self.sr else None
+        self.n_samples = 0
+        self._levels = []
+        self._zcrs = []
+        # Samples after the last complete frame
+        self._carry = np.empty(0, dtype=np.float32)
+
+    def update(self, y):
+        y = np.asarray(y, dtype=np.float32)
+        if not len(y):
+            return
+        self.n_samples += len(y)
+        buffered = np.concatenate((self._carry, y)) if len(self._carry) else y
+        n_frames = len(buffered) // self.frame if self.frame else 0
+        if n_frames:
+            self._score(buffered[:n_frames * self.frame].reshape(n_frames, self.frame))
+        self._carry = buffered[n_frames * self.frame:].copy() if self.frame else buffered.copy()
+
+    def _score(self, frames):
+        frame = frames.shape[1]
+        power = np.einsum("ij,ij->i", frames, frames, dtype=np.float64) / frame
+        self._levels.append(10.0 * np.log10(np.maximum(power, 1e-12)))
+        signs = np.signbit(frames)
+        self._zcrs.append(np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / max(1, frame - 1))
+
+    def result(self):
+        frame = self.frame
+        if not self._levels:
+            if not self.n_samples:
+                return {"has_speech": False, "speech_ratio": 0.0, "speech_seconds": 0.0, "start": 0, "end": 0}
+            # Clips shorter than one frame are scored as a single frame
+            frame = len(self._carry)
+            self._score(self._carry.reshape(1, frame))
+        level_db = np.concatenate(self._levels)
+        zcr = np.concatenate(self._zcrs)
+        n_frames = len(level_db)
+        sr = self.sr
+
+        threshold = max(self.energy_floor_db, float(level_db.max()) - self.top_db)
+        speech = (level_db >= threshold) & (zcr <= self.max_zcr)
+        speech_frames = np.flatnonzero(speech)
+        speech_seconds = len(speech_frames) * frame / sr if sr else 0.0
+        if len(speech_frames) == 0:
+            start = end = 0
+        else:
+            pad = int(VAD_PAD_SECONDS * sr) if sr else 0
+            start = max(0, int(speech_frames[0]) * frame - pad)
+            end = min(self.n_samples, (int(speech_frames[-1]) + 1) * frame + pad)
+        return {
+            "has_speech": bool(len(speech_frames)) and speech_seconds >= self.min_speech_seconds,
+            "speech_ratio": round(len(speech_frames) / n_frames, 4),
+            "speech_seconds": round(speech_seconds, 3),
+            "start": start,
+            "end": end,
+        }
+
+def detect_speech(y, sr, energy_floor_db: float = VAD_ENERGY_FLOOR_DB,
+                  min_speech_seconds: float = VAD_MIN_SPEECH_SECONDS,
+                  top_db: float = VAD_TOP_DB, max_zcr: float = VAD_MAX_ZCR):
+    """
+    Energy/zero-crossing voice activity detection over VAD_FRAME_SECONDS frames.
+
+    A frame counts as speech when its RMS level is above ``energy_floor_db`` (dBFS)
+    and within ``top_db`` of the loudest frame, and its zero-crossing rate is at most
+    ``max_zcr`` (hiss and broadband noise cross zero far more often than voiced speech).
+
+    Args:
+        y: mono audio samples.
+        sr: sampling rate.
+        energy_floor_db: absolute level below which a frame is silence.
+        min_speech_seconds: speech needed for ``has_speech``.
+        top_db: frames this far below the loudest frame are silence.
+        max_zcr: zero crossings per sample above which a frame is noise.
+
+    Returns:
+        dict: has_speech, speech_ratio (fraction of speech frames), speech_seconds,
+        and start/end sample indices of the speech region padded by VAD_PAD_SECONDS.
+    """
+    detector = SpeechDetector(sr, energy_floor_db, min_speech_seconds, top_db, max_zcr)
+    detector.update(y)
+    return detector.result()
+
+def trim_silence(y, sr, energy_floor_db: float = VAD_ENERGY_FLOOR_DB,
+                 min_speech_seconds: float = VAD_MIN_SPEECH_SECONDS):
+    """
+    Runs ``detect_speech`` and cuts leading and trailing silence.
+
+    Returns:
+        tuple: (speech region of ``y`` as a view, detect_speech result)
+    """
+    vad = detect_speech(y, sr, energy_floor_db, min_speech_seconds)
+    return y[vad["start"]:vad["end"]], vad
+
+class _RunningStats:
+    """
+    Mean and variance accumulated block by block (Chan et al. parallel update).
+    """
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, values):
+        n = len(values)
+        if n == 0:
+            return
+        block_mean = float(values.mean())
+        block_m2 = float(((values - block_mean) ** 2).sum())
+        self.merge_stats(n, block_mean, block_m2)
+
+    def merge(self, other):
+        if other.count:
+            self.merge_stats(other.count, other.mean, other.m2)
+
+    def merge_stats(self, n, mean, m2):
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.count * n / total
+        self.count = total
+
+    @property
+    def var(self):
+        return self.m2 / self.count if self.count else 0.0
+
+class FeatureAccumulator:
+    """
+    Running form of ``extract_features``: feed consecutive blocks of mono float32
+    samples with ``update`` and read the feature dict with ``features``.
+
+    ``continuation`` starts a new accumulator with empty statistics that picks up
+    exactly where this one stopped (partial frame, last sample sign), so adjacent
+    segments can later be combined with ``combine`` into the features of the
+    whole span. A frame is attributed to the segment in which it completes.
+    """
+    def __init__(self, sr: int):
+        self.sr = int(sr)
+        self.n_samples = 0
+        self.sum_squares = 0.0
+        self.zero_crossings = 0.0
+        self.n_diffs = 0
+        self.last_sign = None
+        # Crossing between the previous segment and this one, if this is a continuation
+        self.leading_crossing = None
+        self.centroid = _RunningStats()
+        self.rolloff = _RunningStats()
+        # Samples after the last complete frame; always starts on a frame boundary
+        self.carry = np.empty(0, dtype=np.float32)
+
+    def update(self, y):
+        y = np.asarray(y, dtype=np.float32)
+        if not len(y):
+            return
+        first_block = self.n_samples == 0
+        self.n_samples += len(y)
+
+        # RMS energy, summed in float64 so the error does not grow with the recording's length
+        y64 = y.astype(np.float64)
+        self.sum_squares += float(np.dot(y64, y64))
+
+        # Zero crossing rate, including the crossing between consecutive blocks
+        signs = np.sign(y)
+        self.zero_crossings += float(np.abs(np.diff(signs)).sum(dtype=np.float64))
+        self.n_diffs += len(y) - 1
+        if self.last_sign is not None:
+            crossing = abs(float(signs[0]) - self.last_sign)
+            self.zero_crossings += crossing
+            self.n_diffs += 1
+            if first_block:
+                self.leading_crossing = crossing
+        self.last_sign = float(signs[-1])
+
+        # Spectral features over the frames completed by this block
+        buffered = np.concatenate((self.carry, y)) if len(self.carry) else y
+        if len(buffered) >= N_FFT:
+            frames = frame_signal(buffered)
+            centroids, rolloffs = spectral_frame_stats(frames, self.sr)
+            self.centroid.update(centroids)
+            self.rolloff.update(rolloffs)
+            self.carry = buffered[len(frames) * HOP_LENGTH:].copy()
+        else:
+            self.carry = buffered.copy()
+
+    def continuation(self):
+        following = FeatureAccumulator(self.sr)
+        following.last_sign = self.last_sign
+        following.carry = self.carry
+        return following
+
+    @staticmethod
+    def combine(accumulators):
+        """
+        Features of the span covered by consecutive accumulators (oldest first).
+        """
+        accumulators = list(accumulators)
+        total = FeatureAccumulator(accumulators[0].sr)
+        for acc in accumulators:
+            total.n_samples += acc.n_samples
+            total.sum_squares += acc.sum_squares
+            total.zero_crossings += acc.zero_crossings
+            total.n_diffs += acc.n_diffs
+            total.centroid.merge(acc.centroid)
+            total.rolloff.merge(acc.rolloff)
+        # The first segment's crossing from earlier audio lies outside the span
+        if accumulators[0].leading_crossing is not None:
+            total.n_diffs -= 1
+            total.zero_crossings -= accumulators[0].leading_crossing
+        total.carry = accumulators[-1].carry
+        return total.features()
+
+    def features(self):
+        centroid, rolloff = self.centroid, self.rolloff
+        if self.n_samples and centroid.count == 0:
+            # Shorter than one frame: analyse the buffered samples as a single frame
+            centroid, rolloff = _RunningStats(), _RunningStats()
+            centroids, rolloffs = spectral_frame_stats(frame_signal(self.carry), self.sr)
+            centroid.update(centroids)
+            rolloff.update(rolloffs)
+        return {
+            "rms_mean": float(np.sqrt(self.sum_squares / self.n_samples)) if self.n_samples else 0.0,
+            "zero_crossing_rate_mean": self.zero_crossings / self.n_diffs / 2.0 if self.n_diffs else 0.0,
+            "spectral_centroid_mean": centroid.mean,
+            "spectral_centroid_var": centroid.var,
+            "spectral_rolloff_mean": rolloff.mean,
+            "spectral_rolloff_var": rolloff.var,
+            "duration": float(self.n_samples / self.sr) if self.sr else 0.0
+        }
+
+def _stream_blocks(sound_file, blocksize: int):
+    for block in sound_file.blocks(blocksize=max(int(blocksize), N_FFT), always_2d=True):
+        # ensure mono, matching decode_audio's downmix
+        yield (block.mean(axis=1) if block.shape[1] > 1 else block[:, 0]).astype(np.float32)
+
+def stream_speech(source, blocksize: int = 65536, **vad):
+    """
+    Runs ``detect_speech`` over an audio file block by block.
+
+    Args:
+        source: path or seekable file-like object readable by soundfile.
+        blocksize: frames read per block.
+        vad: keyword arguments for ``detect_speech``.
+
+    Returns:
+        tuple: (detect_speech result, sampling rate, number of samples)
+    """
+    try:
+        sound_file = sf.SoundFile(source)
+    except Exception:
+        if hasattr(source, "seek"):
+            source.seek(0)
+        y, sr = load_audio(source)
+        return detect_speech(y, sr, **vad), sr, len(y)
+
+    with sound_file:
+        sr = int(sound_file.samplerate)
+        detector = SpeechDetector(sr, **vad)
+        for y in _stream_blocks(sound_file, blocksize):
+            detector.update(y)
+    return detector.result(), sr, detector.n_samples
+
+def stream_features(source, blocksize: int = 65536, on_block=None, start: int = 0, end: int = None):
+    """
+    Extracts the same feature dict as ``extract_features`` while reading the audio
+    block by block, so peak memory stays bounded however long the recording is.
+
+    Args:
+        source: path or seekable file-like object readable by soundfile.
+        blocksize: frames read per block.
+        on_block: optional callback receiving each mono float32 block (e.g. to hash the PCM).
+        start: first sample analysed.
+        end: sample after the last one analysed, the end of the file when None
+            (``start``/``end`` as returned by ``detect_speech``).
+
+    Returns:
+        tuple: (features dict, sampling rate)
+    """
+    try:
+        sound_file = sf.SoundFile(source)
+    except Exception:
+        # Formats soundfile cannot stream fall back to the in-memory decoder
+        if hasattr(source, "seek"):
+            source.seek(0)
+        y, sr = load_audio(source)
+        y = y[start:end]
+        if on_block is not None:
+            on_block(y)
+        return extract_features(y, sr), sr
+
+    with sound_file:
+        sr = int(sound_file.samplerate)
+        accumulator = FeatureAccumulator(sr)
+        position = 0
+        if start:
+            sound_file.seek(start)
+            position = start
+        for y in _stream_blocks(sound_file, blocksize):
+            if end is not None:
+                if position >= end:
+                    break
+                y = y[:end - position]
+            position += len(y)
+            if on_block is not None:
+                on_block(y)
+            accumulator.update(y)
+
+    return accumulator.features(), sr
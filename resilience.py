@@ -0,0 +1,350 @@
+import asyncio
+import contextvars
+import random
+import time
+from collections import deque
+
+import httpx
+
+from metrics import CIRCUIT_STATE, CIRCUIT_TRANSITIONS, GEMINI_ATTEMPTS, GEMINI_FALLBACKS, merge_timings, start_timings
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+CIRCUIT_STATES = (CLOSED, OPEN, HALF_OPEN)
+
+# HTTP statuses worth retrying: timeouts, rate limiting and server-side errors
+RETRYABLE_STATUSES = (408, 429)
+
+# Raised when a Gemini call ran out of time: by asyncio, or by the pooled HTTP client's own timeouts
+GEMINI_TIMEOUTS = (asyncio.TimeoutError, httpx.TimeoutException)
+
+
+def is_retryable(error: Exception):
+    """
+    False for client errors (bad request, invalid key, ...) that another attempt
+    would only repeat; True for timeouts, rate limiting, 5xx and network errors.
+    Reads the status from httpx errors (``response.status_code``) and Google API
+    errors (``code``).
+    """
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is None:
+        status = getattr(error, "code", None)
+    if isinstance(status, int) and 400 <= status < 500:
+        return status in RETRYABLE_STATUSES
+    return True
+
+
+class CircuitBreaker:
+    def __init__(self, failure_rate: float = 0.5, min_calls: int = 5, window: int = 20,
+                 reset_timeout: float = 30.0, name: str = "gemini"):
+        """
+        Stops calls to a failing backend. While closed, the outcomes of the last
+        ``window`` calls are kept; once at least ``min_calls`` are known and the share
+        of failures reaches ``failure_rate`` the breaker opens and ``allow`` refuses
+        calls. After ``reset_timeout`` seconds one probe call is let through
+        (half-open): success closes the breaker, failure opens it again.
+
+        Used from the event loop only, so it keeps no lock.
+
+        Args:
+            failure_rate: share of failed calls in the window that opens the breaker.
+            min_calls: calls needed in the window before the rate is trusted.
+            window: number of recent call outcomes considered.
+            reset_timeout: seconds the breaker stays open before probing.
+            name: label used in log lines.
+        """
+        self.failure_rate = float(failure_rate)
+        self.min_calls = max(1, int(min_calls))
+        self.reset_timeout = max(0.0, float(reset_timeout))
+        self.name = name
+        self.state = CLOSED
+        self._outcomes = deque(maxlen=max(self.min_calls, int(window)))
+        self._opened_at = 0.0
+        self._probing = False
+        self.opened = 0
+        self.rejected = 0
+        for state in CIRCUIT_STATES:
+            CIRCUIT_STATE.set(1 if state == self.state else 0, state)
+
+    def _transition(self, state: str):
+        if state == self.state:
+            return
+        print(f"Circuit breaker '{self.name}': {self.state} -> {state}")
+        CIRCUIT_TRANSITIONS.inc(self.state, state)
+        CIRCUIT_STATE.set(0, self.state)
+        CIRCUIT_STATE.set(1, state)
+        self.state = state
+        self._probing = False
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self.opened += 1
+        self._outcomes.clear()
+
+    def allow(self):
+        """
+        True when a call may be made now. In the half-open state this claims the
+        single probe slot, which ``record_success``, ``record_failure`` or
+        ``release`` gives back.
+        """
+        if self.state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._transition(HALF_OPEN)
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        if self.state == HALF_OPEN:
+            self._transition(CLOSED)
+        elif self.state == CLOSED:
+            self._outcomes.append(False)
+
+    def record_failure(self):
+        if self.state == HALF_OPEN:
+            self._transition(OPEN)
+        elif self.state == CLOSED:
+            self._outcomes.append(True)
+            failures = sum(self._outcomes)
+            if len(self._outcomes) >= self.min_calls and failures >= self.failure_rate * len(self._outcomes):
+                self._transition(OPEN)
+
+    def release(self):
+        """
+        Gives back the probe slot of a call that ended without an outcome (e.g. cancelled).
+        """
+        self._probing = False
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "recent_calls": len(self._outcomes),
+            "recent_failures": sum(self._outcomes),
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+
+class ResilientPredictor:
+    def __init__(self, run_single, run_batch, fallback, budget: float = 15.0, max_retries: int = 2,
+                 backoff_base: float = 0.2, backoff_max: float = 2.0, hedge: bool = False,
+                 hedge_quantile: float = 0.95, hedge_min_samples: int = 20, breaker: CircuitBreaker = None,
+                 passthrough=(), timeouts=GEMINI_TIMEOUTS, retryable=is_retryable):
+        """
+        Bounds every Gemini prediction by a latency budget. A failed attempt is
+        retried after a jittered exponential backoff while the budget allows; an
+        optional hedged second attempt starts once the first has run longer than the
+        recent ``hedge_quantile`` latency; and a circuit breaker skips Gemini while
+        it keeps failing. Whenever Gemini cannot answer in time, ``fallback`` does.
+
+        Args:
+            run_single: coroutine function ``(features, timeout)`` returning a verdict
+                and raising when the call fails. It must enforce ``timeout`` itself,
+                so that only time spent calling Gemini counts as a Gemini timeout.
+            run_batch: coroutine function ``(features_list, timeout)`` returning a list
+                of verdicts (or None per unanswered item) and raising when the call fails.
+            fallback: function ``(features)`` returning a local verdict.
+            budget: seconds a prediction may spend on Gemini, retries included.
+            max_retries: attempts allowed after the first one.
+            backoff_base: seconds of the first retry's backoff ceiling, doubled per retry.
+            backoff_max: cap on the backoff ceiling.
+            hedge: send a second attempt when the first one is slow.
+            hedge_quantile: latency quantile of recent successful calls after which to hedge.
+            hedge_min_samples: successful calls needed before hedging starts.
+            breaker: circuit breaker to consult, a default one when None.
+            passthrough: exception types that are not Gemini failures (e.g. a full
+                local queue, or a timeout spent waiting in it); they are re-raised
+                untouched and not counted by the breaker.
+            timeouts: exception types ``run_single`` and ``run_batch`` raise when the
+                call itself ran out of time; recorded as timeouts. The default covers
+                asyncio's and the HTTP client's.
+            retryable: predicate telling whether a failed call is worth retrying.
+        """
+        self.run_single = run_single
+        self.run_batch = run_batch
+        self.fallback = fallback
+        self.budget = max(0.0, float(budget))
+        self.max_retries = max(0, int(max_retries))
+        self.backoff_base = max(0.0, float(backoff_base))
+        self.backoff_max = max(self.backoff_base, float(backoff_max))
+        self.hedge = bool(hedge)
+        self.hedge_quantile = min(1.0, max(0.0, float(hedge_quantile)))
+        self.hedge_min_samples = max(1, int(hedge_min_samples))
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.passthrough = tuple(passthrough)
+        self.timeouts = tuple(timeouts)
+        self.retryable = retryable
+        self._latencies = deque(maxlen=200)
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.fallbacks = 0
+
+    def hedge_delay(self):
+        """
+        Seconds to wait before hedging, or None while hedging is off or there are
+        too few latency samples to estimate the quantile.
+        """
+        if not self.hedge or len(self._latencies) < self.hedge_min_samples:
+            return None
+        return self._latency_quantile(self.hedge_quantile)
+
+    def _latency_quantile(self, q: float):
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def _backoff(self, retry: int):
+        # Full jitter: a uniform draw below the exponential ceiling spreads retries out
+        return random.uniform(0.0, min(self.backoff_max, self.backoff_base * (2 ** retry)))
+
+    def _fallback(self, features: dict, reason: str):
+        self.fallbacks += 1
+        GEMINI_FALLBACKS.inc(reason)
+        return self.fallback(features)
+
+    async def _attempt(self, label: str, features: dict, timeout: float):
+        """
+        One Gemini call bounded by ``timeout``, with its outcome fed to the breaker
+        and the metrics.
+        """
+        started_at = time.perf_counter()
+        try:
+            result = await self.run_single(features, timeout)
+        except self.passthrough:
+            self.breaker.release()
+            raise
+        except asyncio.CancelledError:
+            self.breaker.release()
+            GEMINI_ATTEMPTS.inc(label, "cancelled")
+            raise
+        except self.timeouts:
+            self.breaker.record_failure()
+            GEMINI_ATTEMPTS.inc(label, "timeout")
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            GEMINI_ATTEMPTS.inc(label, "error")
+            raise
+        self._latencies.append(time.perf_counter() - started_at)
+        self.breaker.record_success()
+        GEMINI_ATTEMPTS.inc(label, "success")
+        return result
+
+    def _start_attempt(self, label: str, features: dict, timeout: float):
+        # Each hedged attempt collects its stage timings apart, so the request's
+        # timings only get those of the attempt whose outcome is used
+        context = contextvars.copy_context()
+        timings = context.run(start_timings)
+        task = context.run(asyncio.ensure_future, self._attempt(label, features, timeout))
+        return task, timings
+
+    async def _call(self, label: str, features: dict, deadline: float):
+        """
+        Runs an attempt and, when hedging is on and it outlives the hedge delay, a
+        second one; the first success wins and the other is cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        delay = self.hedge_delay() if self.breaker.state == CLOSED else None
+        if delay is None or deadline - loop.time() <= delay:
+            return await self._attempt(label, features, deadline - loop.time())
+
+        first, first_timings = self._start_attempt(label, features, deadline - loop.time())
+        timings = {first: first_timings}
+        pending = {first}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                self.hedges += 1
+                hedge, timings[hedge] = self._start_attempt("hedge", features, deadline - loop.time())
+                pending.add(hedge)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Both may finish together; every exception is read so none goes unretrieved
+                outcomes = [(task, task.exception()) for task in done]
+                for task, exception in outcomes:
+                    if exception is None:
+                        if task is not first:
+                            self.hedge_wins += 1
+                        merge_timings(timings[task])
+                        return task.result()
+                for task, exception in outcomes:
+                    # A Gemini failure says more than e.g. a full queue refusing the hedge
+                    if error is None or isinstance(error[1], self.passthrough):
+                        error = (task, exception)
+            merge_timings(timings[error[0]])
+            raise error[1]
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def predict(self, features: dict):
+        """
+        Gemini's verdict for the features if it arrives within the budget, otherwise
+        the fallback's; ``tier`` is set to ``fallback`` for the latter.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.budget
+        retry = 0
+        while True:
+            if not self.breaker.allow():
+                return self._fallback(features, "circuit_open")
+            try:
+                return await self._call("primary" if retry == 0 else "retry", features, deadline)
+            except self.passthrough:
+                raise
+            except Exception as e:
+                if not self.retryable(e):
+                    return self._fallback(features, "not_retryable")
+                backoff = self._backoff(retry)
+                # Only retry when the backoff leaves time for a typical (median) call
+                needed = backoff + (self._latency_quantile(0.5) or 0.0)
+                if retry >= self.max_retries or deadline - loop.time() <= needed:
+                    return self._fallback(features, "budget_exhausted")
+            retry += 1
+            self.retries += 1
+            await asyncio.sleep(backoff)
+
+    async def predict_batch(self, features_list: list):
+        """
+        One batched Gemini call within the budget. Items are None when the breaker
+        is open or the call fails, so the batcher sends them through ``predict``,
+        which retries or falls back per item.
+        """
+        if not self.breaker.allow():
+            return [None] * len(features_list)
+        try:
+            results = await self.run_batch(features_list, self.budget)
+        except self.passthrough:
+            self.breaker.release()
+            raise
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except Exception as e:
+            print(f"Batched Gemini call failed: {e!r}")
+            self.breaker.record_failure()
+            GEMINI_ATTEMPTS.inc("batch", "timeout" if isinstance(e, self.timeouts) else "error")
+            return [None] * len(features_list)
+        self.breaker.record_success()
+        GEMINI_ATTEMPTS.inc("batch", "success")
+        return results
+
+    def stats(self):
+        delay = self.hedge_delay()
+        return {
+            "budget_seconds": self.budget,
+            "max_retries": self.max_retries,
+            "hedging": self.hedge,
+            "hedge_delay_ms": round(delay * 1000.0, 1) if delay is not None else None,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "fallbacks": self.fallbacks,
+            "circuit": self.breaker.stats(),
+        }
@@ -0,0 +1,154 @@
+import gzip
+import hashlib
+import threading
+
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; without it assets are served gzipped only
+    brotli = None
+
+# Pages and the service worker are revalidated on every load (a 304 when unchanged)
+NO_CACHE = "no-cache"
+
+
+def _parse_accept_encoding(header: str):
+    """
+    Maps each coding named in an Accept-Encoding header to its q-value.
+    """
+    accepted = {}
+    for item in (header or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def _etag_matches(header: str, etag: str):
+    # If-None-Match uses the weak comparison, so a W/ prefix added by a proxy still matches
+    tags = [tag.strip() for tag in (header or "").split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+class StaticAsset:
+    def __init__(self, body, media_type: str, cache_control: str = NO_CACHE, vary=()):
+        """
+        Response body rendered once and kept with its gzip and brotli encodings and
+        a strong ETag per encoding, so serving it is a header lookup and a copy.
+
+        Args:
+            body: the content, as text or bytes.
+            media_type: Content-Type to send.
+            cache_control: Cache-Control to send.
+            vary: request headers besides Accept-Encoding the route selects on.
+        """
+        self.body = body.encode("utf-8") if isinstance(body, str) else bytes(body)
+        self.media_type = media_type
+        self.cache_control = cache_control
+        self.vary = ", ".join(tuple(vary) + ("Accept-Encoding",))
+        self.digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.encodings = {"identity": (self.body, f'"{self.digest}"')}
+        # Encoded copies are only kept when they are actually smaller
+        compressed = gzip.compress(self.body, compresslevel=9, mtime=0)
+        if len(compressed) < len(self.body):
+            self.encodings["gzip"] = (compressed, f'"{self.digest}-gzip"')
+        if brotli is not None:
+            compressed = brotli.compress(self.body, quality=11)
+            if len(compressed) < len(self.body):
+                self.encodings["br"] = (compressed, f'"{self.digest}-br"')
+
+    @property
+    def etag(self):
+        return self.encodings["identity"][1]
+
+    def select_encoding(self, accept_encoding: str):
+        """
+        Smallest available encoding the client accepts, or ``identity``.
+        """
+        accepted = _parse_accept_encoding(accept_encoding)
+        wildcard = accepted.get("*", 0.0)
+        for coding in ("br", "gzip"):
+            if coding in self.encodings and accepted.get(coding, wildcard) > 0.0:
+                return coding
+        return "identity"
+
+    def response(self, headers):
+        """
+        Response for a request with the given headers: 304 when its If-None-Match
+        names the selected representation, otherwise the pre-encoded body.
+        """
+        coding = self.select_encoding(headers.get("accept-encoding", ""))
+        body, etag = self.encodings[coding]
+        response_headers = {"ETag": etag, "Cache-Control": self.cache_control, "Vary": self.vary}
+        if _etag_matches(headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=response_headers), True
+        if coding != "identity":
+            response_headers["Content-Encoding"] = coding
+        return Response(content=body, media_type=self.media_type, headers=response_headers), False
+
+    def stats(self):
+        return {coding: len(body) for coding, (body, _) in self.encodings.items()}
+
+
+class StaticAssetStore:
+    def __init__(self):
+        """
+        Named static assets, each rendered the first time it is requested (or by
+        ``build_all`` during warm-up) and reused for the life of the process.
+        """
+        self._builders = {}
+        self._assets = {}
+        # Reentrant: a builder may look up other assets (e.g. to version the service worker)
+        self._lock = threading.RLock()
+        self.served = 0
+        self.not_modified = 0
+
+    def register(self, name: str, build, media_type: str, cache_control: str = NO_CACHE, vary=()):
+        """
+        Args:
+            name: key the asset is looked up by.
+            build: zero-argument callable returning the body.
+            media_type, cache_control, vary: as for ``StaticAsset``.
+        """
+        self._builders[name] = (build, media_type, cache_control, tuple(vary))
+
+    def get(self, name: str):
+        asset = self._assets.get(name)
+        if asset is None:
+            with self._lock:
+                asset = self._assets.get(name)
+                if asset is None:
+                    build, media_type, cache_control, vary = self._builders[name]
+                    asset = self._assets[name] = StaticAsset(build(), media_type, cache_control, vary)
+        return asset
+
+    def build_all(self):
+        for name in self._builders:
+            self.get(name)
+
+    def response(self, name: str, headers):
+        response, not_modified = self.get(name).response(headers)
+        if not_modified:
+            self.not_modified += 1
+        else:
+            self.served += 1
+        return response
+
+    def stats(self):
+        return {
+            "assets": {name: asset.stats() for name, asset in self._assets.items()},
+            "served": self.served,
+            "not_modified": self.not_modified,
+            "brotli": brotli is not None,
+        }
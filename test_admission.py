@@ -0,0 +1,127 @@
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+os.environ.setdefault("GEMINI_API_KEY", "admission-test")
+
+import main
+from admission import AdmissionController, AdmissionMiddleware, Throttled, TokenBucket, client_address
+
+
+def test_bucket_refills_at_rate_up_to_burst():
+    bucket = TokenBucket(rate=2.0, burst=3.0, now=0.0)
+    assert all(bucket.take(1, now=0.0) == 0.0 for _ in range(3))
+    # Empty: the next token arrives after 1 / rate seconds, and a refused take takes nothing
+    assert bucket.take(1, now=0.0) == pytest.approx(0.5)
+    assert bucket.take(1, now=0.25) == pytest.approx(0.25)
+    assert bucket.take(1, now=0.5) == 0.0
+    # A long idle period refills no further than the burst
+    bucket.take(0, now=100.0)
+    assert bucket.tokens == 3.0
+
+
+def test_bucket_admits_cost_above_burst_into_debt():
+    bucket = TokenBucket(rate=1.0, burst=3.0, now=0.0)
+    assert bucket.take(5, now=0.0) == 0.0
+    assert bucket.tokens == -2.0
+    # The debt is repaid at the refill rate before the next token is available
+    assert bucket.take(1, now=0.0) == pytest.approx(3.0)
+    assert bucket.take(5, now=1.0) == pytest.approx(4.0)
+    assert bucket.take(5, now=5.0) == 0.0
+
+
+def test_refund_is_capped_at_burst():
+    bucket = TokenBucket(rate=1.0, burst=3.0, now=0.0)
+    bucket.take(1, now=0.0)
+    bucket.refund(5)
+    assert bucket.tokens == 3.0
+
+
+def test_global_rejection_takes_nothing_from_the_client():
+    controller = AdmissionController(client_rate=1.0, client_burst=5.0, global_rate=1.0, global_burst=2.0)
+    controller.charge("a", 2)
+    with pytest.raises(Throttled) as excinfo:
+        controller.charge("a", 1)
+    assert excinfo.value.reason == "global_rate"
+    assert controller._clients["a"].tokens == pytest.approx(3.0, abs=0.01)
+
+
+def test_batch_charge_refunds_the_middleware_token():
+    controller = AdmissionController(client_rate=1.0 / 60.0, client_burst=3.0)
+    # The middleware's token, then a 4-item batch charged as a whole
+    controller.acquire("a")
+    controller.charge("a", 4, paid=1)
+    assert controller._clients["a"].tokens == pytest.approx(-1.0, abs=0.01)
+
+    # A rejected batch pays nothing, the middleware's token included
+    other = AdmissionController(client_rate=1.0 / 60.0, client_burst=3.0)
+    other.charge("b", 1)
+    other.acquire("b")
+    with pytest.raises(Throttled):
+        other.charge("b", 4, paid=1)
+    assert other._clients["b"].tokens == pytest.approx(2.0, abs=0.01)
+
+
+def test_concurrency_limit_and_release():
+    controller = AdmissionController(max_concurrent=2)
+    first = controller.acquire("a")
+    controller.acquire("b")
+    with pytest.raises(Throttled) as excinfo:
+        controller.acquire("c")
+    assert excinfo.value.reason == "concurrency"
+    assert excinfo.value.retry_after_header == "1"
+    controller.release(first)
+    controller.acquire("c")
+    assert controller.stats()["rejected"]["concurrency"] == 1
+
+
+def test_client_address_trusts_forwarded_for_only_when_asked():
+    scope = {"client": ("10.0.0.1", 1234), "headers": [(b"x-forwarded-for", b"203.0.113.7, 10.0.0.2")]}
+    assert client_address(scope) == "10.0.0.1"
+    assert client_address(scope, trust_forwarded=True) == "203.0.113.7"
+    assert client_address({"headers": []}) == "unknown"
+
+
+def test_middleware_answers_429_with_retry_after():
+    app = FastAPI()
+
+    @app.post("/limited")
+    async def limited():
+        return {"ok": True}
+
+    @app.post("/open")
+    async def open_route():
+        return {"ok": True}
+
+    controller = AdmissionController(client_rate=1.0 / 60.0, client_burst=2.0)
+    app.add_middleware(AdmissionMiddleware, controller=controller, paths=("/limited",))
+    client = TestClient(app)
+    assert [client.post("/limited").status_code for _ in range(2)] == [200, 200]
+    response = client.post("/limited")
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 59
+    # Paths outside the admission-controlled set are not limited
+    assert client.post("/open").status_code == 200
+    assert controller.in_flight == 0
+
+
+@pytest.fixture
+def limited_app(monkeypatch):
+    monkeypatch.setattr(main.admission, "client_rate", 1.0 / 60.0)
+    monkeypatch.setattr(main.admission, "client_burst", 3.0)
+    monkeypatch.setattr(main.admission, "_clients", type(main.admission._clients)())
+    return TestClient(main.app)
+
+
+def test_batch_larger_than_burst_is_admitted_once(limited_app):
+    # Undecodable items are answered per item without calling Gemini
+    batch = {"items": [{"audio_base64": "bm90YXVkaW8=", "language": "English"}] * 4}
+    response = limited_app.post("/detect/batch", json=batch)
+    assert response.status_code == 200
+    assert response.json()["failed"] == 4
+    # The bucket is now in debt, so the next request has to wait for the refill
+    response = limited_app.post("/detect/batch", json=batch)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 60
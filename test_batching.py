@@ -0,0 +1,123 @@
+import asyncio
+import time
+
+from batching import MicroBatcher
+
+
+class Backend:
+    def __init__(self, answer=None, fail_batch=False, fail_single=()):
+        """
+        Records every call. ``answer(features)`` gives the batched result per item
+        (None leaves it unanswered); single calls always answer unless listed in ``fail_single``.
+        """
+        self.answer = answer or (lambda features: {"via": "batch", "id": features["id"]})
+        self.fail_batch = fail_batch
+        self.fail_single = set(fail_single)
+        self.batches = []
+        self.singles = []
+
+    async def run_batch(self, features_list):
+        self.batches.append([features["id"] for features in features_list])
+        await asyncio.sleep(0)
+        if self.fail_batch:
+            raise RuntimeError("batch call failed")
+        return [self.answer(features) for features in features_list]
+
+    async def run_single(self, features):
+        self.singles.append(features["id"])
+        await asyncio.sleep(0)
+        if features["id"] in self.fail_single:
+            raise RuntimeError(f"single call {features['id']} failed")
+        return {"via": "single", "id": features["id"]}
+
+
+def submit_all(batcher, ids, stagger=0.0):
+    async def run():
+        async def one(i):
+            await asyncio.sleep(stagger * i)
+            return await batcher.submit({"id": i})
+        return await asyncio.gather(*(one(i) for i in ids), return_exceptions=True)
+    return asyncio.run(run())
+
+
+def test_flushes_as_soon_as_the_batch_is_full():
+    backend = Backend()
+    batcher = MicroBatcher(backend.run_batch, backend.run_single, max_batch_size=3, max_wait_ms=10000)
+    start = time.perf_counter()
+    results = submit_all(batcher, range(3))
+    assert time.perf_counter() - start < 1.0
+    assert backend.batches == [[0, 1, 2]]
+    assert results == [{"via": "batch", "id": i} for i in range(3)]
+    assert batcher.stats()["batched_items"] == 3
+
+
+def test_flushes_after_the_wait_with_a_partial_batch():
+    backend = Backend()
+    batcher = MicroBatcher(backend.run_batch, backend.run_single, max_batch_size=8, max_wait_ms=50)
+    start = time.perf_counter()
+    results = submit_all(batcher, range(2), stagger=0.01)
+    elapsed = time.perf_counter() - start
+    assert 0.04 <= elapsed < 1.0
+    assert backend.batches == [[0, 1]]
+    assert [r["id"] for r in results] == [0, 1]
+
+
+def test_a_batch_of_one_uses_the_single_call():
+    backend = Backend()
+    batcher = MicroBatcher(backend.run_batch, backend.run_single, max_batch_size=8, max_wait_ms=10)
+    assert submit_all(batcher, [7]) == [{"via": "single", "id": 7}]
+    assert backend.batches == [] and batcher.single_calls == 1
+
+
+def test_unanswered_items_fall_back_to_single_calls():
+    backend = Backend(answer=lambda f: None if f["id"] == 1 else {"via": "batch", "id": f["id"]})
+    batcher = MicroBatcher(backend.run_batch, backend.run_single, max_batch_size=3, max_wait_ms=10000)
+    results = submit_all(batcher, range(3))
+    assert [r["via"] for r in results] == ["batch", "single", "batch"]
+    assert [r["id"] for r in results] == [0, 1, 2]
+    assert backend.singles == [1] and batcher.fallbacks == 1
+
+
+def test_failed_batch_falls_back_per_item_and_errors_stay_per_caller():
+    backend = Backend(fail_batch=True, fail_single={2})
+    batcher = MicroBatcher(backend.run_batch, backend.run_single, max_batch_size=3, max_wait_ms=10000)
+    results = submit_all(batcher, range(3))
+    assert results[0] == {"via": "single", "id": 0} and results[1] == {"via": "single", "id": 1}
+    assert isinstance(results[2], RuntimeError)
+    assert sorted(backend.singles) == [0, 1, 2]
+
+
+def test_wrong_result_count_falls_back_per_item():
+    backend = Backend()
+
+    async def short_batch(features_list):
+        await backend.run_batch(features_list)
+        return [{"via": "batch"}]
+
+    batcher = MicroBatcher(short_batch, backend.run_single, max_batch_size=2, max_wait_ms=10000)
+    assert [r["via"] for r in submit_all(batcher, range(2))] == ["single", "single"]
+
+
+def test_backlog_is_split_into_batches_of_the_maximum_size():
+    backend = Backend()
+    batcher = MicroBatcher(backend.run_batch, backend.run_single, max_batch_size=2, max_wait_ms=10)
+    results = submit_all(batcher, range(5))
+    # Two full batches flush on size, the leftover on the timer as a single call
+    assert [r["id"] for r in results] == list(range(5))
+    assert backend.batches == [[0, 1], [2, 3]]
+    assert backend.singles == [4]
+
+
+def test_cancelled_callers_are_not_sent_to_the_model():
+    backend = Backend()
+    batcher = MicroBatcher(backend.run_batch, backend.run_single, max_batch_size=8, max_wait_ms=20)
+
+    async def run():
+        tasks = [asyncio.ensure_future(batcher.submit({"id": i})) for i in range(3)]
+        await asyncio.sleep(0)
+        tasks[1].cancel()
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert isinstance(results[1], asyncio.CancelledError)
+    assert backend.batches == [[0, 2]]
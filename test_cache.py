@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+import cache
+from cache import VerdictCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    return clock
+
+
+def test_entries_expire_after_the_ttl(clock):
+    verdicts = VerdictCache(max_entries=4, ttl_seconds=10.0)
+    verdicts.put("a", "verdict")
+    clock.now += 9.9
+    assert verdicts.get("a") == "verdict"
+    # A hit does not extend the entry's life
+    clock.now += 0.1
+    assert verdicts.get("a") is None
+    assert verdicts.stats()["entries"] == 0
+    assert (verdicts.hits, verdicts.misses) == (1, 1)
+
+
+def test_put_restarts_the_ttl(clock):
+    verdicts = VerdictCache(max_entries=4, ttl_seconds=10.0)
+    verdicts.put("a", 1)
+    clock.now += 8.0
+    verdicts.put("a", 2)
+    clock.now += 8.0
+    assert verdicts.get("a") == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    verdicts = VerdictCache(max_entries=2)
+    verdicts.put("a", 1)
+    verdicts.put("b", 2)
+    # Reading "a" makes "b" the least recently used
+    assert verdicts.get("a") == 1
+    verdicts.put("c", 3)
+    assert verdicts.get("b") is None
+    assert verdicts.get("a") == 1 and verdicts.get("c") == 3
+    assert verdicts.evictions == 1
+    assert verdicts.stats()["entries"] == 2
+
+
+def test_zero_entries_disables_the_cache():
+    verdicts = VerdictCache(max_entries=0)
+    verdicts.put("a", 1)
+    assert not verdicts.enabled
+    assert verdicts.get("a") is None
+    assert verdicts.stats()["misses"] == 0
+
+
+def test_key_depends_on_samples_rate_and_language():
+    y = np.linspace(-0.5, 0.5, 1000, dtype=np.float32)
+    key = VerdictCache.make_key(y, 16000, "English")
+    assert VerdictCache.make_key(y.copy(), 16000, "English") == key
+    # Language names are compared without case or surrounding whitespace
+    assert VerdictCache.make_key(y, 16000, " english ") == key
+    assert VerdictCache.make_key(y, 16000, "Tamil") != key
+    assert VerdictCache.make_key(y, 22050, "English") != key
+    changed = y.copy()
+    changed[500] += 1e-3
+    assert VerdictCache.make_key(changed, 16000, "English") != key
+
+
+def test_key_ignores_the_sample_dtype_and_block_boundaries():
+    y = np.linspace(-0.5, 0.5, 1000, dtype=np.float32)
+    key = VerdictCache.make_key(y, 16000, "English")
+    assert VerdictCache.make_key(y.astype(np.float64), 16000, "English") == key
+    digest = VerdictCache.new_hasher()
+    for start in range(0, len(y), 333):
+        VerdictCache.update_hasher(digest, y[start:start + 333])
+    assert VerdictCache.finish_key(digest, 16000, "English") == key
+
+
+def test_feature_keys_are_kept_apart_from_audio_keys():
+    features = {"rms_mean": 0.1, "spectral_centroid_mean": 1500.0}
+    key = VerdictCache.make_feature_key(features, "English")
+    assert VerdictCache.make_feature_key(dict(reversed(list(features.items()))), "english") == key
+    assert VerdictCache.make_feature_key(features, "Hindi") != key
+    assert key != VerdictCache.make_key(np.zeros(0, dtype=np.float32), 0, "English")
@@ -0,0 +1,45 @@
+import json
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+os.environ.setdefault("GEMINI_API_KEY", "features-test")
+
+import main
+
+FEATURES = {
+    "duration": 2.0,
+    "rms_mean": 0.1,
+    "zero_crossing_rate_mean": 0.05,
+    "spectral_centroid_mean": 1500.0,
+    "spectral_centroid_var": 250000.0,
+    "spectral_rolloff_mean": 3000.0,
+    "spectral_rolloff_var": 900000.0,
+}
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+def post_raw(client, features):
+    # json.dumps writes non-finite floats as the Infinity / NaN literals that json.loads accepts
+    body = json.dumps({"features": features, "language": "English"})
+    return client.post("/detect/features", content=body, headers={"content-type": "application/json"})
+
+
+@pytest.mark.parametrize("name", ["spectral_centroid_var", "spectral_rolloff_var", "spectral_centroid_mean", "rms_mean"])
+@pytest.mark.parametrize("value", [float("inf"), float("nan"), 1e308])
+def test_non_finite_or_huge_features_are_rejected(client, name, value):
+    response = post_raw(client, {**FEATURES, name: value})
+    assert response.status_code == 422
+
+
+def test_no_speech_features_are_answered_without_the_model(client):
+    response = post_raw(client, {**FEATURES, "has_speech": False, "speech_ratio": 0.0})
+    assert response.status_code == 200
+    metadata = response.json()["metadata"]
+    assert metadata["tier"] == "vad"
+    assert metadata["speech_ratio"] == 0.0
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from fast_path import FEATURE_NAMES, FastPathClassifier, fit_temperature, log_loss
+
+
+def make_dataset(n, seed, noise=0.05):
+    """
+    Two overlapping clusters over the fast-path features, with a ``noise`` share
+    of the labels flipped.
+    """
+    rng = np.random.default_rng(seed)
+    labels = rng.integers(0, 2, n)
+    spread = np.array([0.5, 0.02, 0.01, 300.0, 600.0])
+    centre = np.array([3.0, 0.1, 0.05, 1500.0, 3000.0]) + np.where(labels[:, None] == 1, 1.0, -1.0) * spread
+    X = centre + rng.standard_normal((n, len(FEATURE_NAMES))) * spread
+    flipped = rng.random(n) < noise
+    labels = np.where(flipped, 1 - labels, labels)
+    return [dict(zip(FEATURE_NAMES, row)) for row in X], labels.tolist()
+
+
+def nll(model, features_list, labels):
+    p = np.clip([model.predict_proba(f) for f in features_list], 1e-12, 1 - 1e-12)
+    y = np.asarray(labels)
+    return float(-np.mean(y * np.log(p) + (1 - y) * np.log(1 - p)))
+
+
+def test_fit_temperature_recovers_a_known_scale():
+    rng = np.random.default_rng(0)
+    true_logits = rng.normal(0.0, 2.0, 20000)
+    labels = (rng.random(len(true_logits)) < 1.0 / (1.0 + np.exp(-true_logits))).astype(float)
+    # Logits three times too large need a temperature of about 3
+    assert fit_temperature(3.0 * true_logits, labels) == pytest.approx(3.0, rel=0.05)
+    assert log_loss(np.array([0.0, 0.0]), np.array([0.0, 1.0])) == pytest.approx(np.log(2.0))
+
+
+def test_fit_calibrates_on_held_out_data():
+    # Stopping gradient descent early leaves the logits too small (underconfident);
+    # the held-out temperature sharpens them and improves the likelihood of new data
+    features, labels = make_dataset(600, seed=1)
+    model = FastPathClassifier.fit(features, labels, learning_rate=0.01, epochs=100)
+    uncalibrated = FastPathClassifier({**model.weights(), "temperature": 1.0})
+
+    test_features, test_labels = make_dataset(2000, seed=2)
+    assert model.temperature < 1.0
+    assert nll(model, test_features, test_labels) < 0.8 * nll(uncalibrated, test_features, test_labels)
+
+
+def test_temperature_is_saved_and_loaded(tmp_path):
+    features, labels = make_dataset(200, seed=3)
+    model = FastPathClassifier.fit(features, labels)
+    path = tmp_path / "weights.json"
+    model.save(str(path))
+    loaded = FastPathClassifier.load(str(path))
+    assert loaded.temperature == model.temperature
+    assert loaded.predict_proba(features[0]) == pytest.approx(model.predict_proba(features[0]))
+
+
+def test_too_little_holdout_keeps_temperature_one():
+    features, labels = make_dataset(6, seed=4)
+    assert FastPathClassifier.fit(features, labels).temperature == 1.0
@@ -0,0 +1,92 @@
+import base64
+import io
+import json
+import os
+import shutil
+import subprocess
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+os.environ.setdefault("GEMINI_API_KEY", "parity-test")
+
+import main
+from benchmark import synthetic_voice
+from preprocessing import detect_speech, extract_features, read_wav, trim_silence
+
+# Runs the browser feature extractor served at /features.js on cases read from stdin
+NODE_RUNNER = """
+const fs = require('fs');
+eval(fs.readFileSync(process.argv[1], 'utf8'));
+const cases = JSON.parse(fs.readFileSync(0, 'utf8'));
+const out = cases.map((c) => {
+  const bytes = Buffer.from(c.data, 'base64');
+  const buffer = bytes.buffer.slice(bytes.byteOffset, bytes.byteOffset + bytes.length);
+  if (c.wav) {
+    const { y, sampleRate } = VoiceFeatures.decodeWav(buffer);
+    return { features: VoiceFeatures.extractFeatures(y, sampleRate), speech: VoiceFeatures.detectSpeech(y, sampleRate) };
+  }
+  const y = new Float32Array(buffer);
+  return {
+    features: VoiceFeatures.extractFeatures(y, c.sr),
+    speech: VoiceFeatures.detectSpeech(y, c.sr),
+    payload: VoiceFeatures.computeFeatures(y, c.sr, true)
+  };
+});
+process.stdout.write(JSON.stringify(out));
+"""
+
+pytestmark = pytest.mark.skipif(shutil.which("node") is None, reason="node is not installed")
+
+
+def run_node(tmp_path, cases):
+    script = tmp_path / "features.js"
+    script.write_text(main.feature_extractor(), encoding="utf-8")
+    result = subprocess.run(["node", "-e", NODE_RUNNER, str(script)], input=json.dumps(cases),
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+def assert_parity(expected_features, expected_speech, actual):
+    for name, value in expected_features.items():
+        assert actual["features"][name] == pytest.approx(value, rel=1e-3, abs=1e-6), name
+    assert actual["speech"] == expected_speech
+
+
+def test_js_features_match_python(tmp_path):
+    silence = np.zeros(8000, dtype=np.float32)
+    signals = [
+        (synthetic_voice(2.0, 16000), 16000),
+        (synthetic_voice(3.0, 44100, seed=1), 44100),
+        (np.concatenate([silence, synthetic_voice(1.0, 16000, seed=2), silence]), 16000),
+        (np.random.default_rng(3).normal(0, 0.2, 16000).astype(np.float32), 16000),
+        (synthetic_voice(0.1, 16000, seed=4)[:1500], 16000),  # shorter than one FFT frame
+        (silence, 16000),
+    ]
+    cases = [{"data": base64.b64encode(y.tobytes()).decode(), "sr": sr} for y, sr in signals]
+    for (y, sr), actual in zip(signals, run_node(tmp_path, cases)):
+        assert_parity(extract_features(y, sr), detect_speech(y, sr), actual)
+
+        # The /detect/features payload matches what /detect computes after trimming silence
+        trimmed, speech = trim_silence(y, sr)
+        assert actual["payload"]["has_speech"] == speech["has_speech"]
+        assert actual["payload"]["speech_ratio"] == speech["speech_ratio"]
+        if speech["has_speech"]:
+            for name, value in extract_features(trimmed, sr).items():
+                assert actual["payload"][name] == pytest.approx(value, rel=1e-3, abs=1e-6), name
+            assert actual["payload"]["clip_duration"] == pytest.approx(len(y) / sr)
+
+
+def test_js_wav_decode_matches_read_wav(tmp_path):
+    y = synthetic_voice(2.0, 22050, seed=5)
+    clips = []
+    for subtype, channels in (("PCM_16", 1), ("PCM_16", 2), ("FLOAT", 1)):
+        data = y if channels == 1 else np.stack([y, 0.5 * y], axis=1)
+        buffer = io.BytesIO()
+        sf.write(buffer, data, 22050, format="WAV", subtype=subtype)
+        clips.append(buffer.getvalue())
+    cases = [{"data": base64.b64encode(clip).decode(), "wav": True} for clip in clips]
+    for clip, actual in zip(clips, run_node(tmp_path, cases)):
+        decoded, sr = read_wav(io.BytesIO(clip))
+        assert_parity(extract_features(decoded, sr), detect_speech(decoded, sr), actual)
@@ -0,0 +1,139 @@
+import asyncio
+import base64
+import io
+import threading
+import time
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from benchmark import synthetic_voice
+from inference import (
+    InferenceExecutor, InferenceQueueTimeout, InferenceTimeout, create_cpu_pool, prepare_file, prepare_payload,
+)
+from preprocessing import VAD_ENERGY_FLOOR_DB, VAD_MIN_SPEECH_SECONDS
+
+VAD = {"energy_floor_db": VAD_ENERGY_FLOOR_DB, "min_speech_seconds": VAD_MIN_SPEECH_SECONDS}
+
+
+class BlockingClassifier:
+    def __init__(self, latency):
+        self.latency = latency
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def predict(self, features, timeout=None, raise_errors=False):
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(self.latency)
+        with self._lock:
+            self.running -= 1
+        return {"classification": "Human", "confidence_score": 0.9, "explanation": ""}
+
+
+def test_timed_out_thread_keeps_its_slot_until_it_returns():
+    classifier = BlockingClassifier(0.3)
+    executor = InferenceExecutor(classifier, max_concurrency=1, timeout=5.0)
+
+    async def run():
+        with pytest.raises(InferenceTimeout):
+            await executor.predict({}, timeout=0.1)
+        # The worker thread is still calling the backend, so the slot is still taken
+        assert executor.stats()["in_flight"] == 1
+        start = time.perf_counter()
+        await executor.predict({})
+        return time.perf_counter() - start
+
+    try:
+        elapsed = asyncio.run(run())
+    finally:
+        executor.shutdown()
+    # The second call waited for the first thread (~0.2 s left) before running its own 0.3 s
+    assert elapsed >= 0.45
+    assert classifier.peak == 1
+    assert executor.stats()["in_flight"] == 0
+
+
+def test_cancelled_calls_never_exceed_the_concurrency_limit():
+    classifier = BlockingClassifier(0.1)
+    executor = InferenceExecutor(classifier, max_concurrency=2, timeout=5.0)
+
+    async def run():
+        for _ in range(3):
+            tasks = [asyncio.ensure_future(executor.predict({})) for _ in range(4)]
+            await asyncio.sleep(0.02)
+            for task in tasks:
+                task.cancel()
+        await asyncio.gather(*(executor.predict({}) for _ in range(4)))
+
+    try:
+        asyncio.run(run())
+    finally:
+        executor.shutdown()
+    assert classifier.peak <= 2
+
+
+def test_queue_wait_timeout_is_not_a_call_timeout():
+    executor = InferenceExecutor(BlockingClassifier(0.3), max_concurrency=1, timeout=5.0)
+
+    async def run():
+        first = asyncio.ensure_future(executor.predict({}))
+        await asyncio.sleep(0.01)
+        with pytest.raises(InferenceQueueTimeout):
+            await executor.predict({}, timeout=0.1)
+        await first
+
+    try:
+        asyncio.run(run())
+    finally:
+        executor.shutdown()
+
+
+def padded_clip(sr=16000, pad_seconds=3.0, speech_seconds=2.0):
+    silence = np.zeros(int(pad_seconds * sr), dtype=np.float32)
+    y = np.concatenate([silence, synthetic_voice(speech_seconds, sr), silence])
+    buffer = io.BytesIO()
+    sf.write(buffer, y, sr, format="WAV", subtype="FLOAT")
+    return buffer.getvalue()
+
+
+def test_every_decoder_trims_and_hashes_the_same_samples():
+    clip = padded_clip()
+    encoded = base64.b64encode(clip).decode()
+    in_memory = prepare_payload(encoded, "English", vad=VAD)
+    streamed = prepare_payload(encoded, "English", streaming=True, vad=VAD)
+    uploaded = prepare_file(io.BytesIO(clip), "English", vad=VAD)
+
+    assert in_memory[0] == streamed[0] == uploaded[0]
+    for _, features in (streamed, uploaded):
+        assert features.keys() == in_memory[1].keys()
+        for name, value in in_memory[1].items():
+            assert features[name] == pytest.approx(value, rel=1e-6, abs=1e-9), name
+    features = in_memory[1]
+    # The untrimmed length is reported, the analysis covers the speech (plus padding)
+    assert features["clip_duration"] == pytest.approx(8.0)
+    assert 2.0 <= features["duration"] < 2.5
+    assert features["has_speech"] is True and features["speech_ratio"] == pytest.approx(0.25)
+
+
+def test_silent_upload_skips_analysis():
+    buffer = io.BytesIO()
+    sf.write(buffer, np.zeros(16000, dtype=np.float32), 16000, format="WAV")
+    cache_key, features = prepare_file(io.BytesIO(buffer.getvalue()), "English", vad=VAD)
+    assert cache_key is None
+    assert features == {"duration": 1.0, "has_speech": False, "speech_ratio": 0.0}
+
+
+def test_decode_pool_spawns_its_workers():
+    # Forking after the inference threads exist could copy a held lock into the child
+    clip = base64.b64encode(padded_clip()).decode()
+    pool = create_cpu_pool(1)
+    try:
+        assert pool._mp_context.get_start_method() == "spawn"
+        in_worker = pool.submit(prepare_payload, clip, "English", True, False, VAD).result(timeout=60)
+    finally:
+        pool.shutdown()
+    assert in_worker == prepare_payload(clip, "English", True, False, VAD)
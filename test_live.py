@@ -0,0 +1,145 @@
+import asyncio
+import os
+import time
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+os.environ.setdefault("GEMINI_API_KEY", "live-test")
+
+import main
+from benchmark import synthetic_voice
+from live import (
+    BINARY_SUBPROTOCOL, ENCODING_PCM_F32LE, ENCODING_PCM_S16LE, FRAME_HEADER, OVERFLOW_COALESCE,
+    ChunkQueue, LiveSession, decode_binary_frame, frame_pcm,
+)
+from preprocessing import extract_features
+
+
+def assert_features_close(actual, expected):
+    for name in ("rms_mean", "zero_crossing_rate_mean"):
+        assert actual[name] == pytest.approx(expected[name], rel=1e-9), name
+    # Frames straddling the window's start belong to the previous hop, so the spectra differ slightly
+    for name in ("spectral_centroid_mean", "spectral_rolloff_mean"):
+        assert actual[name] == pytest.approx(expected[name], rel=1e-2), name
+
+
+def test_window_features_match_the_last_window():
+    sr = 16000
+    y = synthetic_voice(6.0, sr)
+    session = LiveSession(window_seconds=4.0, hop_seconds=2.0)
+    windows = [session.push(y[i:i + 8000], sr) for i in range(0, len(y), 8000)]
+    ready = [w for w in windows if w is not None]
+    assert len(ready) == 3
+    assert_features_close(ready[-1], extract_features(y[2 * sr:], sr))
+    assert np.array_equal(session.window_audio(), y[2 * sr:])
+
+
+def test_sample_rate_change_restarts_the_counters():
+    session = LiveSession(window_seconds=4.0, hop_seconds=2.0)
+    session.push(synthetic_voice(3.0, 16000), 16000)
+    assert session.stats()["received_seconds"] == 3.0
+    assert session.stats()["windows"] == 1
+
+    session.push(synthetic_voice(1.0, 48000), 48000)
+    stats = session.stats()
+    assert stats["received_seconds"] == 1.0
+    assert stats["buffered_seconds"] == 1.0
+    assert stats["windows"] == 0
+
+
+def chunk(sequence, samples=100, sr=16000):
+    return ChunkQueue.make_chunk(np.full(samples, sequence, dtype=np.float32), sr, sequence)
+
+
+def test_drop_oldest_marks_the_gap_after_the_dropped_chunk():
+    queue = ChunkQueue(maxsize=3)
+    for sequence in range(5):
+        queue.put(chunk(sequence))
+    queued = queue.drain()
+    assert [c["sequence"] for c in queued] == [2, 3, 4]
+    # 0 and 1 were dropped, so 2 does not follow on from what the session saw last
+    assert [c["gap"] for c in queued] == [True, False, False]
+    assert queue.stats()["dropped_chunks"] == 2
+
+
+def test_a_drop_that_empties_the_queue_marks_the_next_chunk():
+    queue = ChunkQueue(maxsize=1)
+    queue.put(chunk(0))
+    queue.put(chunk(1))
+    assert [(c["sequence"], c["gap"]) for c in queue.drain()] == [(1, True)]
+    queue.put(chunk(2))
+    assert [(c["sequence"], c["gap"]) for c in queue.drain()] == [(2, False)]
+
+
+def test_coalesce_merges_until_its_limit_then_drops():
+    queue = ChunkQueue(maxsize=2, policy=OVERFLOW_COALESCE, coalesce_max=3)
+    for sequence in range(6):
+        queue.put(chunk(sequence))
+    queued = queue.drain()
+    # 2 and 3 were appended to 1; 4 no longer fit, so 0 was dropped, then 5 was appended to 4
+    assert [c["sequence"] for c in queued] == [3, 5]
+    assert np.array_equal(queued[0]["y"], np.repeat(np.float32([1, 2, 3]), 100))
+    assert queued[0]["gap"] and not queued[1]["gap"]
+    stats = queue.stats()
+    assert stats["coalesced_chunks"] == 3 and stats["dropped_chunks"] == 1
+
+
+def test_stale_chunks_are_dropped_with_a_gap():
+    queue = ChunkQueue(maxsize=4, max_age_seconds=0.05)
+    queue.put(chunk(0))
+    time.sleep(0.06)
+    queue.put(chunk(1))
+    queued = asyncio.run(queue.get())
+    assert (queued["sequence"], queued["gap"]) == (1, True)
+    assert queue.stats()["dropped_chunks"] == 1
+
+
+def test_gap_restarts_the_window():
+    sr = 16000
+    before, after = synthetic_voice(3.0, sr, seed=1), synthetic_voice(2.0, sr, seed=2)
+    session = LiveSession(window_seconds=4.0, hop_seconds=2.0)
+    session.push(before, sr)
+    # Without the gap the window would splice the end of ``before`` onto ``after``
+    features = session.push(after, sr, gap=True)
+    assert_features_close(features, extract_features(after, sr))
+    assert np.array_equal(session.window_audio(), after)
+    stats = session.stats()
+    assert stats["gaps"] == 1 and stats["received_seconds"] == 5.0
+
+
+def binary_frame(samples, encoding=ENCODING_PCM_F32LE, language_id=0, sequence=0, sr=16000):
+    dtype = "<f4" if encoding == ENCODING_PCM_F32LE else "<i2"
+    return FRAME_HEADER.pack(1, encoding, language_id, 0, sequence, sr) + np.asarray(samples, dtype=dtype).tobytes()
+
+
+def test_frame_header_language_is_validated():
+    header, payload = decode_binary_frame(binary_frame([0.5, -0.5], language_id=2, sequence=7))
+    assert header["language"] == "Hindi" and header["sequence"] == 7
+    assert np.array_equal(frame_pcm(header, payload), np.float32([0.5, -0.5]))
+    with pytest.raises(ValueError, match="language"):
+        decode_binary_frame(binary_frame([0.0], language_id=6))
+
+
+@pytest.mark.parametrize("bad", [np.nan, np.inf, -np.inf])
+def test_float_frames_with_non_finite_samples_are_rejected(bad):
+    header, payload = decode_binary_frame(binary_frame([0.1, bad, 0.2]))
+    with pytest.raises(ValueError, match="NaN or infinite"):
+        frame_pcm(header, payload)
+
+
+def test_live_monitor_reports_the_declared_language_and_survives_a_bad_frame():
+    silence = np.zeros(2 * 16000, dtype=np.float32)
+    with TestClient(main.app).websocket_connect("/ws/live-monitor", subprotocols=[BINARY_SUBPROTOCOL]) as ws:
+        ws.send_bytes(binary_frame([0.0, np.nan], sequence=0))
+        assert "NaN" in ws.receive_json()["message"]
+        ws.send_bytes(binary_frame([0.0], language_id=9, sequence=1))
+        assert "language" in ws.receive_json()["message"]
+        # A silent window is answered without a model call, so no backend is needed
+        ws.send_bytes(binary_frame(silence, ENCODING_PCM_S16LE, language_id=1, sequence=2))
+        message = ws.receive_json()
+        assert message["type"] == "no_speech"
+        assert message["language"] == "Tamil"
+        # The rejected frames never reached the window
+        assert message["window"]["received_seconds"] == 2.0
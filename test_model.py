@@ -0,0 +1,164 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from model import BATCH_VERDICT_SCHEMA, COMPACT_INSTRUCTIONS, VERDICT_SCHEMA, VoiceClassifier
+
+
+@pytest.fixture
+def classifier():
+    return VoiceClassifier(api_key="model-test")
+
+
+def verdict(id=None, classification="Human", confidence=0.8):
+    item = {"classification": classification, "confidence_score": confidence, "explanation": f"clip {id}"}
+    if id is not None:
+        item["id"] = id
+    return item
+
+
+def test_batch_reply_is_mapped_by_id(classifier):
+    reply = json.dumps([verdict(3, "AI-Generated", 0.9), verdict(1), verdict(2, confidence=0.6)])
+    results = classifier._parse_batch_response(reply, 3)
+    assert [r["classification"] for r in results] == ["Human", "Human", "AI-Generated"]
+    assert [r["confidence_score"] for r in results] == [0.8, 0.6, 0.9]
+
+
+def test_batch_reply_missing_an_id_leaves_a_gap(classifier):
+    reply = json.dumps([verdict(1), verdict(3)])
+    results = classifier._parse_batch_response(reply, 3)
+    assert results[1] is None
+    assert results[0]["explanation"] == "clip 1" and results[2]["explanation"] == "clip 3"
+
+
+def test_batch_reply_without_ids_needs_the_right_item_count(classifier):
+    assert all(r is not None for r in classifier._parse_batch_response(json.dumps([verdict()] * 3), 3))
+    # With one item too few or too many the positions cannot be trusted
+    assert classifier._parse_batch_response(json.dumps([verdict()] * 2), 3) == [None] * 3
+    assert classifier._parse_batch_response(json.dumps([verdict()] * 4), 3) == [None] * 3
+
+
+def test_batch_reply_keeps_the_first_answer_and_skips_unusable_items(classifier):
+    reply = json.dumps([
+        verdict(1, "Human"),
+        verdict(1, "AI-Generated"),
+        verdict(2, "no idea"),
+        {**verdict(3), "confidence_score": "high"},
+        "not an object",
+        verdict(9),
+    ])
+    results = classifier._parse_batch_response(reply, 3)
+    assert results[0]["classification"] == "Human"
+    assert results[1] is None and results[2] is None
+
+
+@pytest.mark.parametrize("reply", ["", "not json", "[{\"id\": 1,", json.dumps(verdict(1))])
+def test_malformed_batch_reply_answers_nothing(classifier, reply):
+    assert classifier._parse_batch_response(reply, 2) == [None, None]
+
+
+def test_batch_reply_in_code_fences_is_parsed(classifier):
+    reply = "```json\n" + json.dumps([verdict(1), verdict(2)]) + "\n```"
+    assert all(r is not None for r in classifier._parse_batch_response(reply, 2))
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+        self.usage_metadata = None
+
+
+class StubModel:
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = []
+
+    def generate_content(self, prompt, generation_config=None, request_options=None):
+        self.calls.append({"prompt": prompt, "generation_config": generation_config})
+        return StubResponse(self.reply)
+
+
+def stubbed(reply, prompt_style="compact"):
+    classifier = VoiceClassifier(api_key="model-test", prompt_style=prompt_style)
+    classifier._model = StubModel(reply)
+    return classifier
+
+
+def test_compact_prompt_requests_schema_constrained_json():
+    classifier = VoiceClassifier(api_key="model-test", prompt_style="compact")
+    assert classifier._generation_config() == {
+        "response_mime_type": "application/json", "response_schema": VERDICT_SCHEMA,
+    }
+    assert classifier._generation_config(batch=True)["response_schema"] == BATCH_VERDICT_SCHEMA
+    body = classifier._request_body("prompt", batch=True)
+    assert body["generationConfig"] == {"responseMimeType": "application/json", "responseSchema": BATCH_VERDICT_SCHEMA}
+
+
+def test_legacy_prompt_sends_no_generation_config():
+    classifier = VoiceClassifier(api_key="model-test", prompt_style="legacy")
+    assert classifier._generation_config() is None
+    assert classifier._generation_config(batch=True) is None
+    assert "generationConfig" not in classifier._request_body("prompt")
+
+
+def test_unknown_prompt_style_is_rejected():
+    with pytest.raises(ValueError):
+        VoiceClassifier(api_key="model-test", prompt_style="verbose")
+
+
+def test_compact_reply_is_parsed():
+    classifier = stubbed(json.dumps(verdict(classification="AI-Generated", confidence=1.7)))
+    result = classifier.predict({"duration": 2.0})
+    assert result == {"classification": "AI-Generated", "confidence_score": 1.0, "explanation": "clip None"}
+    call = classifier.model.calls[0]
+    assert call["generation_config"]["response_schema"] == VERDICT_SCHEMA
+    assert call["prompt"].startswith(COMPACT_INSTRUCTIONS)
+
+
+@pytest.mark.parametrize("reply, classification", [
+    ("```json\n" + json.dumps(verdict(classification="Human")) + "\n```", "Human"),
+    (json.dumps(verdict(classification="ai generated voice")), "AI-Generated"),
+    ("The voice sounds AI-generated to me.", "AI-Generated"),
+    ("I think this is a human speaker.", "Human"),
+    ("No idea.", "Unknown"),
+])
+def test_legacy_replies_are_parsed(reply, classification):
+    classifier = stubbed(reply, prompt_style="legacy")
+    result = classifier.predict({"duration": 2.0})
+    assert result["classification"] == classification
+    assert classifier.model.calls[0]["generation_config"] is None
+    assert "Respond ONLY with valid JSON" in classifier.model.calls[0]["prompt"]
+
+
+def test_compact_batch_reply_is_parsed():
+    classifier = stubbed(json.dumps([verdict(2, "AI-Generated"), verdict(1)]))
+    results = classifier.predict_batch([{"duration": 1.0}, {"duration": 2.0}])
+    assert [r["classification"] for r in results] == ["Human", "AI-Generated"]
+    call = classifier.model.calls[0]
+    assert call["generation_config"]["response_schema"] == BATCH_VERDICT_SCHEMA
+    assert "1. duration_s=1.00" in call["prompt"] and "2. duration_s=2.00" in call["prompt"]
+
+
+def test_async_client_sends_the_schema_and_parses_the_reply():
+    classifier = VoiceClassifier(api_key="model-test", prompt_style="compact")
+    requests = []
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+        reply = {"candidates": [{"content": {"parts": [{"text": json.dumps(verdict(classification="Human"))}]}}],
+                 "usageMetadata": {"promptTokenCount": 40, "candidatesTokenCount": 12}}
+        return httpx.Response(200, json=reply)
+
+    async def run():
+        classifier._http_client = httpx.AsyncClient(base_url="http://gemini.test", transport=httpx.MockTransport(handler))
+        try:
+            return await classifier.apredict({"duration": 2.0})
+        finally:
+            await classifier.aclose()
+
+    result = asyncio.run(run())
+    assert result["classification"] == "Human"
+    assert requests[0]["generationConfig"]["responseSchema"] == VERDICT_SCHEMA
+    assert classifier.stats()["prompt_tokens"] == 40
@@ -0,0 +1,251 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from inference import InferenceExecutor, InferenceQueueFull, InferenceTimeout
+from metrics import GEMINI_ATTEMPTS, record_timing, start_timings
+from resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, ResilientPredictor, is_retryable
+
+FEATURES = {"spectral_centroid_mean": 1200.0}
+
+
+def fallback(_):
+    return {"classification": "Unknown", "confidence_score": 0.0, "explanation": "", "tier": "fallback"}
+
+
+def make_predictor(run_single, **options):
+    options.setdefault("breaker", CircuitBreaker(failure_rate=2.0))
+    return ResilientPredictor(run_single, None, fallback, backoff_base=0.01, backoff_max=0.02,
+                              passthrough=(InferenceQueueFull,),
+                              timeouts=(asyncio.TimeoutError, InferenceTimeout), **options)
+
+
+class Backend:
+    def __init__(self, latencies=(0.0,), errors=()):
+        """
+        Scripted backend: call ``i`` sleeps ``latencies[i]`` (the last one repeats) and
+        raises ``errors[i]`` when given; it gives up at its timeout like the real clients.
+        """
+        self.latencies = list(latencies)
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def __call__(self, features, timeout=None):
+        i = self.calls
+        self.calls += 1
+        latency = self.latencies[min(i, len(self.latencies) - 1)]
+        # Like the executor, report the slot wait and the call (even a cancelled one) in the request's timings
+        record_timing("model_wait", 0.001)
+        started_at = time.perf_counter()
+        try:
+            if timeout is not None and latency > timeout:
+                await asyncio.sleep(timeout)
+                raise asyncio.TimeoutError()
+            await asyncio.sleep(latency)
+        finally:
+            record_timing("model_call", time.perf_counter() - started_at)
+        if i < len(self.errors) and self.errors[i] is not None:
+            raise self.errors[i]
+        return {"classification": "Human", "confidence_score": 0.9, "explanation": "", "call": i}
+
+
+class StatusError(Exception):
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+def test_breaker_opens_at_failure_rate_and_probes_after_reset():
+    breaker = CircuitBreaker(failure_rate=0.5, min_calls=4, window=4, reset_timeout=0.05)
+    for failed in (True, False, True):
+        breaker.record_failure() if failed else breaker.record_success()
+    # Two failures in three calls, but fewer than min_calls outcomes are known
+    assert breaker.state == CLOSED and breaker.allow()
+    breaker.record_success()
+    breaker.record_failure()
+    # Last four outcomes: success, failure, success, failure
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.stats()["rejected"] == 1
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    # Only one probe at a time
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.release()
+    # A released probe frees the slot without deciding anything
+    assert breaker.state == HALF_OPEN and breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.stats()["recent_calls"] == 0
+    assert breaker.opened == 2
+
+
+def test_is_retryable():
+    assert is_retryable(RuntimeError("connection reset"))
+    assert is_retryable(StatusError(503))
+    assert is_retryable(StatusError(429))
+    assert not is_retryable(StatusError(400))
+    assert not is_retryable(StatusError(403))
+
+
+def test_retries_until_success():
+    backend = Backend(errors=[StatusError(503), StatusError(503)])
+    predictor = make_predictor(backend, max_retries=2, budget=1.0)
+    result = asyncio.run(predictor.predict(FEATURES))
+    assert result["call"] == 2
+    assert predictor.retries == 2
+    assert predictor.fallbacks == 0
+
+
+def test_retries_are_capped_then_fall_back():
+    backend = Backend(errors=[StatusError(503)] * 10)
+    predictor = make_predictor(backend, max_retries=2, budget=1.0)
+    result = asyncio.run(predictor.predict(FEATURES))
+    assert result["tier"] == "fallback"
+    assert backend.calls == 3
+    assert predictor.retries == 2
+
+
+def test_client_errors_are_not_retried():
+    backend = Backend(errors=[StatusError(400)])
+    predictor = make_predictor(backend, max_retries=2, budget=1.0)
+    result = asyncio.run(predictor.predict(FEATURES))
+    assert result["tier"] == "fallback"
+    assert backend.calls == 1
+
+
+def test_budget_bounds_slow_calls():
+    backend = Backend(latencies=[5.0])
+    predictor = make_predictor(backend, max_retries=5, budget=0.2)
+    start = time.perf_counter()
+    result = asyncio.run(predictor.predict(FEATURES))
+    assert result["tier"] == "fallback"
+    assert time.perf_counter() - start < 0.5
+
+
+def test_backoff_stays_under_ceiling():
+    predictor = ResilientPredictor(None, None, fallback, backoff_base=0.1, backoff_max=0.3)
+    for retry in range(6):
+        ceiling = min(0.3, 0.1 * 2 ** retry)
+        assert all(0.0 <= predictor._backoff(retry) <= ceiling for _ in range(200))
+
+
+def test_hedge_wins_when_primary_is_slow():
+    # 20 fast calls teach the latency quantile, then the primary stalls and the hedge answers
+    backend = Backend(latencies=[0.01] * 20 + [1.0, 0.01])
+    predictor = make_predictor(backend, max_retries=0, budget=2.0, hedge=True, hedge_min_samples=20)
+
+    async def run():
+        for _ in range(20):
+            await predictor.predict(FEATURES)
+        assert predictor.hedge_delay() == pytest.approx(0.01, abs=0.01)
+        start = time.perf_counter()
+        result = await predictor.predict(FEATURES)
+        return result, time.perf_counter() - start
+
+    result, elapsed = asyncio.run(run())
+    assert result["call"] == 21
+    assert predictor.hedges == 1 and predictor.hedge_wins == 1
+    assert elapsed < 0.5
+
+
+def test_only_the_winning_attempt_is_timed():
+    backend = Backend(latencies=[0.01] * 20 + [0.3, 0.02])
+    predictor = make_predictor(backend, max_retries=0, budget=2.0, hedge=True, hedge_min_samples=20)
+
+    async def run():
+        for _ in range(20):
+            await predictor.predict(FEATURES)
+        timings = start_timings()
+        result = await predictor.predict(FEATURES)
+        # Let the cancelled primary unwind, recording its share of the timings
+        await asyncio.sleep(0.05)
+        return result, timings
+
+    result, timings = asyncio.run(run())
+    assert result["call"] == 21
+    assert timings.stages["model_wait"] == pytest.approx(0.001)
+    assert timings.stages["model_call"] == pytest.approx(0.02, abs=0.015)
+
+
+def test_http_client_timeouts_count_as_timeouts():
+    def outcomes():
+        return {k: v for k, v in GEMINI_ATTEMPTS._series.items() if k[0] == "primary"}
+
+    before = outcomes()
+    backend = Backend(errors=[httpx.ReadTimeout("read timed out")])
+    predictor = ResilientPredictor(backend, None, fallback, max_retries=0, budget=1.0,
+                                   breaker=CircuitBreaker(failure_rate=2.0))
+    assert asyncio.run(predictor.predict(FEATURES))["tier"] == "fallback"
+    after = outcomes()
+    assert after.get(("primary", "timeout"), 0) == before.get(("primary", "timeout"), 0) + 1
+    assert after.get(("primary", "error"), 0) == before.get(("primary", "error"), 0)
+
+
+def test_no_hedging_without_latency_samples():
+    predictor = make_predictor(Backend(), hedge=True, hedge_min_samples=20)
+    assert predictor.hedge_delay() is None
+
+
+def test_open_breaker_answers_from_fallback():
+    backend = Backend(errors=[StatusError(503)] * 10)
+    breaker = CircuitBreaker(failure_rate=0.5, min_calls=2, reset_timeout=60.0)
+    predictor = make_predictor(backend, max_retries=0, budget=1.0, breaker=breaker)
+
+    async def run():
+        return [await predictor.predict(FEATURES) for _ in range(4)]
+
+    results = asyncio.run(run())
+    assert all(r["tier"] == "fallback" for r in results)
+    assert breaker.state == OPEN
+    assert backend.calls == 2
+
+
+class SlowClassifier:
+    def __init__(self, latency):
+        self.latency = latency
+
+    async def apredict(self, features, timeout=None, raise_errors=False):
+        await asyncio.sleep(self.latency)
+        return {"classification": "Human", "confidence_score": 0.9, "explanation": ""}
+
+
+def test_waiting_for_a_local_slot_does_not_trip_the_breaker():
+    # Two slots, 1 s calls, 3 s budget: 12 concurrent requests cannot all be served in time,
+    # but every call that ran was healthy, so the breaker must stay closed and the
+    # requests that ran out of time in the queue are reported as busy, not as fallbacks
+    executor = InferenceExecutor(SlowClassifier(1.0), max_concurrency=2, max_queue=32, use_async=True)
+    breaker = CircuitBreaker(failure_rate=0.5, min_calls=5, reset_timeout=60.0)
+    predictor = ResilientPredictor(
+        lambda features, timeout: executor.predict(features, timeout=timeout, raise_errors=True),
+        None, fallback, budget=3.0, breaker=breaker,
+        passthrough=(InferenceQueueFull,), timeouts=(asyncio.TimeoutError, InferenceTimeout),
+    )
+
+    async def one():
+        try:
+            return (await predictor.predict(FEATURES)).get("tier", "gemini")
+        except InferenceQueueFull:
+            return "busy"
+
+    async def run():
+        return await asyncio.gather(*(one() for _ in range(12)))
+
+    try:
+        outcomes = asyncio.run(run())
+    finally:
+        executor.shutdown()
+    assert outcomes.count("gemini") >= 4
+    assert outcomes.count("gemini") + outcomes.count("busy") == 12
+    assert breaker.state == CLOSED
+    assert breaker.stats()["recent_failures"] == 0
+    assert predictor.fallbacks == 0
@@ -0,0 +1,93 @@
+import gzip
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+os.environ.setdefault("GEMINI_API_KEY", "static-test")
+
+import main
+import static_assets
+from static_assets import StaticAsset
+
+# With brotli installed it is preferred over gzip
+PREFERRED = "br" if static_assets.brotli is not None else "gzip"
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+def get(client, path, **headers):
+    return client.get(path, headers={"accept-encoding": "identity", **headers})
+
+
+def test_compressed_and_identity_representations(client):
+    plain = get(client, "/app")
+    assert plain.status_code == 200
+    assert "content-encoding" not in plain.headers
+    assert plain.headers["cache-control"] == "no-cache"
+    assert "Accept-Encoding" in plain.headers["vary"]
+
+    packed = get(client, "/app", **{"accept-encoding": "gzip, br"})
+    assert packed.headers["content-encoding"] == PREFERRED
+    assert packed.headers["etag"] == plain.headers["etag"][:-1] + f'-{PREFERRED}"'
+    # The client decodes the body transparently
+    assert packed.content == plain.content
+
+
+@pytest.mark.parametrize("accept, coding", [
+    ("gzip", "gzip"),
+    ("gzip;q=0, identity", None),
+    ("br;q=0, gzip;q=0.5", "gzip"),
+    ("*", PREFERRED),
+    ("*;q=0", None),
+    ("deflate", None),
+])
+def test_accept_encoding_negotiation(client, accept, coding):
+    response = get(client, "/features.js", **{"accept-encoding": accept})
+    assert response.headers.get("content-encoding") == coding
+
+
+def test_matching_etag_is_answered_with_304(client):
+    first = get(client, "/manifest.json", **{"accept-encoding": "gzip"})
+    etag = first.headers["etag"]
+    before = main.static_assets.stats()["not_modified"]
+    for if_none_match in (etag, f"W/{etag}", f'"stale", {etag}', "*"):
+        response = get(client, "/manifest.json", **{"accept-encoding": "gzip", "if-none-match": if_none_match})
+        assert response.status_code == 304, if_none_match
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+        assert response.headers["cache-control"].startswith("public, max-age=")
+    assert main.static_assets.stats()["not_modified"] == before + 4
+
+
+def test_etag_of_another_representation_does_not_match(client):
+    gzipped = get(client, "/manifest.json", **{"accept-encoding": "gzip"}).headers["etag"]
+    # The identity body differs from the gzip one, so its cached copy cannot be reused
+    response = get(client, "/manifest.json", **{"if-none-match": gzipped})
+    assert response.status_code == 200
+    assert response.headers["etag"] != gzipped
+    assert get(client, "/manifest.json", **{"if-none-match": '"stale"'}).status_code == 200
+
+
+def test_root_selects_on_accept(client):
+    html = get(client, "/")
+    data = get(client, "/", accept="application/json")
+    assert html.headers["content-type"].startswith("text/html")
+    assert data.json()["status"] == "active"
+    assert html.headers["etag"] != data.headers["etag"]
+    assert data.headers["vary"] == "Accept, Accept-Encoding"
+
+
+def test_encodings_are_only_kept_when_smaller():
+    tiny = StaticAsset("ok", "text/plain")
+    assert list(tiny.encodings) == ["identity"]
+    assert tiny.select_encoding("gzip") == "identity"
+
+    body = "repetitive " * 200
+    asset = StaticAsset(body, "text/plain")
+    compressed, etag = asset.encodings["gzip"]
+    assert gzip.decompress(compressed) == body.encode()
+    assert etag == f'"{asset.digest}-gzip"'
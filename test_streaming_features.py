@@ -0,0 +1,71 @@
+import io
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from benchmark import synthetic_voice
+from preprocessing import N_FFT, FeatureAccumulator, extract_features, load_audio, stream_features
+
+
+def assert_features_close(actual, expected):
+    assert actual.keys() == expected.keys()
+    for name, value in expected.items():
+        assert actual[name] == pytest.approx(value, rel=1e-9, abs=1e-12), name
+
+
+def wav_file(y, sr, subtype="FLOAT"):
+    buffer = io.BytesIO()
+    sf.write(buffer, y, sr, format="WAV", subtype=subtype)
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.mark.parametrize("n_samples", [N_FFT - 1, N_FFT, 65536, 65536 * 2 + 1234, 100003])
+@pytest.mark.parametrize("blocksize", [N_FFT, 5000, 65536])
+def test_stream_features_match_whole_clip(n_samples, blocksize):
+    sr = 16000
+    y = synthetic_voice(n_samples / sr, sr, seed=n_samples)[:n_samples]
+    features, stream_sr = stream_features(wav_file(y, sr), blocksize=blocksize)
+    assert stream_sr == sr
+    assert_features_close(features, extract_features(y, sr))
+
+
+def test_stream_features_downmix_like_the_in_memory_decoder():
+    sr = 22050
+    y = synthetic_voice(3.3, sr, seed=7)
+    stereo = np.stack([y, 0.25 * y[::-1]], axis=1)
+    decoded, _ = load_audio(wav_file(stereo, sr, "PCM_16"))
+    features, _ = stream_features(wav_file(stereo, sr, "PCM_16"), blocksize=4096)
+    assert_features_close(features, extract_features(decoded, sr))
+
+
+@pytest.mark.parametrize("chunk", [100, 511, 2047, 3000, 44100])
+def test_accumulator_matches_whole_clip_for_any_chunk_size(chunk):
+    sr = 16000
+    y = synthetic_voice(2.7, sr, seed=chunk)
+    accumulator = FeatureAccumulator(sr)
+    for start in range(0, len(y), chunk):
+        accumulator.update(y[start:start + chunk])
+    assert_features_close(accumulator.features(), extract_features(y, sr))
+
+
+def test_combined_segments_match_their_span():
+    sr = 16000
+    y = synthetic_voice(4.0, sr, seed=11)
+    bounds = [0, 10007, 23000, 40001, len(y)]
+    segments, accumulator = [], FeatureAccumulator(sr)
+    for start, stop in zip(bounds, bounds[1:]):
+        for block in range(start, stop, 3001):
+            accumulator.update(y[block:min(block + 3001, stop)])
+        segments.append(accumulator)
+        accumulator = accumulator.continuation()
+    assert_features_close(FeatureAccumulator.combine(segments), extract_features(y, sr))
+
+
+def test_stream_features_over_a_span():
+    sr = 16000
+    y = synthetic_voice(5.0, sr, seed=3)
+    start, end = 12345, 60001
+    features, _ = stream_features(wav_file(y, sr), blocksize=8192, start=start, end=end)
+    assert_features_close(features, extract_features(y[start:end], sr))
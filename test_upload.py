@@ -0,0 +1,59 @@
+import io
+import os
+
+import numpy as np
+import pytest
+import soundfile as sf
+from fastapi.testclient import TestClient
+
+os.environ.setdefault("GEMINI_API_KEY", "upload-test")
+
+import main
+
+BOUNDARY = "upload-test-boundary"
+
+
+def multipart_body(payload: bytes):
+    return (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="clip.wav"\r\n'
+        "Content-Type: audio/wav\r\n\r\n"
+    ).encode() + payload + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+def chunked(body: bytes, size: int = 4096):
+    # A generator body is sent with chunked transfer encoding, i.e. without Content-Length
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main, "UPLOAD_MAX_BYTES", 64 * 1024)
+    return TestClient(main.app)
+
+
+def test_multipart_limit_is_enforced_without_content_length(client):
+    response = client.post(
+        "/detect/upload", content=chunked(multipart_body(b"\0" * 200 * 1024)),
+        headers={"content-type": f"multipart/form-data; boundary={BOUNDARY}"},
+    )
+    assert response.status_code == 413
+
+
+def test_raw_limit_is_enforced_without_content_length(client):
+    response = client.post("/detect/upload", content=chunked(b"\0" * 200 * 1024),
+                           headers={"content-type": "application/octet-stream"})
+    assert response.status_code == 413
+
+
+def test_multipart_under_the_limit_is_read(client):
+    buffer = io.BytesIO()
+    sf.write(buffer, np.zeros(8000, dtype=np.float32), 16000, format="WAV")
+    response = client.post(
+        "/detect/upload", content=chunked(multipart_body(buffer.getvalue())),
+        headers={"content-type": f"multipart/form-data; boundary={BOUNDARY}"},
+    )
+    # Silence is answered by the VAD without a model call
+    assert response.status_code == 200
+    assert response.json()["metadata"]["tier"] == "vad"
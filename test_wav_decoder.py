@@ -0,0 +1,115 @@
+import io
+import struct
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+import preprocessing
+from benchmark import legacy_wave_decode, synthetic_voice
+from preprocessing import load_audio, read_wav
+
+SR = 16000
+
+
+def encode(y, subtype, sr=SR):
+    buffer = io.BytesIO()
+    sf.write(buffer, y, sr, format="WAV", subtype=subtype)
+    return buffer.getvalue()
+
+
+def reference(raw):
+    """
+    libsndfile's decoding, downmixed like load_audio.
+    """
+    y, sr = sf.read(io.BytesIO(raw), always_2d=True)
+    return y.mean(axis=1), sr
+
+
+@pytest.fixture(scope="module")
+def voice():
+    y = synthetic_voice(1.3, SR, seed=1)
+    return np.stack([y, 0.5 * y[::-1]], axis=1)
+
+
+@pytest.mark.parametrize("subtype", ["PCM_16", "PCM_32"])
+@pytest.mark.parametrize("channels", [1, 2])
+def test_integer_pcm_matches_the_previous_decoder(voice, subtype, channels):
+    raw = encode(voice[:, :channels], subtype)
+    y, sr = read_wav(io.BytesIO(raw))
+    legacy, legacy_sr = legacy_wave_decode(io.BytesIO(raw))
+    assert y.dtype == np.float32 and sr == legacy_sr == SR
+    np.testing.assert_allclose(y, legacy, rtol=0, atol=1e-6)
+
+
+@pytest.mark.parametrize("subtype,atol", [("PCM_U8", 1e-6), ("PCM_24", 1e-6), ("FLOAT", 1e-7), ("DOUBLE", 1e-7)])
+@pytest.mark.parametrize("channels", [1, 2, 3])
+def test_other_encodings_match_libsndfile(voice, subtype, atol, channels):
+    # The previous decoder could not read these (8-bit came out with the wrong sign
+    # convention, 24-bit and float were rejected), so libsndfile is the reference
+    data = np.concatenate([voice, voice[:, :1]], axis=1)[:, :channels]
+    raw = encode(data, subtype)
+    y, sr = read_wav(io.BytesIO(raw))
+    expected, expected_sr = reference(raw)
+    assert y.dtype == np.float32 and sr == expected_sr == SR
+    np.testing.assert_allclose(y, expected, rtol=0, atol=atol)
+
+
+def test_round_trip_within_quantisation(voice):
+    mono = voice[:, 0]
+    for subtype, step in (("PCM_U8", 1 / 128), ("PCM_16", 1 / 32768), ("PCM_24", 1 / 8388608), ("FLOAT", 1e-7)):
+        y, _ = read_wav(io.BytesIO(encode(mono, subtype)))
+        assert np.max(np.abs(y - mono)) <= step, subtype
+
+
+def test_read_wav_skips_unknown_chunks_and_odd_padding(voice):
+    raw = encode(voice[:, 0], "PCM_16")
+    # Insert an odd-sized LIST chunk (padded to even length) before the data chunk
+    fmt_end = 12 + 8 + struct.unpack("<I", raw[16:20])[0]
+    extra = b"LIST" + struct.pack("<I", 3) + b"abc\0"
+    patched = raw[:fmt_end] + extra + raw[fmt_end:]
+    patched = patched[:4] + struct.pack("<I", len(patched) - 8) + patched[8:]
+    y, _ = read_wav(io.BytesIO(patched))
+    np.testing.assert_array_equal(y, read_wav(io.BytesIO(raw))[0])
+
+
+def wav_with_format(format_tag, bits=16):
+    block_align = (bits + 7) // 8
+    fmt = struct.pack("<HHIIHH", format_tag, 1, SR, SR * block_align, block_align, bits)
+    data = b"\0" * 64
+    body = b"WAVE" + b"fmt " + struct.pack("<I", len(fmt)) + fmt + b"data" + struct.pack("<I", len(data)) + data
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+def test_unsupported_encodings_raise_value_error():
+    # A-law and half-precision float are not decoded by the fallback
+    with pytest.raises(ValueError, match="Unsupported WAV encoding"):
+        read_wav(io.BytesIO(wav_with_format(0x0006, bits=8)))
+    with pytest.raises(ValueError, match="Unsupported WAV encoding"):
+        read_wav(io.BytesIO(wav_with_format(0x0003, bits=16)))
+    with pytest.raises(ValueError, match="RIFF/WAVE"):
+        read_wav(io.BytesIO(b"ID3" + b"\0" * 64))
+
+
+def test_12_bit_samples_read_from_their_16_bit_containers():
+    raw = bytearray(wav_with_format(0x0001, bits=12))
+    # One left-justified 12-bit sample of value 1024 (half scale) in a 16-bit container
+    raw[-64:-62] = struct.pack("<h", 1024 << 4)
+    y, _ = read_wav(io.BytesIO(bytes(raw)))
+    assert len(y) == 32
+    assert y[0] == pytest.approx(0.5)
+
+
+def test_load_audio_falls_back_to_read_wav(monkeypatch, voice):
+    raw = encode(voice, "PCM_24")
+    expected, _ = load_audio(io.BytesIO(raw))
+
+    def unreadable(*args, **kwargs):
+        raise RuntimeError("libsndfile cannot read this")
+
+    monkeypatch.setattr(preprocessing.sf, "read", unreadable)
+    y, sr = load_audio(io.BytesIO(raw))
+    assert sr == SR
+    np.testing.assert_allclose(y, expected, rtol=0, atol=1e-6)
+    with pytest.raises(ValueError, match="Unsupported or unreadable audio format"):
+        load_audio(io.BytesIO(wav_with_format(0x0006, bits=8)))